@@ -0,0 +1 @@
+"""Headless end-to-end latency benchmarks for VoicePTT"""
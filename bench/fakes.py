@@ -0,0 +1,306 @@
+"""Stand-ins for sounddevice, rumps, pyperclip, pynput and the osascript/afplay calls
+
+install() registers them in sys.modules so run_ptt.py imports and runs headless on
+Linux. The fake microphone is file-backed: clips queued with play() are fed to the
+stream callback in real time (or faster), with near-silence in between.
+"""
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+import types
+from collections import deque
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+BLOCK_FRAMES = 320  # 20 ms, a typical PortAudio block at 16 kHz
+
+
+# ----- sounddevice -----
+
+class FakeMicrophone:
+    """Audio source shared by every FakeInputStream"""
+
+    def __init__(self, speed=1.0, noise_level=8):
+        self.speed = speed
+        self.noise_level = noise_level
+        self.rng = np.random.default_rng(0)
+        self.clip = None
+        self.offset = 0
+        self.done = None
+        self.lock = threading.Lock()
+        self.lateness = deque(maxlen=200000)  # (fired at, seconds behind schedule) per callback
+
+    def play(self, clip):
+        """Start feeding clip; the returned Event is set once it has been fully captured"""
+        done = threading.Event()
+        with self.lock:
+            self.clip, self.offset, self.done = clip, 0, done
+        return done
+
+    def next_block(self, frames):
+        block = self.rng.normal(0, self.noise_level, frames).astype(np.int16)
+        with self.lock:
+            if self.clip is not None:
+                part = self.clip[self.offset:self.offset + frames]
+                block[:len(part)] = part
+                self.offset += frames
+                if self.offset >= len(self.clip):
+                    self.clip = None
+                    self.done.set()
+        return block
+
+
+MICROPHONE = FakeMicrophone()
+
+
+class CallbackFlags:
+    input_overflow = False
+
+
+class FakeInputStream:
+    """File-backed replacement for sd.InputStream that calls back from its own thread"""
+
+    def __init__(self, samplerate=SAMPLE_RATE, channels=1, dtype='int16', device=None, callback=None,
+                 blocksize=BLOCK_FRAMES, **kwargs):
+        self.callback = callback
+        self.blocksize = blocksize or BLOCK_FRAMES
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        flags = CallbackFlags()
+        period = self.blocksize / SAMPLE_RATE
+        next_time = time.perf_counter()
+        while self.running.is_set():
+            fired = time.perf_counter()
+            MICROPHONE.lateness.append((fired, fired - next_time))
+            block = MICROPHONE.next_block(self.blocksize)
+            self.callback(block.reshape(-1, 1), self.blocksize, None, flags)
+            next_time += period / MICROPHONE.speed
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+
+    def close(self):
+        pass
+
+
+def _sounddevice():
+    module = types.ModuleType("sounddevice")
+    module.InputStream = FakeInputStream
+    module.query_devices = lambda: [{"name": "Fake Microphone", "max_input_channels": 1},
+                                    {"name": "Fake Microphone", "max_input_channels": 1}]
+    module.default = types.SimpleNamespace(device=(None, None))
+    module.PortAudioError = OSError
+    return module
+
+
+# ----- rumps -----
+
+class MenuItem:
+    def __init__(self, title, callback=None, **kwargs):
+        self.title = title
+        self.callback = callback
+        self.items = []
+
+    def add(self, item):
+        self.items.append(item)
+
+    def clear(self):
+        self.items.clear()
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class Menu(list):
+    def clear(self):
+        del self[:]
+
+
+class App:
+    def __init__(self, name, title=None, quit_button=None, **kwargs):
+        self.name = name
+        self.title = name
+        self._menu = Menu()
+
+    @property
+    def menu(self):
+        return self._menu
+
+    @menu.setter
+    def menu(self, items):
+        self._menu.extend(items)
+
+    def run(self):
+        pass
+
+
+def _rumps():
+    module = types.ModuleType("rumps")
+    module.App = App
+    module.MenuItem = MenuItem
+    module.separator = MenuItem("---")
+    module.alert = lambda *args, **kwargs: 1
+    module.notification = lambda *args, **kwargs: None
+    module.quit_application = lambda *args, **kwargs: None
+    module.Window = None
+    return module
+
+
+# ----- pyperclip -----
+
+class Clipboard:
+    """Records every copy with a perf_counter timestamp"""
+
+    def __init__(self):
+        self.events = []
+        self.changed = threading.Condition()
+
+    def copy(self, text):
+        with self.changed:
+            self.events.append((time.perf_counter(), text))
+            self.changed.notify_all()
+
+    def paste(self):
+        return self.events[-1][1] if self.events else ""
+
+    def wait_after(self, count, timeout):
+        """Wait for the clipboard to receive more than count copies"""
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.events) > count, timeout)
+            return self.events[count] if len(self.events) > count else None
+
+
+CLIPBOARD = Clipboard()
+
+
+def _pyperclip():
+    module = types.ModuleType("pyperclip")
+    module.copy = CLIPBOARD.copy
+    module.paste = CLIPBOARD.paste
+    return module
+
+
+# ----- pynput -----
+
+class Listener:
+    """Keeps the callbacks so the benchmark can press and release keys"""
+
+    instances = []
+
+    def __init__(self, on_press=None, on_release=None):
+        self.on_press = on_press
+        self.on_release = on_release
+        Listener.instances.append(self)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        if self in Listener.instances:
+            Listener.instances.remove(self)
+
+
+def _pynput():
+    keyboard = types.ModuleType("pynput.keyboard")
+    keyboard.Key = types.SimpleNamespace(**{k: k for k in ["cmd_r", "cmd_l", "alt_r", "alt_l", "ctrl_r", "ctrl_l"]})
+    keyboard.Listener = Listener
+    pynput = types.ModuleType("pynput")
+    pynput.keyboard = keyboard
+    return pynput, keyboard
+
+
+# ----- osascript / afplay -----
+
+class _HelperPipe:
+    """stdin of a FakePopen: records each JSON command and answers it on stdout"""
+
+    def __init__(self, process):
+        self.process = process
+
+    def write(self, data):
+        for line in data.decode("utf-8").splitlines():
+            command = json.loads(line)
+            self.process.recorder.calls.append((time.perf_counter(), self.process.args + [command]))
+            self.process.replies.put(json.dumps({"id": command["id"], "ok": True}).encode("utf-8") + b"\n")
+        return len(data)
+
+    def close(self):
+        self.process.replies.put(b"")
+
+
+class FakePopen:
+    """Long-lived osascript helper that acknowledges every command immediately"""
+
+    def __init__(self, recorder, args):
+        self.recorder = recorder
+        self.args = list(args)
+        self.pid = 0
+        self.returncode = None
+        self.replies = queue.Queue()
+        self.stdin = _HelperPipe(self)
+        self.stdout = iter(self.replies.get, b"")
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self.returncode = 0
+        return 0
+
+    def kill(self):
+        self.stdin.close()
+        self.returncode = -9
+
+
+class RecordingSubprocess:
+    """Drop-in for the subprocess module that records macOS helper calls instead of running them"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+    def run(self, args, **kwargs):
+        self.calls.append((time.perf_counter(), list(args)))
+        return subprocess.CompletedProcess(args, 0, b"", b"")
+
+    def Popen(self, args, **kwargs):
+        return FakePopen(self, args)
+
+
+SUBPROCESS = RecordingSubprocess()
+
+
+def install():
+    """Register the stand-ins; call before importing run_ptt"""
+    pynput, keyboard = _pynput()
+    sys.modules.update({
+        "sounddevice": _sounddevice(),
+        "rumps": _rumps(),
+        "pyperclip": _pyperclip(),
+        "pynput": pynput,
+        "pynput.keyboard": keyboard,
+    })
+
+
+def patch_app_module(module):
+    """Route osascript/afplay calls (one-off or through the feedback helper) to the recorder"""
+    from voiceptt import feedback
+    feedback.subprocess = SUBPROCESS
+    if hasattr(module, "subprocess"):
+        module.subprocess = SUBPROCESS
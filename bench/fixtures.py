@@ -0,0 +1,95 @@
+"""Fixture WAV clips of different lengths for the latency benchmark
+
+Clips are synthesized with the system text-to-speech engine (`say` on macOS,
+`espeak-ng`/`espeak` on Linux) and cached in bench/clips/. Any 16 kHz mono 16-bit
+WAV files placed there are used as well. A clip's reference transcript, when it has
+one, is <name>.txt next to it: written for synthesized clips, and optional for your
+own. Clips without one (including the synthetic fallback when there is no TTS) are
+timed but not scored for accuracy.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, load_audio_file, read_wav, write_wav
+
+CLIPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clips")
+
+FIXTURE_TEXTS = {
+    "short": "Send the report by Friday.",
+    "medium": "Remind me to call the dentist tomorrow morning and ask whether "
+              "they have an opening next week.",
+    "long": "The quarterly review went well overall. Revenue grew faster than we expected, "
+            "but support tickets also went up, mostly about the new billing page. "
+            "Before the next release we should fix the invoice export, update the onboarding "
+            "emails and schedule a short retrospective with the whole team.",
+    "very_long": "Here is the plan for the migration. First we freeze writes to the old cluster "
+                 "on Saturday evening and take a full snapshot. Then we restore the snapshot on "
+                 "the new hardware, replay the write-ahead log, and run the consistency checks "
+                 "that compare row counts and checksums table by table. If everything matches we "
+                 "switch the connection strings, keep the old cluster read-only for one week, and "
+                 "only then decommission it. If any check fails we roll back by pointing the "
+                 "application at the old cluster again, which should take less than ten minutes.",
+}
+
+
+def _synthesize(text, path):
+    """Speak text into a 16 kHz WAV with whichever TTS engine is installed"""
+    if shutil.which("say"):
+        subprocess.run(["say", "-o", path, "--data-format=LEI16@16000", text], check=True)
+        return True
+    engine = shutil.which("espeak-ng") or shutil.which("espeak")
+    if engine:
+        with tempfile.NamedTemporaryFile(suffix=".wav") as raw:
+            subprocess.run([engine, "-w", raw.name, text], check=True)
+            # espeak writes 22.05 kHz; resample through ffmpeg
+            write_wav(path, load_audio_file(raw.name))
+        return True
+    return False
+
+
+def _speech_like(seconds, seed):
+    """Fallback when no TTS exists: voiced bursts with pauses (exercises timing, not accuracy)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    voiced = sum(np.sin(2 * np.pi * k * np.cumsum(pitch) / SAMPLE_RATE) / k for k in range(1, 6))
+    syllables = (np.sin(2 * np.pi * 3.5 * t) > -0.2) & (np.sin(2 * np.pi * 0.4 * t) > -0.7)
+    audio = voiced * syllables * 4000 + rng.normal(0, 30, len(t))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def ensure_fixtures(clips_dir=CLIPS_DIR):
+    """Create the fixture clips if missing and return {name: int16 PCM}"""
+    os.makedirs(clips_dir, exist_ok=True)
+    for seed, (name, text) in enumerate(FIXTURE_TEXTS.items()):
+        path = os.path.join(clips_dir, f"{name}.wav")
+        if os.path.exists(path):
+            continue
+        if _synthesize(text, path):
+            with open(os.path.join(clips_dir, f"{name}.txt"), "w") as f:
+                f.write(text + "\n")
+        else:
+            seconds = len(text.split()) / 2.5  # roughly conversational pace
+            write_wav(path, _speech_like(seconds, seed))
+    clips = {}
+    for filename in sorted(os.listdir(clips_dir)):
+        if filename.lower().endswith(".wav"):
+            try:
+                clips[filename[:-4]] = read_wav(os.path.join(clips_dir, filename))
+            except ValueError:
+                clips[filename[:-4]] = load_audio_file(os.path.join(clips_dir, filename))
+    return clips
+
+
+def load_transcripts(clips_dir=CLIPS_DIR):
+    """{name: reference text} for the clips that have a <name>.txt transcript"""
+    transcripts = {}
+    for filename in sorted(os.listdir(clips_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(clips_dir, filename)) as f:
+                transcripts[filename[:-4]] = f.read().strip()
+    return transcripts
@@ -0,0 +1,107 @@
+"""Check incremental log-mel features against whisper.log_mel_spectrogram
+
+Feeds each fixture clip through MelExtractor in capture-sized blocks, then compares
+the mel handed to the model with Whisper's own, both for the whole clip and for
+the span the VAD keeps. Also reports how long each takes at key release.
+
+    python -m bench.mel_check --n-mels 80 128
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, RingBuffer, pcm_to_float32
+from voiceptt.features import N_SAMPLES, MelExtractor, log_mel
+from voiceptt.vad import DEFAULT_VAD_SETTINGS, kept_span, speech_keep_mask
+
+BLOCK = 512  # samples per capture callback, as with the real stream
+
+
+class FedCapture:
+    """Stand-in for AudioCapture: a ring filled on demand instead of by PortAudio"""
+
+    def __init__(self, pcm):
+        self.pcm = pcm
+        self.ring = RingBuffer(len(pcm) + SAMPLE_RATE)
+
+    @property
+    def position(self):
+        return self.ring.written
+
+    @property
+    def oldest(self):
+        return self.ring.oldest
+
+    def feed(self, n):
+        self.ring.write(self.pcm[self.ring.written:self.ring.written + n])
+
+    def read(self, start, end=None):
+        return self.ring.read(start, end)
+
+
+def extract(pcm, n_mels):
+    """Raw frames for pcm, computed block by block as if it were being recorded"""
+    capture = FedCapture(pcm)
+    extractor = MelExtractor(capture, 0, n_mels, {"poll_ms": 3600 * 1000, "max_s": 3600})
+    while capture.position < len(pcm):
+        capture.feed(BLOCK)
+        if capture.position % (BLOCK * 8) == 0:
+            extractor._advance(capture.position)  # what the poller thread does
+    start = time.perf_counter()
+    features = extractor.finish(len(pcm))
+    return features, time.perf_counter() - start
+
+
+def check(name, pcm, n_mels):
+    import torch
+    import whisper
+    rows = []
+    features, finish_s = extract(pcm, n_mels)
+    mask = speech_keep_mask(pcm, DEFAULT_VAD_SETTINGS)
+    spans = [("full", (0, len(pcm)))]
+    if mask is not None and kept_span(mask) is not None:
+        spans.append(("vad", kept_span(mask)))
+    for label, span in spans:
+        start = time.perf_counter()
+        mel = features.mel(pcm, span)
+        ours_s = finish_s + time.perf_counter() - start
+        audio = pcm_to_float32(pcm[span[0]:span[1]])
+        start = time.perf_counter()
+        reference = whisper.log_mel_spectrogram(torch.from_numpy(audio), n_mels, padding=N_SAMPLES).numpy()
+        whisper_s = time.perf_counter() - start
+        scratch = log_mel(pcm[span[0]:span[1]], n_mels)
+        rows.append({"clip": name, "span": label, "n_mels": n_mels, "shape_ok": mel.shape == reference.shape,
+                     "max_err": float(np.abs(mel - reference).max()),
+                     "scratch_err": float(np.abs(scratch - reference).max()),
+                     "release_ms": ours_s * 1000, "whisper_ms": whisper_s * 1000})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare incremental log-mel features with Whisper's")
+    parser.add_argument("--n-mels", type=int, nargs="+", default=[80], choices=[80, 128])
+    parser.add_argument("--clips-dir", help="Directory of fixture WAVs (default bench/clips)")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    from bench.fixtures import CLIPS_DIR, ensure_fixtures
+    clips = ensure_fixtures(args.clips_dir or CLIPS_DIR)
+    failed = False
+    print(f"{'clip':10} {'span':5} {'mels':>4} {'max err':>9} {'scratch':>9} {'release':>9} {'whisper':>9}")
+    for n_mels in args.n_mels:
+        for name, pcm in clips.items():
+            if len(pcm) > N_SAMPLES:
+                continue  # long recordings go to the chunked decoder, not this path
+            for row in check(name, pcm, n_mels):
+                ok = row["shape_ok"] and row["max_err"] <= args.tolerance
+                failed |= not ok
+                print(f"{row['clip']:10} {row['span']:5} {row['n_mels']:4d} {row['max_err']:9.2e} "
+                      f"{row['scratch_err']:9.2e} {row['release_ms']:7.1f}ms {row['whisper_ms']:7.1f}ms"
+                      f"{'' if ok else '  MISMATCH'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
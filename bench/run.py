@@ -0,0 +1,293 @@
+"""End-to-end release-to-clipboard latency benchmark for run_ptt.py
+
+Runs the real menu-bar app against headless stand-ins (bench/fakes.py): fixture
+clips are "spoken" into a fake microphone while the hotkey is held, and latency is
+measured from key release to the clipboard copy. Audio callback jitter (how late
+each callback fires while the clip is being decoded) is recorded alongside, and so
+is the word error of each transcript against the clip's reference transcript, so
+inference backends can be compared on accuracy as well as latency. Clips without a
+transcript (the synthetic fallback when no TTS engine exists) report it as n/a.
+
+    python -m bench.run --models tiny base --options baseline no_vad --repeat 5
+    python -m bench.run --models tiny --options baseline onnx onnx_int8
+    python -m bench.run --compare bench/results/before.json bench/results/after.json
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+
+# Settings every benchmark app starts from: copy mode, no socket, no idle reaper
+BASE_SETTINGS = {
+    "mode": "copy",
+    "hotkey": "cmd_r",
+    "audio_device": 0,
+    "daemon": {"mode": "off"},
+    "models": {"idle_unload_s": 0},
+    "metrics": {"export_interval_s": 3600},
+}
+
+# Named pipeline variants, merged over BASE_SETTINGS
+PIPELINE_OPTIONS = {
+    "baseline": {},
+    "file_handoff": {"audio_handoff": "file"},
+    "no_vad": {"vad": {"enabled": False}},
+    "streaming": {"streaming": {"enabled": True}},
+    "int8": {"precision": "int8"},
+    "batching": {"batching": {"enabled": True}},
+    "fast": {"profiles": {"profile": "fast"}},
+    "auto_profile": {"profiles": {"profile": "auto"}},
+    "longform_spill": {"longform": {"spill_after_s": 10}},
+    "no_features": {"features": {"enabled": False}},
+    "worker": {"worker": {"enabled": True}},
+    "onnx": {"models": {"backend": "onnx"}},
+    "onnx_int8": {"precision": "int8", "models": {"backend": "onnx"}},
+}
+
+
+def deep_merge(base, override):
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def mean(values):
+    return float(np.mean(values)) if values else None
+
+
+def word_error(reference, hypothesis):
+    """Word error of a transcript against the script, ignoring case and punctuation"""
+    from voiceptt.quantize import word_difference
+    normalize = lambda text: re.sub(r"[^\w\s']", " ", text)
+    return word_difference(normalize(reference), normalize(hypothesis))
+
+
+class AppHarness:
+    """One EnhancedVoicePTTApp instance driven through the fake keyboard and microphone"""
+
+    def __init__(self, settings, workdir, load_timeout=600):
+        from bench import fakes
+        self.fakes = fakes
+        with open(os.path.join(workdir, "voiceptt_settings.json"), "w") as f:
+            json.dump(settings, f, indent=2)
+        os.chdir(workdir)
+        import run_ptt
+        fakes.patch_app_module(run_ptt)
+        self.app = run_ptt.EnhancedVoicePTTApp()
+        self.jitter = []  # callback lateness (s) between release and clipboard, last dictation
+        self.text = None  # clipboard text of the last dictation
+        deadline = time.time() + load_timeout
+        while not self.app.model_ready:
+            if time.time() > deadline:
+                raise TimeoutError("Model did not load in time")
+            time.sleep(0.1)
+
+    def dictate(self, clip, timeout=120):
+        """Hold the hotkey while clip plays; return release-to-clipboard seconds (None on failure)"""
+        fakes = self.fakes
+        listener = self.app.keyboard_listener
+        copies = len(fakes.CLIPBOARD.events)
+        listener.on_press("cmd_r")
+        fakes.MICROPHONE.play(clip).wait()
+        time.sleep(fakes.BLOCK_FRAMES / fakes.SAMPLE_RATE)  # let the last block land
+        released = time.perf_counter()
+        listener.on_release("cmd_r")
+        event = fakes.CLIPBOARD.wait_after(copies, timeout)
+        until = event[0] if event else time.perf_counter()
+        self.jitter = [late for fired, late in list(fakes.MICROPHONE.lateness) if released <= fired <= until]
+        self.text = event[1] if event else None
+        # Let feedback and history work finish before the next dictation
+        while self.app.title == "⏳":
+            time.sleep(0.05)
+        time.sleep(0.3)
+        return event[0] - released if event else None
+
+    def close(self):
+        self.app.keyboard_listener.stop()
+        self.app.capture.close()
+        self.app.feedback.stop()
+        self.app.metrics.stop()
+        engine = self.app.engine
+        if hasattr(engine, "pool"):
+            for key in engine.resident():
+                engine.pool.unload(key)
+        if hasattr(engine, "stop"):
+            engine.stop()
+
+
+def run_benchmark(models, options, clips, repeat, speed, log=print, transcripts=None):
+    """Time every clip under every (model, option); clips named in transcripts are also scored"""
+    from bench import fakes
+    transcripts = transcripts or {}
+    fakes.MICROPHONE.speed = speed
+    runs = []
+    for model in models:
+        for option in options:
+            settings = deep_merge(BASE_SETTINGS, dict(PIPELINE_OPTIONS[option], model_size=model))
+            workdir = tempfile.mkdtemp(prefix="voiceptt-bench-")
+            cwd = os.getcwd()
+            try:
+                harness = AppHarness(settings, workdir)
+                try:
+                    for name, clip in clips.items():
+                        latencies, jitter, texts, failures = [], [], [], 0
+                        for _ in range(repeat):
+                            latency = harness.dictate(clip)
+                            jitter.extend(late * 1000 for late in harness.jitter)
+                            if harness.text is not None:
+                                texts.append(harness.text)
+                            if latency is None:
+                                failures += 1
+                            else:
+                                latencies.append(latency * 1000)
+                        script = transcripts.get(name)
+                        errors = [word_error(script, text) for text in texts] if script else []
+                        runs.append({
+                            "model": model, "option": option, "clip": name,
+                            "audio_s": len(clip) / fakes.SAMPLE_RATE,
+                            "latencies_ms": latencies, "failures": failures,
+                            "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+                            "jitter_ms": jitter,
+                            "jitter_p99_ms": percentile(jitter, 99), "jitter_max_ms": max(jitter, default=None),
+                            "texts": texts, "wer": mean(errors),
+                        })
+                        log(f"{model:7} {option:13} {name:10} p50={runs[-1]['p50_ms'] or float('nan'):8.1f} ms "
+                            f"p95={runs[-1]['p95_ms'] or float('nan'):8.1f} ms "
+                            f"jitter p99={runs[-1]['jitter_p99_ms'] or float('nan'):6.2f} ms "
+                            f"wer={_fmt_wer(runs[-1]['wer'])} failures={failures}")
+                finally:
+                    harness.close()
+            finally:
+                os.chdir(cwd)
+                shutil.rmtree(workdir, ignore_errors=True)
+    return runs
+
+
+def _fmt_wer(wer):
+    return f"{wer:6.1%}" if wer is not None else f"{'n/a':>6}"
+
+
+def summarize(runs):
+    """p50/p95 latency, p99/max callback jitter and mean word error over all clips for each (model, option)"""
+    summary = []
+    for key in dict.fromkeys((r["model"], r["option"]) for r in runs):
+        latencies = [l for r in runs if (r["model"], r["option"]) == key for l in r["latencies_ms"]]
+        jitter = [j for r in runs if (r["model"], r["option"]) == key for j in r.get("jitter_ms", [])]
+        errors = [r["wer"] for r in runs if (r["model"], r["option"]) == key and r.get("wer") is not None]
+        failures = sum(r["failures"] for r in runs if (r["model"], r["option"]) == key)
+        summary.append({"model": key[0], "option": key[1], "n": len(latencies), "failures": failures,
+                        "p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+                        "jitter_p99_ms": percentile(jitter, 99), "jitter_max_ms": max(jitter, default=None),
+                        "wer": mean(errors)})
+    return summary
+
+
+def environment():
+    meta = {
+        "timestamp": datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+    try:
+        import torch
+        meta["torch"] = torch.__version__
+        meta["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+    try:
+        meta["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                        capture_output=True, text=True).stdout.strip()
+    except OSError:
+        pass
+    return meta
+
+
+def compare(before_path, after_path):
+    """Print p50/p95, jitter and word error changes between two result files"""
+    with open(before_path) as f:
+        before = {(s["model"], s["option"]): s for s in json.load(f)["summary"]}
+    with open(after_path) as f:
+        after = {(s["model"], s["option"]): s for s in json.load(f)["summary"]}
+    print(f"{'model':8} {'option':14} {'p50 before':>11} {'p50 after':>10} {'Δ':>7} "
+          f"{'p95 before':>11} {'p95 after':>10} {'Δ':>7} {'jitter p99':>19} {'wer':>15}")
+    for key in after:
+        if key not in before:
+            continue
+        row = [f"{key[0]:8} {key[1]:14}"]
+        for stat in ("p50_ms", "p95_ms"):
+            old, new = before[key][stat], after[key][stat]
+            if old and new:
+                row.append(f"{old:11.1f} {new:10.1f} {(new - old) / old:+7.1%}")
+            else:
+                row.append(f"{'-':>11} {'-':>10} {'-':>7}")
+        old, new = before[key].get("jitter_p99_ms"), after[key].get("jitter_p99_ms")
+        row.append(f"{old:8.2f} -> {new:6.2f}ms" if old is not None and new is not None else f"{'-':>19}")
+        old, new = before[key].get("wer"), after[key].get("wer")
+        row.append(f"{old:6.1%} -> {new:6.1%}" if old is not None and new is not None else f"{'n/a':>15}")
+        print(" ".join(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VoicePTT release-to-clipboard latency benchmark")
+    parser.add_argument("--models", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--options", nargs="+", default=["baseline"], choices=sorted(PIPELINE_OPTIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="Feed clips this many times faster than real time")
+    parser.add_argument("--clips-dir", help="Directory of fixture WAVs (default bench/clips)")
+    parser.add_argument("--out", help="Result JSON path (default bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sys.path.insert(0, REPO_ROOT)
+    from bench import fakes
+    fakes.install()
+    from bench.fixtures import CLIPS_DIR, ensure_fixtures, load_transcripts
+    clips = ensure_fixtures(args.clips_dir or CLIPS_DIR)
+    transcripts = load_transcripts(args.clips_dir or CLIPS_DIR)
+    if not transcripts:
+        print("No clip has a transcript (no TTS engine?): word error is n/a")
+
+    runs = run_benchmark(args.models, args.options, clips, args.repeat, args.speed,
+                         transcripts=transcripts)
+    result = {"meta": dict(environment(), speed=args.speed, repeat=args.repeat),
+              "runs": runs, "summary": summarize(runs)}
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    for row in result["summary"]:
+        print(f"{row['model']:7} {row['option']:13} p50={row['p50_ms'] or float('nan'):8.1f} ms "
+              f"p95={row['p95_ms'] or float('nan'):8.1f} ms jitter p99={row['jitter_p99_ms'] or float('nan'):6.2f} ms "
+              f"wer={_fmt_wer(row.get('wer'))} (n={row['n']}, failures={row['failures']})")
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,36 @@
+import time
+_STARTED_AT = time.perf_counter()  # reference point for --profile-startup
+
 import rumps
-import whisper
-import sounddevice as sd
-import numpy as np
 import pyperclip
-import tempfile
-import wave
 import os
-import subprocess
+import sys
 import threading
-import time
 from pynput import keyboard
 from datetime import datetime
 import json
 import logging
 
-SAMPLE_RATE = 16000
-CHANNELS = 1
+from voiceptt.audio import SAMPLE_RATE, DEFAULT_CAPTURE_SETTINGS, AudioCapture
+from voiceptt.batching import DEFAULT_BATCHING_SETTINGS
+from voiceptt.devices import DeviceRegistry
+from voiceptt.daemon import DEFAULT_DAEMON_SETTINGS, DaemonClient, RemoteEngine, TranscriptionDaemon, ping
+from voiceptt.engine import TranscriptionEngine
+from voiceptt.features import DEFAULT_FEATURE_SETTINGS, MelExtractor
+from voiceptt.feedback import DEFAULT_FEEDBACK_SETTINGS, FeedbackDispatcher
+from voiceptt.history import DEFAULT_HISTORY_SETTINGS, HistoryStore
+from voiceptt.jobs import DEFAULT_JOB_SETTINGS, JobQueueFull, JobScheduler
+from voiceptt.longform import DEFAULT_LONGFORM_SETTINGS, SpillWriter
+from voiceptt.metrics import DEFAULT_METRICS_SETTINGS, Metrics
+from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS, model_key
+from voiceptt.profiles import DEFAULT_PROFILE_SETTINGS, PROFILE_ORDER
+from voiceptt.quantize import PRECISIONS, compare_precision
+from voiceptt.startup import StartupProfiler
+from voiceptt.streaming import DEFAULT_STREAMING_SETTINGS, StreamingTranscriber
+from voiceptt.tuning import DEFAULT_THREAD_SETTINGS, summarize
+from voiceptt.vad import DEFAULT_VAD_SETTINGS
+from voiceptt.worker import DEFAULT_WORKER_SETTINGS, WorkerEngine
+
 os.environ["PATH"] += os.pathsep + "/opt/homebrew/bin"
 
 
@@ -25,8 +40,10 @@ class EnhancedVoicePTTApp(rumps.App):
     # INITIALIZATION & CORE SETUP
     # ================================
     
-    def __init__(self):
+    def __init__(self, profiler=None):
         super(EnhancedVoicePTTApp, self).__init__("🎙️", quit_button=None)
+        self.profiler = profiler or StartupProfiler(_STARTED_AT)
+        self.profiler.mark("imports")
         
         # Setup logging
         self.setup_logging()
@@ -36,26 +53,81 @@ class EnhancedVoicePTTApp(rumps.App):
         self.mode = self.settings.get("mode", "copy")
         self.hotkey = self.settings.get("hotkey", "cmd_r")
         self.model_size = self.settings.get("model_size", "small")
+        self.precision = self.settings.get("precision", "fp32")
         self.audio_device = self.settings.get("audio_device", 1)
+        # "memory" hands numpy audio straight to Whisper; "file" keeps a WAV per clip for debugging
+        self.audio_handoff = self.settings.get("audio_handoff", "memory")
+        self.capture_settings = {**DEFAULT_CAPTURE_SETTINGS, **self.settings.get("capture", {})}
+        self.streaming_settings = {**DEFAULT_STREAMING_SETTINGS, **self.settings.get("streaming", {})}
+        self.vad_settings = {**DEFAULT_VAD_SETTINGS, **self.settings.get("vad", {})}
+        self.model_pool_settings = {**DEFAULT_MODEL_POOL_SETTINGS, **self.settings.get("models", {})}
+        self.daemon_settings = {**DEFAULT_DAEMON_SETTINGS, **self.settings.get("daemon", {})}
+        self.batching_settings = {**DEFAULT_BATCHING_SETTINGS, **self.settings.get("batching", {})}
+        self.metrics_settings = {**DEFAULT_METRICS_SETTINGS, **self.settings.get("metrics", {})}
+        self.feedback_settings = {**DEFAULT_FEEDBACK_SETTINGS, **self.settings.get("feedback", {})}
+        self.history_settings = {**DEFAULT_HISTORY_SETTINGS, **self.settings.get("history", {})}
+        self.profile_settings = {**DEFAULT_PROFILE_SETTINGS, **self.settings.get("profiles", {})}
+        self.thread_settings = {**DEFAULT_THREAD_SETTINGS, **self.settings.get("threads", {})}
+        self.longform_settings = {**DEFAULT_LONGFORM_SETTINGS, **self.settings.get("longform", {})}
+        self.job_settings = {**DEFAULT_JOB_SETTINGS, **self.settings.get("jobs", {})}
+        self.feature_settings = {**DEFAULT_FEATURE_SETTINGS, **self.settings.get("features", {})}
+        self.worker_settings = {**DEFAULT_WORKER_SETTINGS, **self.settings.get("worker", {})}
+        self.thread_settings["configs"] = dict(self.thread_settings["configs"])
+        self.profiler.mark("logging and settings")
         
         # State management
-        self.model = None
+        self.metrics = Metrics(self.metrics_settings, self.logger)
+        self.feedback = FeedbackDispatcher(self.feedback_settings, self.metrics, self.logger)
+        self.daemon = None
+        self.engine = self.create_engine()
+        self.profiler.mark("engine and daemon")
+        self.recent_clips = []  # last few recordings, used by the precision comparison
+        self.model_ready = False  # set once the first model is loaded; reloads happen on demand
+        self.model_loading = False
+        self.load_error = None  # why the last load failed; the next key press retries it
+        # Released recordings wait here; held until the first model is loaded
+        self.jobs = self.create_job_scheduler()
+        self.queue_depth = (0, 0)  # (waiting, decoding) jobs
+        self.status_text = "Ready"
+        self.streamer = None
+        self.spill = None  # SpillWriter once a recording gets long
+        self.spill_timer = None
+        self.extractor = None  # MelExtractor for the current recording
+        self.features_available = isinstance(self.engine, TranscriptionEngine)  # not through a daemon
         self.is_recording = False
         self.recording_start_time = 0
-        self.audio_buffer = []
-        self.stream = None
-        self.lock = threading.Lock()
+        self.recording_started_at = 0  # perf_counter at key press, for the capture span
+        self.recording_start_sample = 0
+        # Held by start/stop/cancel and device changes, which run on different threads
+        self.audio_lock = threading.RLock()
+        self.capture = AudioCapture(self.audio_device, self.capture_settings["buffer_seconds"], self.logger)
+        self.devices = DeviceRegistry(self.logger)
         self.transcription_history = []
+        self.search_results = []
         
-        # Load transcription history from log file
+        # Load recent transcriptions from the history database
         self.load_transcription_history()
+        self.profiler.mark("history")
         
         # Setup components
         self.setup_menu()
+        self.profiler.mark("menu")
         self.setup_keyboard_listener()
         
-        # Load model in background
+        # Keep the microphone stream warm so the first syllable is never clipped
+        if self.capture_settings["always_on"]:
+            try:
+                self.capture.open()
+            except Exception as e:
+                self.logger.error(f"Could not open audio stream: {e}")
+        self.profiler.mark("keyboard and audio stream")
+        
+        # Re-enumerate audio devices only when one is plugged in or removed
+        self.devices.watch(self.handle_device_change, self.capture_settings["device_poll_s"])
+        
+        # Load model (and whisper/torch) in background; the menu is usable meanwhile
         threading.Thread(target=self.load_model, daemon=True).start()
+        self.logger.info(f"Menu ready {self.profiler.mark('init done'):.2f}s after launch")
 
     def setup_logging(self):
         """Setup simple logging for general app logs"""
@@ -69,55 +141,112 @@ class EnhancedVoicePTTApp(rumps.App):
         
         self.logger.info("VoicePTT app starting up")
     
-    def save_transcription(self, text):
-        """Save transcription to dedicated clean file"""
-        try:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            with open('voiceptt_transcriptions.txt', 'a', encoding='utf-8') as f:
-                f.write(f"{timestamp} | {text}\n")
-        except Exception as e:
-            self.logger.error(f"Failed to save transcription: {e}")
-
     def load_transcription_history(self):
-        """Load recent transcriptions from dedicated transcription file"""
+        """Open the history store and load the most recent transcriptions"""
         try:
-            if os.path.exists('voiceptt_transcriptions.txt'):
-                with open('voiceptt_transcriptions.txt', 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    # Get last 10 transcriptions
-                    for line in lines[-10:]:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        if '|' in line:
-                            parts = line.split(' | ', 1)
-                            if len(parts) == 2:
-                                timestamp_str, text = parts
-                                try:
-                                    # Parse timestamp
-                                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                                    self.transcription_history.append({
-                                        "text": text,
-                                        "timestamp": timestamp.strftime("%H:%M:%S"),
-                                        "date": timestamp.isoformat()
-                                    })
-                                except ValueError:
-                                    continue
-                self.logger.info(f"Loaded {len(self.transcription_history)} transcriptions from history")
+            self.history = HistoryStore(self.history_settings, self.logger)
+            self.transcription_history = self.history.recent(10)
+            self.logger.info(f"Loaded {len(self.transcription_history)} transcriptions from history")
         except Exception as e:
+            self.history = None
             self.logger.error(f"Error loading transcription history: {e}")
 
+    @property
+    def model_key(self):
+        """Pool key of the selected model size and precision"""
+        return model_key(self.model_size, self.precision)
+
+    def create_engine(self):
+        """Use a running daemon's engine, or a local one (optionally served to other clients)"""
+        mode = self.daemon_settings["mode"]
+        socket_path = self.daemon_settings["socket"]
+        if mode == "client" or (mode == "auto" and ping(socket_path)):
+            self.logger.info(f"Using transcription daemon at {socket_path}")
+            return RemoteEngine(DaemonClient(socket_path), self.model_size, self.precision)
+
+        if self.worker_settings["enabled"]:
+            # Torch runs in a child process; this one only records, pastes and draws the menu
+            engine = WorkerEngine({
+                "model_size": self.model_size,
+                "precision": self.precision,
+                "models": self.model_pool_settings,
+                "vad": self.vad_settings,
+                "audio_handoff": self.audio_handoff,
+                "batching": self.batching_settings,
+                "profiles": self.profile_settings,
+                "longform": self.longform_settings
+            }, self.worker_settings, self.thread_settings, self.metrics, self.logger)
+        else:
+            engine = TranscriptionEngine(
+                model_size=self.model_size,
+                precision=self.precision,
+                model_settings=self.model_pool_settings,
+                vad_settings=self.vad_settings,
+                audio_handoff=self.audio_handoff,
+                batching_settings=self.batching_settings,
+                metrics=self.metrics,
+                logger=self.logger,
+                profile_settings=self.profile_settings,
+                thread_settings=self.thread_settings,
+                longform_settings=self.longform_settings
+            )
+        engine.on_status = self.update_status
+        if mode in ("auto", "host"):
+            # Share this app's resident model with scripts and editor plugins
+            try:
+                self.daemon = TranscriptionDaemon(engine, socket_path, self.daemon_settings["max_queue"], self.logger)
+                self.daemon.start()
+            except Exception as e:
+                self.logger.error(f"Could not start transcription daemon: {e}")
+                self.daemon = None
+        return engine
+
+    def create_job_scheduler(self):
+        """One inference worker, or one per batch slot when the engine batches clips"""
+        workers = self.job_settings["workers"]
+        if not workers:
+            workers = self.batching_settings["max_batch"] if getattr(self.engine, "batcher", None) else 1
+        return JobScheduler(self.run_job, self.deliver_job, self.job_settings, workers, self.logger,
+                            on_depth=self.show_queue_depth)
+
     def load_model(self):
-        """Load the Whisper AI model in background"""
+        """Load the selected Whisper model in background"""
+        key = self.model_key
+        size = key.replace(":", " ")
+        self.model_loading = True
         try:
-            self.logger.info(f"Loading Whisper model: {self.model_size}")
-            self.update_status("Loading AI model...")
-            self.model = whisper.load_model(self.model_size)
-            self.update_status(f"Ready • Hold {self.hotkey.replace('_', '+').upper()} to speak")
-            self.logger.info(f"Model {self.model_size} loaded successfully")
+            self.logger.info(f"Loading Whisper model: {size}")
+            self.update_status(f"Loading {size} model...")
+            if isinstance(self.engine, TranscriptionEngine) and not self.model_ready:
+                # Heavy imports happen here, off the main thread, after the icon is up
+                for module in self.engine.backend.imports:
+                    self.profiler.import_module(module)
+            self.engine.load()
+            self.profiler.mark(f"model {size} loaded")
+            self.model_ready = True
+            self.load_error = None
+            if key == self.model_key:
+                self.update_status(f"Ready • Hold {self.hotkey.replace('_', '+').upper()} to speak")
+            self.logger.info(f"Model {size} loaded successfully")
+            self.refresh_settings_menu()
+            self.jobs.resume()
+            if (self.thread_settings["autotune_on_load"] and key not in self.thread_settings["configs"]
+                    and self.model_pool_settings["backend"] == "torch"):
+                self.tune_threads(None)
         except Exception as e:
             self.logger.error(f"Error loading model: {str(e)}")
+            self.load_error = str(e)
             self.update_status(f"Error loading model: {str(e)}")
+            dropped = self.jobs.cancel_all("model failed to load")
+            if dropped:
+                self.logger.error(f"Dropped {dropped} queued recording(s): model failed to load")
+                self.feedback.notify(f"Model failed to load: {e}", subtitle=f"{dropped} recording(s) dropped")
+        finally:
+            self.model_loading = False
+            self.on_model_load_finished()
+
+    def on_model_load_finished(self):
+        """Hook for --profile-startup; the normal app keeps running"""
 
     # ================================
     # SETTINGS MANAGEMENT
@@ -133,33 +262,76 @@ class EnhancedVoicePTTApp(rumps.App):
     
     def save_settings(self):
         """Save current settings to JSON file"""
-        settings = {
+        self.settings.update({
             "mode": self.mode,
             "hotkey": self.hotkey,
             "model_size": self.model_size,
-            "audio_device": self.audio_device
-        }
+            "precision": self.precision,
+            "audio_device": self.audio_device,
+            "audio_handoff": self.audio_handoff,
+            "capture": self.capture_settings,
+            "streaming": self.streaming_settings,
+            "vad": self.vad_settings,
+            "models": self.model_pool_settings,
+            "daemon": self.daemon_settings,
+            "batching": self.batching_settings,
+            "metrics": self.metrics_settings,
+            "feedback": self.feedback_settings,
+            "history": self.history_settings,
+            "profiles": self.profile_settings,
+            "threads": self.thread_settings,
+            "longform": self.longform_settings,
+            "jobs": self.job_settings,
+            "features": self.feature_settings,
+            "worker": self.worker_settings
+        })
         with open("voiceptt_settings.json", "w") as f:
-            json.dump(settings, f, indent=2)
+            json.dump(self.settings, f, indent=2)
 
     def change_model(self, size):
         """Change Whisper model size"""
         if size != self.model_size:
             self.logger.info(f"Changing model from {self.model_size} to {size}")
             self.model_size = size
+            self.switch_model()
+    
+    def change_precision(self, precision):
+        """Change model precision (fp32 or CPU-optimized int8)"""
+        if precision != self.precision:
+            self.logger.info(f"Changing precision from {self.precision} to {precision}")
+            self.precision = precision
+            self.switch_model()
+    
+    def change_profile(self, profile):
+        """Change the decoding profile (the engine reads it per clip)"""
+        if profile != self.profile_settings["profile"]:
+            self.logger.info(f"Changing profile from {self.profile_settings['profile']} to {profile}")
+            self.profile_settings["profile"] = profile
             self.save_settings()
-            self.update_status(f"Loading {size} model...")
-            threading.Thread(target=self.load_model, daemon=True).start()
             self.refresh_settings_menu()
+    
+    def switch_model(self):
+        """Activate the selected model, loading it in background if not resident"""
+        self.save_settings()
+        if self.engine.select(self.model_size, self.precision):
+            # Already resident: switch instantly
+            self.update_status(f"Ready • Hold {self.hotkey.replace('_', '+').upper()} to speak")
+        else:
+            threading.Thread(target=self.load_model, daemon=True).start()
+        self.refresh_settings_menu()
 
     def change_audio_device(self, device_id):
         """Change audio input device"""
-        self.audio_device = device_id
-        self.save_settings()
-        device_name = sd.query_devices()[device_id]['name']
-        subprocess.run(["osascript", "-e", 
-                      f'display notification "Audio device: {device_name}" with title "VoicePTT"'])
-        self.refresh_settings_menu()
+        with self.audio_lock:
+            self.audio_device = device_id
+            self.save_settings()
+            try:
+                self.capture.set_device(device_id)
+            except Exception as e:
+                self.logger.error(f"Could not reopen audio stream on device {device_id}: {e}")
+            device_name = self.devices.name(device_id)
+            self.feedback.notify(f"Audio device: {device_name}")
+            self.refresh_settings_menu()
 
     def change_hotkey(self, key):
         """Change push-to-talk hotkey"""
@@ -170,10 +342,33 @@ class EnhancedVoicePTTApp(rumps.App):
         self.setup_keyboard_listener()
         display_key = key.replace("_", "+").upper()
         self.update_status(f"Ready • Hold {display_key} to speak")
-        subprocess.run(["osascript", "-e", 
-                      f'display notification "Hotkey: {display_key}" with title "VoicePTT"'])
+        self.feedback.notify(f"Hotkey: {display_key}")
         self.refresh_settings_menu()
 
+    def handle_device_change(self):
+        """Re-enumerate devices after a hotplug and keep the selected device by name"""
+        with self.audio_lock:
+            if self.is_recording:
+                return  # the watcher calls again once this recording is over
+            current_name = self.devices.name(self.audio_device)
+            was_open = self.capture.is_open
+            # PortAudio can only re-enumerate with no stream open
+            self.capture.close()
+            self.devices.refresh()
+            device_id = self.devices.find(current_name)
+            if device_id is not None and device_id != self.audio_device:
+                self.audio_device = device_id
+                self.capture.device = device_id
+                self.save_settings()
+            elif device_id is None:
+                self.logger.warning(f"Audio device {current_name} is gone; keeping index {self.audio_device}")
+            if was_open:
+                try:
+                    self.capture.open()
+                except Exception as e:
+                    self.logger.error(f"Could not reopen audio stream on device {self.audio_device}: {e}")
+            self.refresh_settings_menu()
+
     # ================================
     # MENU MANAGEMENT
     # ================================
@@ -181,27 +376,45 @@ class EnhancedVoicePTTApp(rumps.App):
     def setup_menu(self):
         """Create the main application menu"""
         # Create settings menu with preferences as submenu
-        settings_menu = rumps.MenuItem("⚙️ Settings")
-        settings_menu.add(self.create_settings_submenu())
+        self.settings_menu = rumps.MenuItem("⚙️ Settings")
+        self.settings_menu.add(self.create_settings_submenu())
+        self.status_item = rumps.MenuItem("📊 Status: Ready", callback=None)
+        self.history_menu = rumps.MenuItem("📄 View History")
+        self.populate_history_menu()
         
         self.menu = [
-            rumps.MenuItem("📊 Status: Ready", callback=None),
+            self.status_item,
             rumps.separator,
             # rumps.MenuItem("🎯 Push-to-Talk Mode", callback=self.toggle_ptt_mode),
             rumps.MenuItem(f"📋 Output: {self.mode.upper()}", callback=self.toggle_output_mode),
             rumps.separator,
+            rumps.MenuItem("🛑 Cancel Pending Transcriptions", callback=self.cancel_pending),
+            rumps.separator,
             rumps.MenuItem("📝 Recent Transcriptions", callback=None),
-            self.create_history_submenu(),
+            self.history_menu,
             rumps.separator,
-            settings_menu,
+            self.settings_menu,
             rumps.separator,
+            self.create_metrics_item(),
             rumps.MenuItem("ℹ️ Help & Info", callback=self.show_help),            
             rumps.MenuItem("❌ Quit", callback=self.quit_app)
         ]
         
-    def create_history_submenu(self):
-        """Create transcription history submenu"""
-        submenu = rumps.MenuItem("📄 View History")
+    def create_metrics_item(self):
+        """Create the latency summary item (click for per-stage details)"""
+        self.metrics_item = rumps.MenuItem(f"📈 Latency: {self.metrics.summary_line()}", callback=self.show_metrics)
+        self.metrics.on_update = self.show_latency
+        return self.metrics_item
+
+    def show_latency(self, stage):
+        """Refresh the latency item once a release-to-clipboard span has been aggregated"""
+        if stage == "release_to_clipboard":
+            self.metrics_item.title = f"📈 Latency: {self.metrics.summary_line()}"
+    
+    def populate_history_menu(self):
+        """Fill the history submenu with the most recent transcriptions"""
+        submenu = self.history_menu
+        submenu.clear()
         
         if not self.transcription_history:
             submenu.add(rumps.MenuItem("(No transcriptions yet)", callback=None))
@@ -213,11 +426,19 @@ class EnhancedVoicePTTApp(rumps.App):
                 item = rumps.MenuItem(f"{timestamp}: {text_preview}", callback=lambda sender, idx=i: self.copy_from_history(idx))
                 submenu.add(item)
             
-            # Add separator and clear option
+            # Add search, separator and clear option
             submenu.add(rumps.separator)
+            submenu.add(rumps.MenuItem("🔍 Search History...", callback=self.search_history))
             submenu.add(rumps.MenuItem("🗑️ Clear History", callback=self.clear_history))
         
-        return submenu
+        if self.search_results:
+            submenu.add(rumps.separator)
+            submenu.add(rumps.MenuItem(f"🔍 {len(self.search_results)} match(es):", callback=None))
+            for i, entry in enumerate(self.search_results):
+                date = entry['date'][:16].replace("T", " ")
+                text_preview = entry['text'][:50] + "..." if len(entry['text']) > 50 else entry['text']
+                submenu.add(rumps.MenuItem(f"{date}: {text_preview}", callback=lambda sender, idx=i: self.copy_search_result(idx)))
+            submenu.add(rumps.MenuItem("✖️ Clear Search", callback=self.clear_search))
     
     def create_settings_submenu(self):
         """Create settings/preferences submenu"""
@@ -225,22 +446,53 @@ class EnhancedVoicePTTApp(rumps.App):
         
         # Model size submenu
         model_submenu = rumps.MenuItem("🤖 Whisper Model")
+        try:
+            resident = self.engine.resident()
+        except Exception:
+            resident = []
         for size in ["tiny", "base", "small", "medium", "large"]:
             checked = "✓ " if size == self.model_size else ""
-            item = rumps.MenuItem(f"{checked}{size.title()}", callback=lambda sender, s=size: self.change_model(s))
+            loaded = " (loaded)" if model_key(size, self.precision) in resident else ""
+            item = rumps.MenuItem(f"{checked}{size.title()}{loaded}", callback=lambda sender, s=size: self.change_model(s))
             model_submenu.add(item)
         submenu.add(model_submenu)
         
+        # Precision submenu
+        precision_submenu = rumps.MenuItem("🎚️ Precision")
+        labels = {"fp32": "FP32 (full)", "int8": "INT8 (CPU, quantized)"}
+        for precision in PRECISIONS:
+            checked = "✓ " if precision == self.precision else ""
+            item = rumps.MenuItem(f"{checked}{labels[precision]}", callback=lambda sender, p=precision: self.change_precision(p))
+            precision_submenu.add(item)
+        precision_submenu.add(rumps.separator)
+        precision_submenu.add(rumps.MenuItem("📏 Compare INT8 vs FP32", callback=self.run_precision_comparison))
+        submenu.add(precision_submenu)
+        
+        # CPU thread tuning
+        tuned = self.thread_settings["configs"].get(self.model_key)
+        label = f"🧵 Tune CPU Threads ({tuned['intra_op']} in use)" if tuned else "🧵 Tune CPU Threads"
+        submenu.add(rumps.MenuItem(label, callback=self.tune_threads))
+        
+        # Decoding profile submenu
+        profile_submenu = rumps.MenuItem("⚡ Speed / Accuracy")
+        labels = {"fast": "Fast (greedy, no fallback)", "balanced": "Balanced",
+                  "accurate": "Accurate (beam search)",
+                  "auto": f"Auto (≤ {self.profile_settings['latency_budget_s']:g}s per clip)"}
+        for profile in PROFILE_ORDER + ["auto"]:
+            checked = "✓ " if profile == self.profile_settings["profile"] else ""
+            item = rumps.MenuItem(f"{checked}{labels[profile]}", callback=lambda sender, p=profile: self.change_profile(p))
+            profile_submenu.add(item)
+        submenu.add(profile_submenu)
+        
         # Audio device submenu
         audio_submenu = rumps.MenuItem("🎤 Audio Device")
         try:
-            devices = sd.query_devices()
-            for i, device in enumerate(devices):
-                if device['max_input_channels'] > 0:  # Input devices only
-                    checked = "✓ " if i == self.audio_device else ""
-                    name = device['name'][:30] + "..." if len(device['name']) > 30 else device['name']
-                    item = rumps.MenuItem(f"{checked}{name}", callback=lambda sender, idx=i: self.change_audio_device(idx))
-                    audio_submenu.add(item)
+            for device in self.devices.inputs():  # cached; refreshed on hotplug
+                i = device['index']
+                checked = "✓ " if i == self.audio_device else ""
+                name = device['name'][:30] + "..." if len(device['name']) > 30 else device['name']
+                item = rumps.MenuItem(f"{checked}{name}", callback=lambda sender, idx=i: self.change_audio_device(idx))
+                audio_submenu.add(item)
         except:
             audio_submenu.add(rumps.MenuItem("Error loading devices", callback=None))
         submenu.add(audio_submenu)
@@ -257,36 +509,13 @@ class EnhancedVoicePTTApp(rumps.App):
         return submenu
     
     def refresh_settings_menu(self):
-        """Force menu refresh by completely rebuilding it"""
-        # Store current status
-        current_status = "Ready"
-        for item in self.menu:
-            if "Status:" in str(item.title):
-                current_status = str(item.title).replace("📊 Status: ", "")
-                break
-        
-        # Force complete menu refresh
-        self.menu.clear()
-        self.setup_menu()
-        
-        # Restore the current status
-        self.update_status(current_status)
+        """Rebuild the preferences submenu only (device list comes from the cache)"""
+        self.settings_menu.clear()
+        self.settings_menu.add(self.create_settings_submenu())
     
     def refresh_history_menu(self):
-        """Force complete menu refresh to update history (same approach as settings)"""
-        # Store current status
-        current_status = "Ready"
-        for item in self.menu:
-            if "Status:" in str(item.title):
-                current_status = str(item.title).replace("📊 Status: ", "")
-                break
-        
-        # Force complete menu refresh (same as settings refresh)
-        self.menu.clear()
-        self.setup_menu()
-        
-        # Restore the current status
-        self.update_status(current_status)
+        """Update the history submenu in place; the rest of the menu is untouched"""
+        self.populate_history_menu()
     
     def create_history_callback(self, index):
         """Create a callback function for history menu items"""
@@ -295,143 +524,301 @@ class EnhancedVoicePTTApp(rumps.App):
         return callback
     
     def update_status(self, status):
-        """Update the status message in the menu"""
-        for item in self.menu:
-            if "Status:" in str(item.title):
-                item.title = f"📊 Status: {status}"
-                break
+        """Update the status message in the menu, with the job queue depth"""
+        self.status_text = status
+        waiting, _ = self.queue_depth
+        queued = f" • {waiting} queued" if waiting else ""
+        self.status_item.title = f"📊 Status: {status}{queued}"
+
+    def show_queue_depth(self, waiting, active):
+        """Refresh the status line when jobs are queued or finish"""
+        if (waiting, active) != self.queue_depth:
+            self.queue_depth = (waiting, active)
+            self.update_status(self.status_text)
 
     # ================================
     # AUDIO & RECORDING FUNCTIONALITY
     # ================================
-    
+
+    def prefetch_model(self):
+        """Background model reload on key press; errors are logged, never raised into the listener"""
+        try:
+            self.engine.prefetch()
+        except Exception as e:
+            self.logger.warning(f"Model prefetch failed: {e}")
+
     def start_recording(self):
         """Start audio recording"""
-        if self.is_recording:
-            return
+        with self.audio_lock:
+            if self.is_recording:
+                return
             
-        self.is_recording = True
-        self.audio_buffer = []
-        self.title = "🔴"
-        self.update_status("Recording... (hold key)")
+            self.is_recording = True
+            self.recording_started_at = time.perf_counter()
+            self.title = "🔴"
+            self.update_status("Recording... (hold key)")
+            if self.load_error and not self.model_ready and not self.model_loading:
+                # The first load failed: try again while this recording waits for it
+                self.model_loading = True
+                threading.Thread(target=self.load_model, daemon=True).start()
         
-        def callback(indata, frames, time_info, status):
-            if self.is_recording:
-                with self.lock:
-                    self.audio_buffer.append(indata.copy())
+            try:
+                if self.capture.is_open:
+                    # Stream is already running: include the pre-roll window
+                    preroll = int(self.capture_settings["preroll_ms"] * SAMPLE_RATE / 1000)
+                    self.recording_start_sample = max(self.capture.position - preroll, self.capture.oldest)
+                else:
+                    # Per-press mode (or the always-on stream failed earlier)
+                    self.capture.open()
+                    self.recording_start_sample = self.capture.position
+            except Exception as e:
+                self.cancel_recording(f"Audio error: {str(e)}")
+                return
         
+            if self.streaming_settings["enabled"]:
+                self.streamer = StreamingTranscriber(
+                    self.capture, self.recording_start_sample, self.decode_segment,
+                    self.streaming_settings, on_partial=self.show_partial, logger=self.logger
+                )
+                self.streamer.start()
+            else:
+                # Whisper's input features are computed as the audio arrives
+                self.start_features()
+                if self.longform_settings["enabled"]:
+                    # Move long recordings out of the ring before it wraps
+                    spill_after = min(self.longform_settings["spill_after_s"], self.capture_settings["buffer_seconds"] / 2)
+                    self.spill_timer = threading.Timer(spill_after, self.start_spill, args=(self.recording_start_sample,))
+                    self.spill_timer.start()
+    
+    def start_features(self):
+        """Compute log-mel frames while recording, so they are ready at release"""
+        if not self.feature_settings["enabled"] or not self.features_available:
+            return
         try:
-            sd.default.device = (self.audio_device, None)
-            self.stream = sd.InputStream(
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                dtype='int16',
-                callback=callback
-            )
-            self.stream.start()
-            time.sleep(0.1)  # Brief warm-up
-        except Exception as e:
-            self.cancel_recording(f"Audio error: {str(e)}")
+            self.extractor = MelExtractor(self.capture, self.recording_start_sample, self.engine.n_mels(),
+                                          self.feature_settings, self.logger)
+        except (ImportError, OSError) as e:
+            # Without Whisper's filter bank the model computes the mel itself
+            self.logger.warning(f"Incremental features disabled: {e}")
+            self.features_available = False
+
+    def stop_features(self, end_sample=None):
+        """Finish (or with no end_sample, cancel) the feature extractor"""
+        extractor, self.extractor = self.extractor, None
+        if extractor is None:
+            return None
+        if end_sample is None:
+            extractor.cancel()
+            return None
+        return extractor.finish(end_sample)
+    
+    def start_spill(self, start_sample):
+        """Start copying the current recording to a memory-mapped file"""
+        if self.is_recording and self.spill is None:
+            self.spill = SpillWriter(self.capture, start_sample, self.longform_settings["spill_dir"],
+                                     logger=self.logger)
+    
+    def stop_spill(self):
+        """Cancel a pending spill and return the active writer, if any"""
+        if self.spill_timer:
+            self.spill_timer.cancel()
+            self.spill_timer = None
+        spill, self.spill = self.spill, None
+        return spill
     
     def stop_recording(self):
         """Stop audio recording and start transcription"""
-        if not self.is_recording:
-            return
+        with self.audio_lock:
+            if not self.is_recording:
+                return
             
-        self.is_recording = False
-        self.title = "⏳"
-        self.update_status("Processing audio...")
+            released_at = time.perf_counter()
+            self.is_recording = False
+            self.title = "⏳"
+            self.update_status("Processing audio...")
         
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
+            end_sample = self.capture.position
+            audio_s = (end_sample - self.recording_start_sample) / SAMPLE_RATE
+            self.metrics.record("capture", released_at - self.recording_started_at, audio_s)
+            spill = self.stop_spill()
+            features = self.stop_features(end_sample)
+            if self.streamer:
+                # Segments are already decoded; only the tail is left
+                streamer, self.streamer = self.streamer, None
+                fields = {"kind": "stream", "streamer": streamer, "end_sample": end_sample}
+            else:
+                if spill:
+                    # Long recording: map the spill file instead of copying the ring
+                    with self.metrics.span("concatenate", audio_s, spilled=True):
+                        audio_data = spill.finish(end_sample)
+                else:
+                    with self.metrics.span("concatenate", audio_s):
+                        audio_data = self.capture.read(self.recording_start_sample, end_sample)
+                    lost_s = audio_s - len(audio_data) / SAMPLE_RATE
+                    if lost_s > 0:
+                        # The ring wrapped during the recording and overwrote its beginning
+                        buffer_s = self.capture_settings["buffer_seconds"]
+                        self.logger.warning(f"Recording of {audio_s:.1f}s outlasted the {buffer_s}s capture buffer; "
+                                            f"first {lost_s:.1f}s lost")
+                        self.feedback.notify(f"The first {lost_s:.0f}s were lost",
+                                             subtitle=f"Recording longer than the {buffer_s}s buffer")
+                        features = None  # computed from the start that is gone
+                # The job owns this copy; nothing may write to it after submission
+                audio_data.flags.writeable = False
+                fields = {"kind": "audio", "audio": audio_data, "features": features}
+            if not self.capture_settings["always_on"]:
+                self.capture.close()
+            if fields["kind"] == "audio" and len(fields["audio"]) == 0:
+                self.cancel_recording("No audio captured")
+                return
         
-        threading.Thread(target=self.transcribe_audio, daemon=True).start()
+            try:
+                self.jobs.submit(released_at=released_at, **fields)
+            except JobQueueFull as e:
+                self.logger.warning(f"Recording dropped: {e}")
+                if fields["kind"] == "stream":
+                    threading.Thread(target=fields["streamer"].cancel, daemon=True).start()
+                self.cancel_recording("Too many recordings waiting")
+                return
+            if not self.model_ready:
+                # Held by the scheduler until load_model resumes it
+                if self.load_error:
+                    self.update_status(f"Retrying model load (last error: {self.load_error})...")
+                else:
+                    self.update_status("Waiting for the model to load...")
     
     def cancel_recording(self, reason):
         """Cancel recording with error message"""
-        self.is_recording = False
-        self.title = "🎙️"
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
-        self.update_status(f"Cancelled: {reason}")
-        subprocess.run(["afplay", "/System/Library/Sounds/Sosumi.aiff"])
-    
-    def transcribe_audio(self):
-        """Process recorded audio and convert to text"""
-        try:
-            if not self.audio_buffer:
-                self.cancel_recording("No audio captured")
-                return
+        with self.audio_lock:
+            self.is_recording = False
+            self.title = "🎙️"
+            spill = self.stop_spill()
+            if spill:
+                threading.Thread(target=spill.discard, daemon=True).start()
+            self.stop_features()
+            if self.streamer:
+                streamer, self.streamer = self.streamer, None
+                threading.Thread(target=streamer.cancel, daemon=True).start()
+            if not self.capture_settings["always_on"]:
+                self.capture.close()
+            self.update_status(f"Cancelled: {reason}")
+            self.feedback.play("Sosumi")
+    
+    def cancel_pending(self, sender):
+        """Drop every recording that has not been transcribed yet"""
+        count = self.jobs.cancel_all("cancelled from the menu")
+        self.logger.info(f"Cancelled {count} pending transcription(s)")
+        self.update_status(f"Cancelled {count} pending transcription(s)")
+
+    # ================================
+    # TRANSCRIPTION JOBS
+    # ================================
+    
+    def run_job(self, job):
+        """Scheduler worker: turn one recording into text"""
+        if job.kind == "stream":
+            self.show_job_status("Transcribing last segment...")
+            return job.streamer.finish(job.end_sample)
+        audio_s = job.audio_s
+        if audio_s <= 30:
+            self.recent_clips = (self.recent_clips + [job.audio])[-3:]
+        
+        # Transcribe (None means the VAD found no speech and the model was skipped)
+        if self.longform_settings["enabled"] and audio_s > self.longform_settings["chunk_s"]:
+            self.show_job_status(f"Transcribing {audio_s / 60:.1f} min in chunks...")
+            return self.engine.transcribe_long(job.audio, on_segment=self.show_progress)
+        self.show_job_status("Transcribing with AI...")
+        return self.engine.transcribe(job.audio, features=job.features)
+    
+    def deliver_job(self, job, status, value):
+        """Called by the scheduler in recording order once a job is done, failed or cancelled"""
+        if status == "done":
+            self.handle_transcription(value or "", job.released_at)
+        elif status == "failed":
+            self.logger.error(f"Transcription failed: {str(value)}")
+            self.report_failure(f"Transcription error: {str(value)}")
+        else:
+            self.logger.info(f"Job {job.id} cancelled: {value}")
+            if job.streamer is not None:
+                job.streamer.cancel()
+    
+    def show_job_status(self, status):
+        """Show job progress unless the user is already recording the next clip"""
+        if not self.is_recording:
+            self.update_status(status)
+    
+    def report_failure(self, reason):
+        """Report a job that produced no text without touching a recording in progress"""
+        if not self.is_recording:
+            self.title = "🎙️"
+            self.update_status(f"Cancelled: {reason}")
+        self.feedback.play("Sosumi")
+    
+    def decode_segment(self, audio_data, prompt):
+        """Transcribe one streaming segment, using earlier text as context"""
+        return self.engine.transcribe(audio_data, prompt=prompt) or ""
+    
+    def show_progress(self, text, start_s, end_s):
+        """Show how far a long transcription has got"""
+        self.show_job_status(f"Transcribed {end_s / 60:.1f} min so far...")
+    
+    def show_partial(self, text):
+        """Show streaming text in the status line while still recording"""
+        preview = "..." + text[-47:] if len(text) > 50 else text
+        self.update_status(f"🔴 {preview}")
+    
+    def handle_transcription(self, text, released_at):
+        """Output a finished transcription, then queue feedback and history work"""
+        if text:
+            # Log to general log for debugging
+            self.logger.info(f"Transcription successful: {len(text)} characters")
             
-            # Process audio
-            audio_data = np.concatenate(self.audio_buffer, axis=0)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-                with wave.open(f.name, 'wb') as wf:
-                    wf.setnchannels(CHANNELS)
-                    wf.setsampwidth(2)
-                    wf.setframerate(SAMPLE_RATE)
-                    wf.writeframes(audio_data.tobytes())
-                
-                # Transcribe
-                self.update_status("Transcribing with AI...")
-                result = self.model.transcribe(f.name, language="en")
-                text = result["text"].strip()
-                
-                if text:
-                    # Log to general log for debugging
-                    self.logger.info(f"Transcription successful: {len(text)} characters")
-                    
-                    # Save transcription to dedicated file
-                    self.save_transcription(text)
-                    
-                    # Store in history
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    history_entry = {
-                        "text": text,
-                        "timestamp": timestamp,
-                        "date": datetime.now().isoformat()
-                    }
-                    self.transcription_history.append(history_entry)
-                    
-                    # Keep only last 10 items in memory
-                    if len(self.transcription_history) > 10:
-                        self.transcription_history = self.transcription_history[-10:]
-                    
-                    # Update menu to refresh history
-                    self.refresh_history_menu()
-                    
-                    # Output text
-                    pyperclip.copy(text)
-                    if self.mode == "paste":
-                        time.sleep(0.2)  # Brief delay
-                        subprocess.run(["osascript", "-e", 
-                                      'tell application "System Events" to keystroke "v" using command down'])
-                    
-                    # Success feedback
-                    self.title = "✅"
-                    self.update_status(f"✅ Transcribed • {len(text)} chars • {self.mode}")
-                    subprocess.run(["afplay", "-v", "0.3", "/System/Library/Sounds/Blow.aiff"])
-                    
-                    # Show notification with preview
-                    preview = text[:50] + "..." if len(text) > 50 else text
-                    subprocess.run(["osascript", "-e", 
-                                  f'display notification "{preview}" with title "VoicePTT" subtitle "{self.mode.title()}d to clipboard"'])
-                    
-                    # Reset after delay
-                    threading.Timer(3.0, self.reset_to_ready).start()
-                else:
-                    self.cancel_recording("No speech detected")
-                    
-        except Exception as e:
-            self.logger.error(f"Transcription failed: {str(e)}")
-            self.cancel_recording(f"Transcription error: {str(e)}")
+            # Output text first: this is the only step the user is waiting for
+            self.feedback.output(text, paste=self.mode == "paste", released_at=released_at)
+            
+            # Success feedback
+            if not self.is_recording:
+                self.title = "✅"
+                self.update_status(f"✅ Transcribed • {len(text)} chars • {self.mode}")
+            self.feedback.play("Blow", volume=0.3)
+            
+            # Show notification with preview
+            preview = text[:50] + "..." if len(text) > 50 else text
+            self.feedback.notify(preview, subtitle=f"{self.mode.title()}d to clipboard")
+            
+            # Save and show in history off the transcription thread
+            self.feedback.submit(self.record_history, text, datetime.now())
+            
+            # Reset after delay
+            threading.Timer(3.0, self.reset_to_ready).start()
+        else:
+            self.report_failure("No speech detected")
+    
+    def record_history(self, text, when):
+        """Persist a transcription and add it to the history menu"""
+        # Queue for the next batched database write
+        if self.history:
+            self.history.add(text, when)
+        
+        # Store in history
+        history_entry = {
+            "text": text,
+            "timestamp": when.strftime("%H:%M:%S"),
+            "date": when.isoformat()
+        }
+        self.transcription_history.append(history_entry)
+        
+        # Keep only last 10 items in memory
+        if len(self.transcription_history) > 10:
+            self.transcription_history = self.transcription_history[-10:]
+        
+        # Update menu to refresh history
+        self.refresh_history_menu()
     
     def reset_to_ready(self):
         """Reset app to ready state"""
+        if self.is_recording or self.queue_depth != (0, 0):
+            return  # the next recording or job owns the status line
         self.title = "🎙️"
         self.update_status(f"Ready • Hold {self.hotkey.replace('_', '+').upper()} to speak")
 
@@ -454,8 +841,11 @@ class EnhancedVoicePTTApp(rumps.App):
         
         def on_press(key):
             target_key = get_key_from_string(self.hotkey)
-            if key == target_key and not self.is_recording and self.model:
+            # Presses while the first model loads are recorded and queued
+            if key == target_key and not self.is_recording:
                 self.recording_start_time = time.time()
+                # Reload an idle-unloaded model while the user is speaking
+                threading.Thread(target=self.prefetch_model, daemon=True).start()
                 self.start_recording()
         
         def on_release(key):
@@ -484,8 +874,7 @@ class EnhancedVoicePTTApp(rumps.App):
         self.mode = "paste" if self.mode == "copy" else "copy"
         sender.title = f"📋 Output: {self.mode.upper()}"
         self.save_settings()
-        subprocess.run(["osascript", "-e", 
-                      f'display notification "Output mode: {self.mode.upper()}" with title "VoicePTT"'])
+        self.feedback.notify(f"Output mode: {self.mode.upper()}")
     
     def copy_from_history(self, index):
         """Copy text from transcription history"""
@@ -495,18 +884,42 @@ class EnhancedVoicePTTApp(rumps.App):
             if 0 <= index < len(recent_items):
                 text = recent_items[index]["text"]
                 pyperclip.copy(text)
-                subprocess.run(["osascript", "-e", 
-                              'display notification "Copied from history!" with title "VoicePTT"'])
+                self.feedback.notify("Copied from history!")
         except (IndexError, KeyError):
-            subprocess.run(["osascript", "-e", 
-                          'display notification "Error copying from history" with title "VoicePTT"'])
+            self.feedback.notify("Error copying from history")
+    
+    def search_history(self, sender):
+        """Full-text search over the whole history; matches appear in the history menu"""
+        if not self.history:
+            return
+        response = rumps.Window("Find transcriptions containing:", "Search History",
+                                ok="Search", cancel="Cancel", dimensions=(280, 24)).run()
+        query = response.text.strip()
+        if not response.clicked or not query:
+            return
+        self.search_results = self.history.search(query)
+        self.logger.info(f"History search for {query!r}: {len(self.search_results)} matches")
+        self.refresh_history_menu()
+        if not self.search_results:
+            self.feedback.notify(f"No transcriptions match \"{query}\"")
+    
+    def copy_search_result(self, index):
+        """Copy one search match to the clipboard"""
+        if 0 <= index < len(self.search_results):
+            pyperclip.copy(self.search_results[index]["text"])
+            self.feedback.notify("Copied from history!")
+    
+    def clear_search(self, sender):
+        """Remove search matches from the history menu"""
+        self.search_results = []
+        self.refresh_history_menu()
     
     def clear_history(self, sender):
         """Clear all transcription history with confirmation"""
         # Show confirmation dialog
         response = rumps.alert(
             "Clear Transcription History",
-            "Are you sure you want to clear all transcription history?\n\nThis will:\n• Remove all items from the menu\n• Clear the transcription file\n\nThis action cannot be undone.",
+            "Are you sure you want to clear all transcription history?\n\nThis will:\n• Remove all items from the menu\n• Delete every saved transcription\n\nThis action cannot be undone.",
             ok="Clear History",
             cancel="Cancel"
         )
@@ -515,24 +928,85 @@ class EnhancedVoicePTTApp(rumps.App):
             try:
                 # Clear in-memory history
                 self.transcription_history.clear()
+                self.search_results = []
                 self.logger.info("Cleared in-memory transcription history")
                 
-                # Clear the transcription file
-                with open('voiceptt_transcriptions.txt', 'w', encoding='utf-8') as f:
-                    f.write("")  # Empty the file
-                self.logger.info("Cleared transcription file")
+                # Clear the history database
+                if self.history:
+                    self.history.clear()
+                self.logger.info("Cleared transcription history database")
                 
                 # Refresh menu to show empty state
                 self.refresh_history_menu()
                 
                 # Show success notification
-                subprocess.run(["osascript", "-e", 
-                              'display notification "Transcription history cleared!" with title "VoicePTT"'])
+                self.feedback.notify("Transcription history cleared!")
                 
             except Exception as e:
                 self.logger.error(f"Error clearing history: {e}")
-                subprocess.run(["osascript", "-e", 
-                              'display notification "Error clearing history!" with title "VoicePTT"'])
+                self.feedback.notify("Error clearing history!")
+    
+    def run_precision_comparison(self, sender):
+        """Benchmark INT8 against FP32 on recent recordings in background"""
+        if not self.recent_clips:
+            self.feedback.notify("Record something first to compare precisions")
+            return
+        
+        def compare():
+            try:
+                self.update_status("Comparing INT8 vs FP32...")
+                report = compare_precision(self.model_size, list(self.recent_clips),
+                                           os.path.expanduser(self.model_pool_settings["cache_dir"]), self.logger)
+                with open("voiceptt_precision_report.json", "w") as f:
+                    json.dump(report, f, indent=2)
+                fp32, int8 = report["fp32"], report["int8"]
+                speedup = sum(fp32["latency_s"]) / max(sum(int8["latency_s"]), 1e-6)
+                diff = sum(report["word_difference"]) / len(report["word_difference"])
+                summary = (f"Load {fp32['load_s']:.1f}s → {int8['load_s']:.1f}s • "
+                           f"{speedup:.1f}x faster • {diff:.0%} words differ")
+                self.update_status(summary)
+                self.feedback.notify(summary, subtitle=f"INT8 vs FP32 ({self.model_size})")
+            except Exception as e:
+                self.logger.error(f"Precision comparison failed: {e}")
+                self.update_status(f"Comparison error: {str(e)}")
+        
+        threading.Thread(target=compare, daemon=True).start()
+    
+    def tune_threads(self, sender):
+        """Benchmark torch thread counts for the current model in background"""
+        if not hasattr(self.engine, "autotune"):
+            self.feedback.notify("Thread tuning runs in the daemon: python -m voiceptt.tuning")
+            return
+        
+        def tune():
+            key = self.model_key
+            try:
+                self.update_status(f"Tuning CPU threads for {key}...")
+                # Prefer the user's own recent speech as the reference clip
+                clips = [c for c in self.recent_clips if len(c) >= 3 * SAMPLE_RATE]
+                report = self.engine.autotune(clips[-1] if clips else None)
+                self.save_settings()
+                summary = summarize(key, report)
+                self.update_status(summary)
+                self.feedback.notify(summary, subtitle="CPU threads tuned")
+                self.refresh_settings_menu()
+            except Exception as e:
+                self.logger.error(f"Thread tuning failed: {e}")
+                self.update_status(f"Tuning error: {str(e)}")
+        
+        threading.Thread(target=tune, daemon=True).start()
+    
+    def show_metrics(self, sender):
+        """Show per-stage latency percentiles"""
+        stats = self.metrics.snapshot()
+        if not stats:
+            rumps.alert("VoicePTT Latency", "No measurements yet. Dictate something first!", ok="Close")
+            return
+        lines = []
+        for stage, s in stats.items():
+            rtf = f" • RTF {s['rtf_p50']:.2f}" if s["rtf_p50"] is not None else ""
+            lines.append(f"• {stage}: p50 {s['p50_ms']:.0f} ms / p95 {s['p95_ms']:.0f} ms (n={s['count']}){rtf}")
+        rumps.alert("VoicePTT Latency", "\n".join(lines), ok="Close")
     
     def show_help(self, sender):
         """Show help dialog"""
@@ -555,8 +1029,8 @@ class EnhancedVoicePTTApp(rumps.App):
 🎯 CURRENT SETTINGS:
 • Hotkey: {self.hotkey.replace('_', '+').upper()}
 • Output: {self.mode.upper()}
-• Model: {self.model_size.title()}
-• Device: {sd.query_devices()[self.audio_device]['name'][:30]}
+• Model: {self.model_size.title()} ({self.precision.upper()}, {self.profile_settings['profile']})
+• Device: {self.devices.name(self.audio_device)[:30]}
 
 💡 TIP: Use Settings menu to customize everything!"""
         
@@ -566,7 +1040,37 @@ class EnhancedVoicePTTApp(rumps.App):
         """Quit the application"""
         if hasattr(self, 'keyboard_listener'):
             self.keyboard_listener.stop()
+        self.capture.close()
+        if self.daemon:
+            self.daemon.stop()
+        if isinstance(self.engine, WorkerEngine):
+            self.engine.stop()
+        self.feedback.stop()
+        if self.history:
+            self.history.close()
+        self.metrics.stop()
         rumps.quit_application()
 
 if __name__ == "__main__":
-    EnhancedVoicePTTApp().run()
\ No newline at end of file
+    if sys.argv[1:2] == ["transcribe"]:
+        # Offline bulk mode: python run_ptt.py transcribe <files or folders> [options]
+        from voiceptt.bulk import main as bulk_main
+        sys.exit(bulk_main(sys.argv[2:]))
+    if "--profile-startup" in sys.argv:
+        # Print import/init/model timings once the model is loaded, then quit
+        class ProfiledApp(EnhancedVoicePTTApp):
+            def on_model_load_finished(self):
+                self.profiler.report()
+                self.quit_app(None)
+        
+        profiler = StartupProfiler(_STARTED_AT)
+        app = ProfiledApp(profiler)
+        if hasattr(rumps, "Timer"):
+            # Fires on the first run-loop pass, i.e. once the icon is in the menu bar
+            def first_tick(timer):
+                timer.stop()
+                profiler.mark("menu bar drawn")
+            rumps.Timer(first_tick, 0.01).start()
+        app.run()
+    else:
+        EnhancedVoicePTTApp().run()
\ No newline at end of file
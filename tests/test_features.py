@@ -0,0 +1,46 @@
+"""Incremental log-mel features against whisper.log_mel_spectrogram"""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+whisper = pytest.importorskip("whisper")
+
+from bench.fixtures import _speech_like
+from bench.mel_check import extract
+from voiceptt.audio import SAMPLE_RATE, pcm_to_float32
+from voiceptt.features import N_SAMPLES, log_mel
+
+TOLERANCE = 1e-3
+
+
+def reference(pcm, n_mels):
+    audio = torch.from_numpy(pcm_to_float32(pcm))
+    return whisper.log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES).numpy()
+
+
+@pytest.fixture(scope="module")
+def clip():
+    return _speech_like(7.3, 3)
+
+
+@pytest.mark.parametrize("n_mels", [80, 128])
+def test_log_mel_matches_whisper(clip, n_mels):
+    expected = reference(clip, n_mels)
+    mel = log_mel(clip, n_mels)
+    assert mel.shape == expected.shape
+    assert np.abs(mel - expected).max() <= TOLERANCE
+
+
+def test_log_mel_accepts_float32(clip):
+    assert np.abs(log_mel(pcm_to_float32(clip)) - reference(clip, 80)).max() <= TOLERANCE
+
+
+@pytest.mark.parametrize("n_mels", [80, 128])
+@pytest.mark.parametrize("span", [(0, None), (SAMPLE_RATE // 2, None), (1234, 5 * SAMPLE_RATE + 77)])
+def test_extractor_spans_match_whisper(clip, n_mels, span):
+    start, end = span[0], span[1] or len(clip)
+    features, _ = extract(clip, n_mels)
+    mel = features.mel(clip, (start, end))
+    expected = reference(clip[start:end], n_mels)
+    assert mel.shape == expected.shape
+    assert np.abs(mel - expected).max() <= TOLERANCE
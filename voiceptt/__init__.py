@@ -0,0 +1 @@
+"""VoicePTT engine components shared by the menu-bar app and its tools"""
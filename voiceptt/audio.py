@@ -0,0 +1,165 @@
+"""Audio capture: an always-open input stream feeding a preallocated ring buffer"""
+import threading
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHANNELS = 1
+
+DEFAULT_CAPTURE_SETTINGS = {
+    "always_on": True,       # keep one input stream open between recordings
+    "preroll_ms": 300,       # audio kept from before the hotkey press
+    "buffer_seconds": 300,   # ring buffer capacity (longest single recording)
+    "device_poll_s": 3,      # how often to check for plugged/unplugged devices (0 disables)
+}
+
+
+def pcm_to_float32(pcm):
+    """Convert int16 PCM to the float32 [-1, 1) samples Whisper expects"""
+    # Single vectorized pass, one output allocation, no intermediate int copy
+    return np.multiply(pcm, np.float32(1.0 / 32768.0), dtype=np.float32)
+
+
+def float32_to_pcm(audio):
+    """Convert float32 [-1, 1] samples back to int16 PCM"""
+    return (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+
+def write_wav(path, pcm):
+    """Write int16 mono PCM to a WAV file"""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+
+
+def read_wav(path):
+    """Read a 16 kHz mono 16-bit WAV file into int16 PCM"""
+    with wave.open(path, 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != CHANNELS or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz mono 16-bit WAV")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def load_audio_file(path):
+    """Read any audio file as 16 kHz int16 PCM (WAV directly, other formats via ffmpeg)"""
+    if path.lower().endswith(".wav"):
+        try:
+            return read_wav(path)
+        except (ValueError, wave.Error):
+            pass  # not 16 kHz mono 16-bit: let ffmpeg resample it
+    import whisper
+    return float32_to_pcm(whisper.load_audio(path))
+
+
+class RingBuffer:
+    """Fixed-size int16 ring buffer addressed by absolute sample index"""
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0  # total samples ever written, never wraps
+
+    @property
+    def oldest(self):
+        """Absolute index of the oldest sample still held"""
+        return max(0, self.written - self.capacity)
+
+    def write(self, samples):
+        """Copy samples into the ring in place (no allocation)"""
+        n = len(samples)
+        if n > self.capacity:
+            self.written += n - self.capacity
+            samples = samples[n - self.capacity:]
+            n = self.capacity
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.data[pos:pos + first] = samples[:first]
+        if first < n:
+            self.data[:n - first] = samples[first:]
+        # Publish only after the samples are in place
+        self.written += n
+
+    def read(self, start, end=None):
+        """Return a contiguous copy of samples [start, end)"""
+        if end is None:
+            end = self.written
+        start = max(start, self.oldest)
+        end = min(end, self.written)
+        n = max(0, end - start)
+        out = np.empty(n, dtype=np.int16)
+        pos = start % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:first] = self.data[pos:pos + first]
+        out[first:] = self.data[:n - first]
+        return out
+
+
+class AudioCapture:
+    """Owns the input stream and the ring buffer its callback writes into"""
+
+    def __init__(self, device=None, buffer_seconds=300, logger=None):
+        self.device = device
+        self.ring = RingBuffer(int(buffer_seconds * SAMPLE_RATE))
+        self.logger = logger
+        self.stream = None
+        self.overflows = 0
+        self.stream_lock = threading.Lock()  # guards open/close, never taken in the callback
+
+    @property
+    def is_open(self):
+        return self.stream is not None
+
+    @property
+    def position(self):
+        """Absolute index of the next sample to be captured"""
+        return self.ring.written
+
+    @property
+    def oldest(self):
+        return self.ring.oldest
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.ring.write(indata[:, 0])
+
+    def open(self):
+        """Open and start the input stream if it is not running yet"""
+        import sounddevice as sd
+        with self.stream_lock:
+            if self.stream is not None:
+                return
+            stream = sd.InputStream(
+                samplerate=SAMPLE_RATE,
+                channels=CHANNELS,
+                dtype='int16',
+                device=self.device,
+                callback=self._callback
+            )
+            stream.start()
+            self.stream = stream
+        if self.logger:
+            self.logger.info(f"Audio input stream opened on device {self.device}")
+
+    def close(self):
+        """Stop and close the input stream"""
+        with self.stream_lock:
+            stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+    def set_device(self, device):
+        """Switch input device, reopening the stream if it was running"""
+        was_open = self.is_open
+        self.close()
+        self.device = device
+        if was_open:
+            self.open()
+
+    def read(self, start, end=None):
+        """Copy captured samples [start, end) out of the ring"""
+        return self.ring.read(start, end)
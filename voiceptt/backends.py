@@ -0,0 +1,108 @@
+"""Inference backends: how models are loaded and how they turn audio into text
+
+The engine and model pool only reach a model through its backend: load(), transcribe(),
+decode_batch(), encode_batch(), decode_encoded(), warm_up(), size_mb(), n_mels() and
+apply_threads(). "torch" is
+openai-whisper on PyTorch, as before. "onnx" runs exported encoder/decoder graphs
+on ONNX Runtime with a cached decoder KV state (voiceptt/onnx_whisper.py) and
+never imports torch.
+"""
+import os
+
+from voiceptt.features import precomputed_mel
+from voiceptt.models import load_variant, model_size_mb, warm_up
+from voiceptt.profiles import decode_options
+
+
+class TorchBackend:
+    """openai-whisper models (fp32 checkpoints or cached int8) on PyTorch"""
+    name = "torch"
+    imports = ("torch", "numba", "tiktoken", "whisper")  # heavy modules to import off the main thread
+
+    def __init__(self, settings):
+        self.cache_dir = settings["cache_dir"]
+
+    def load(self, key):
+        return load_variant(key, self.cache_dir)
+
+    def size_mb(self, model):
+        return model_size_mb(model)
+
+    def warm_up(self, model):
+        warm_up(model)
+
+    def n_mels(self, model):
+        return model.dims.n_mels
+
+    def apply_threads(self, config):
+        from voiceptt.tuning import apply_threads
+        apply_threads(config)
+
+    def transcribe(self, model, audio, prompt=None, profile="balanced", mel=None):
+        """Text of one clip (float32 samples or a WAV path) under a decoding profile"""
+        with precomputed_mel(audio, mel):
+            result = model.transcribe(audio, language="en", initial_prompt=prompt or None,
+                                      **decode_options(profile, model))
+        return result["text"].strip()
+
+    def decode_batch(self, model, clips):
+        from voiceptt.batching import decode_batch
+        return decode_batch(model, clips)
+
+    def encode_batch(self, model, clips):
+        """Encoder output for up to 30 s clips in one pass, one entry per clip"""
+        from voiceptt.batching import encode_batch
+        return encode_batch(model, clips)
+
+    def decode_encoded(self, model, features, prompt=None, profile="balanced"):
+        """Text of one encode_batch() entry under a decoding profile"""
+        from voiceptt.batching import decode_encoded
+        return decode_encoded(model, features, prompt, **decode_options(profile, model))
+
+
+class OnnxBackend(TorchBackend):
+    """Exported Whisper graphs on ONNX Runtime (CPU)"""
+    name = "onnx"
+    imports = ("onnxruntime", "tiktoken")
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.threads = settings.get("onnx_threads", 0)
+
+    def load(self, key):
+        from voiceptt.onnx_whisper import load_onnx
+        size, _, precision = key.partition(":")
+        return load_onnx(size, precision or "fp32", os.path.expanduser(self.cache_dir), self.threads)
+
+    def size_mb(self, model):
+        return model.size_mb
+
+    def apply_threads(self, config):
+        pass  # torch thread counts do not apply; sessions use models.onnx_threads
+
+    def transcribe(self, model, audio, prompt=None, profile="balanced", mel=None):
+        result = model.transcribe(audio, language="en", initial_prompt=prompt or None, mel=mel,
+                                  **decode_options(profile, model))
+        return result["text"].strip()
+
+    def decode_batch(self, model, clips):
+        return model.decode_batch(clips)
+
+    def encode_batch(self, model, clips):
+        return model.encode_batch(clips)
+
+    def decode_encoded(self, model, features, prompt=None, profile="balanced"):
+        result = model.transcribe_encoded(features, language="en", initial_prompt=prompt or None,
+                                          **decode_options(profile, model))
+        return result["text"].strip()
+
+
+BACKENDS = {"torch": TorchBackend, "onnx": OnnxBackend}
+
+
+def create_backend(settings):
+    """Backend named by the models section's "backend" setting"""
+    name = settings.get("backend", "torch")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](settings)
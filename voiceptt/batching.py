@@ -0,0 +1,149 @@
+"""Batch scheduler that decodes queued utterances together on one Whisper model"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, pcm_to_float32
+
+DEFAULT_BATCHING_SETTINGS = {
+    "enabled": False,
+    "window_ms": 150,   # how long to wait for more clips after the first one arrives
+    "max_batch": 8,
+}
+
+
+def batch_log_mel(clips, n_mels, device):
+    """Log-mel spectrograms of up to 30 s clips, computed as one (B, n_mels, 3000) batch"""
+    import torch
+    from whisper.audio import HOP_LENGTH, N_FFT, N_SAMPLES, mel_filters
+
+    audio = np.zeros((len(clips), N_SAMPLES), dtype=np.float32)
+    for row, clip in zip(audio, clips):
+        row[:len(clip)] = pcm_to_float32(clip[:N_SAMPLES])
+    audio = torch.from_numpy(audio).to(device)
+    window = torch.hann_window(N_FFT).to(device)
+    stft = torch.stft(audio, N_FFT, HOP_LENGTH, window=window, return_complex=True)
+    magnitudes = stft[..., :-1].abs() ** 2
+    log_spec = torch.clamp(mel_filters(device, n_mels) @ magnitudes, min=1e-10).log10()
+    # Whisper normalizes against each clip's own peak, not the batch's
+    log_spec = torch.maximum(log_spec, log_spec.amax(dim=(1, 2), keepdim=True) - 8.0)
+    return (log_spec + 4.0) / 4.0
+
+
+def decode_batch(model, clips):
+    """Run the encoder and greedy decoder over a batch of clips, returning texts in order"""
+    import whisper
+    mel = batch_log_mel(clips, model.dims.n_mels, model.device)
+    options = whisper.DecodingOptions(language="en", without_timestamps=True,
+                                      fp16=model.device.type != "cpu")
+    return [result.text.strip() for result in whisper.decode(model, mel, options)]
+
+
+def encode_batch(model, clips):
+    """Encoder output of up to 30 s clips, computed as one batch (one tensor per clip)"""
+    import torch
+    mel = batch_log_mel(clips, model.dims.n_mels, model.device)
+    if model.device.type != "cpu":
+        mel = mel.half()  # matches decode_options()' fp16
+    with torch.no_grad():
+        return list(model.embed_audio(mel))
+
+
+def decode_encoded(model, features, prompt=None, **options):
+    """Text of one window from encode_batch(), decoded like model.transcribe() under options
+
+    options are a profile's decode_options(). Retries at the next temperature while the
+    text is too repetitive or unlikely, and returns "" for a window judged silent.
+    """
+    import whisper
+    from voiceptt.onnx_whisper import COMPRESSION_RATIO_THRESHOLD, LOGPROB_THRESHOLD, NO_SPEECH_THRESHOLD
+
+    temperature = options.pop("temperature", 0.0)
+    options.pop("condition_on_previous_text", None)  # a transcribe() option; prompt is passed directly
+    for t in (temperature,) if isinstance(temperature, (int, float)) else temperature:
+        kwargs = dict(options)
+        if t > 0:
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            kwargs.pop("best_of", None)
+        result = whisper.decode(model, features, whisper.DecodingOptions(
+            language="en", without_timestamps=True, prompt=prompt or None, temperature=t, **kwargs))
+        silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+        if silent or (result.compression_ratio <= COMPRESSION_RATIO_THRESHOLD
+                      and result.avg_logprob >= LOGPROB_THRESHOLD):
+            break
+    return "" if silent else result.text.strip()
+
+
+class BatchScheduler:
+    """Collects clips for a short window, decodes them together, resolves each future in order"""
+
+    def __init__(self, decode, settings, logger=None):
+        self.decode = decode  # decode(list_of_pcm) -> list_of_text
+        self.settings = settings
+        self.logger = logger
+        self.pending = queue.Queue()
+        self.stats = {}  # batch size -> {"batches", "audio_s", "decode_s"}
+        self.stats_lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, pcm):
+        """Queue a clip; the returned Future resolves to its text"""
+        future = Future()
+        self.pending.put((pcm, future))
+        return future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.settings["window_ms"] / 1000
+        while len(batch) < self.settings["max_batch"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            clips = [pcm for pcm, _ in batch]
+            start = time.perf_counter()
+            try:
+                texts = self.decode(clips)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+            self._record(len(batch), sum(len(c) for c in clips) / SAMPLE_RATE, elapsed)
+
+    def _record(self, size, audio_s, decode_s):
+        with self.stats_lock:
+            entry = self.stats.setdefault(size, {"batches": 0, "audio_s": 0.0, "decode_s": 0.0})
+            entry["batches"] += 1
+            entry["audio_s"] += audio_s
+            entry["decode_s"] += decode_s
+        if self.logger:
+            self.logger.info(f"Decoded batch of {size}: {audio_s:.1f}s audio in {decode_s:.2f}s "
+                             f"({size / decode_s:.1f} clips/s)")
+
+    def throughput(self):
+        """Clips/s and audio-seconds/s for each batch size seen so far"""
+        with self.stats_lock:
+            return {
+                size: {
+                    "batches": e["batches"],
+                    "clips_per_s": size * e["batches"] / e["decode_s"] if e["decode_s"] else 0.0,
+                    "audio_s_per_s": e["audio_s"] / e["decode_s"] if e["decode_s"] else 0.0,
+                }
+                for size, e in sorted(self.stats.items())
+            }
@@ -0,0 +1,218 @@
+"""Offline bulk transcription of files and folders across a pool of model replicas
+
+    python run_ptt.py transcribe ~/Meetings memo.m4a --workers 3 --output meetings.jsonl
+
+Each worker process loads one replica of the configured model. The replica count is
+capped by the RAM budget and the CPU count, and torch threads are split evenly
+between replicas. Results are streamed as JSON lines (and optionally one .txt per
+file) as soon as each file finishes. A manifest records finished files, so an
+interrupted run resumes where it stopped.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from voiceptt.audio import SAMPLE_RATE, load_audio_file
+
+AUDIO_EXTENSIONS = (".wav", ".m4a", ".mp3", ".aac", ".flac", ".ogg", ".opus", ".aiff", ".caf",
+                    ".mp4", ".mov", ".webm")
+
+DEFAULT_BULK_SETTINGS = {
+    "workers": 0,         # model replicas; 0 picks as many as RAM and CPUs allow
+    "ram_budget_mb": 0,   # memory for all replicas; 0 uses models.ram_budget_mb
+}
+
+_engine = None  # the worker process's TranscriptionEngine
+
+
+def collect_files(paths, extensions=AUDIO_EXTENSIONS):
+    """Audio files named directly or found under the given directories, in stable order"""
+    files = []
+    for path in paths:
+        path = os.path.abspath(os.path.expanduser(path))
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                files += [os.path.join(root, n) for n in sorted(names)
+                          if n.lower().endswith(extensions) and not n.startswith(".")]
+        elif os.path.isfile(path):
+            files.append(path)
+    return list(dict.fromkeys(files))
+
+
+def replica_count(requested, key, budget_mb, cpu_count=None):
+    """How many model replicas fit the RAM budget and the CPUs"""
+    from voiceptt.models import estimate_mb
+    cpu_count = cpu_count or os.cpu_count() or 1
+    by_memory = max(1, int(budget_mb // estimate_mb(key)))
+    if requested:
+        return max(1, min(requested, by_memory))
+    # Whisper is compute bound: more than one replica per two cores rarely helps
+    return max(1, min(by_memory, cpu_count // 2))
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_manifest(path):
+    """Files already transcribed: path -> signature when it was done"""
+    done = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # partial last line from an interrupted run
+                done[entry["path"]] = {"size": entry["size"], "mtime_ns": entry["mtime_ns"]}
+    return done
+
+
+def _init_worker(settings, threads):
+    """Process-pool initializer: load this worker's model replica"""
+    global _engine
+    from voiceptt.batching import DEFAULT_BATCHING_SETTINGS
+    from voiceptt.engine import TranscriptionEngine
+    from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS
+    from voiceptt.profiles import DEFAULT_PROFILE_SETTINGS
+    from voiceptt.vad import DEFAULT_VAD_SETTINGS
+    models = {**DEFAULT_MODEL_POOL_SETTINGS, **settings.get("models", {})}
+    if models["backend"] == "torch":
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+    _engine = TranscriptionEngine(
+        model_size=settings.get("model_size", "small"),
+        precision=settings.get("precision", "fp32"),
+        # One replica per process: never evict or idle-unload it mid-run
+        model_settings=dict(models, idle_unload_s=0, warmup=False, onnx_threads=threads),
+        vad_settings={**DEFAULT_VAD_SETTINGS, **settings.get("vad", {})},
+        batching_settings=dict(DEFAULT_BATCHING_SETTINGS, enabled=False),
+        profile_settings={**DEFAULT_PROFILE_SETTINGS, **settings.get("profiles", {})},
+    )
+    _engine.load()
+
+
+def _transcribe_file(path):
+    """Worker task: decode and transcribe one file"""
+    start = time.perf_counter()
+    try:
+        pcm = load_audio_file(path)
+        audio_s = len(pcm) / SAMPLE_RATE
+        if audio_s > 30:
+            text = _engine.transcribe_chunks(pcm)
+        else:
+            text = _engine.transcribe(pcm)
+    except Exception as e:
+        return {"path": path, "error": str(e), "seconds": time.perf_counter() - start}
+    seconds = time.perf_counter() - start
+    return {"path": path, "text": text or "", "audio_s": audio_s, "seconds": seconds,
+            "rtf": seconds / audio_s if audio_s else None, "pid": os.getpid()}
+
+
+def write_text(text_dir, root_paths, result):
+    """Write <text_dir>/<name>.txt, keeping the layout below the input directory"""
+    path = result["path"]
+    base = next((os.path.dirname(os.path.abspath(p)) for p in root_paths
+                 if path.startswith(os.path.abspath(p).rstrip(os.sep) + os.sep)), os.path.dirname(path))
+    out = os.path.join(text_dir, os.path.splitext(os.path.relpath(path, base))[0] + ".txt")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(result["text"] + "\n")
+
+
+def run(paths, settings, workers=0, output="voiceptt_bulk.jsonl", manifest=None, text_dir=None, log=print):
+    """Transcribe every file under paths, skipping ones the manifest lists as done"""
+    from voiceptt.models import model_key
+    bulk = {**DEFAULT_BULK_SETTINGS, **settings.get("bulk", {})}
+    manifest = manifest or output + ".manifest"
+    files = collect_files(paths)
+    done = load_manifest(manifest)
+    todo = [f for f in files if done.get(f) != file_signature(f)]
+    log(f"{len(files)} files, {len(files) - len(todo)} already done, {len(todo)} to transcribe")
+    if not todo:
+        return {"files": 0, "failed": 0, "audio_s": 0.0, "wall_s": 0.0, "rtf": None}
+
+    key = model_key(settings.get("model_size", "small"), settings.get("precision", "fp32"))
+    budget = bulk["ram_budget_mb"] or settings.get("models", {}).get("ram_budget_mb", 4096)
+    replicas = min(replica_count(workers or bulk["workers"], key, budget), len(todo))
+    threads = max(1, (os.cpu_count() or 1) // replicas)
+    log(f"Starting {replicas} {key} replica(s), {threads} thread(s) each")
+
+    start = time.perf_counter()
+    audio_s = busy_s = 0.0
+    finished = failed = 0
+    context = multiprocessing.get_context("spawn")  # fork is unsafe once torch has threads
+    with ProcessPoolExecutor(replicas, mp_context=context, initializer=_init_worker,
+                             initargs=(settings, threads)) as pool, \
+            open(output, "a", encoding="utf-8") as out, open(manifest, "a", encoding="utf-8") as record:
+        # Longest files first so one big file does not finish alone at the end
+        todo.sort(key=lambda f: os.path.getsize(f), reverse=True)
+        futures = [pool.submit(_transcribe_file, f) for f in todo]
+        for future in as_completed(futures):
+            result = future.result()
+            finished += 1
+            if "error" in result:
+                failed += 1
+                log(f"[{finished}/{len(todo)}] FAILED {result['path']}: {result['error']}")
+                continue
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            if text_dir:
+                write_text(text_dir, paths, result)
+            record.write(json.dumps({"path": result["path"], **file_signature(result["path"])}) + "\n")
+            record.flush()
+            audio_s += result["audio_s"]
+            busy_s += result["seconds"]
+            log(f"[{finished}/{len(todo)}] {result['audio_s']:7.1f}s audio, RTF {result['rtf'] or 0:.2f}  "
+                f"{result['path']}")
+    wall_s = time.perf_counter() - start
+    summary = {"files": finished - failed, "failed": failed, "replicas": replicas, "audio_s": audio_s,
+               "wall_s": wall_s, "rtf": wall_s / audio_s if audio_s else None,
+               "worker_rtf": busy_s / audio_s if audio_s else None}
+    if audio_s:
+        log(f"Transcribed {summary['files']} files ({audio_s / 60:.1f} min audio) in {wall_s:.1f}s: "
+            f"aggregate RTF {summary['rtf']:.3f} ({1 / summary['rtf']:.1f}x real time), "
+            f"per-replica RTF {summary['worker_rtf']:.3f}, {failed} failed")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="run_ptt.py transcribe",
+                                     description="Transcribe audio files and folders offline")
+    parser.add_argument("paths", nargs="+", help="Audio files or directories (searched recursively)")
+    parser.add_argument("--settings", default="voiceptt_settings.json")
+    parser.add_argument("--model", help="Model size (default from settings)")
+    parser.add_argument("--precision", choices=["fp32", "int8"])
+    parser.add_argument("--workers", type=int, default=0, help="Model replicas (default: fit RAM and CPUs)")
+    parser.add_argument("--output", default="voiceptt_bulk.jsonl", help="JSON lines results file (appended)")
+    parser.add_argument("--manifest", help="Finished-files manifest (default <output>.manifest)")
+    parser.add_argument("--text-dir", help="Also write one .txt per file here")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.settings, "r") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    if args.model:
+        settings["model_size"] = args.model
+    if args.precision:
+        settings["precision"] = args.precision
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s | %(levelname)s | %(message)s')
+    summary = run(args.paths, settings, args.workers, args.output, args.manifest, args.text_dir,
+                  log=lambda message: print(message, file=sys.stderr, flush=True))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""Headless transcription daemon serving one resident engine over a Unix domain socket
+
+Protocol: newline-delimited JSON. A request is one JSON line, optionally followed by
+a raw payload:
+
+    {"op": "transcribe", "id": 1, "path": "/abs/clip.m4a"}
+    {"op": "transcribe", "id": 2, "pcm_bytes": 64000, "stream": true}  + 64000 bytes of
+        16 kHz mono s16le PCM
+    {"op": "ping"} | {"op": "status"} | {"op": "load"} | {"op": "prefetch"}
+    {"op": "select", "model": "small", "precision": "int8"}
+
+Replies are JSON lines tagged with the request id. A transcription produces
+"queued" (or "busy" when the queue is full), "started", zero or more "segment"
+events when streaming, and finally "done" or "error".
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import stat
+import threading
+import time
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, load_audio_file
+
+DEFAULT_DAEMON_SETTINGS = {
+    "mode": "auto",                    # "auto" (use a running daemon, else host one), "host", "client", "off"
+    "socket": "~/.voiceptt.sock",
+    "max_queue": 8,                    # pending requests before clients get "busy"
+}
+
+TERMINAL_EVENTS = {"done", "error", "busy", "pong", "status", "selected", "loaded", "prefetched"}
+
+
+class DaemonBusy(Exception):
+    """The daemon's request queue stayed full"""
+
+
+class _Connection:
+    """One client socket with a write lock shared by the reader and the worker"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.rfile = sock.makefile('rb')
+        self.write_lock = threading.Lock()
+        self.open = True
+
+    def send(self, message):
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        with self.write_lock:
+            if not self.open:
+                return
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.open = False  # client went away; keep serving others
+
+    def close(self):
+        self.open = False
+        try:
+            self.rfile.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class TranscriptionDaemon:
+    """Accepts local clients and feeds one request queue into one shared engine"""
+
+    def __init__(self, engine, socket_path, max_queue=8, logger=None):
+        self.engine = engine
+        self.socket_path = os.path.expanduser(socket_path)
+        self.requests = queue.Queue(maxsize=max_queue)
+        self.logger = logger or logging.getLogger(__name__)
+        self.server = None
+        self.running = False
+
+    def start(self):
+        """Bind the socket and start the accept and worker threads"""
+        if ping(self.socket_path):
+            raise RuntimeError(f"A daemon is already serving {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # stale socket from a crashed run
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, stat.S_IRUSR | stat.S_IWUSR)
+        server.listen()
+        self.server = server
+        self.running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        # With batching, several in-flight requests let the engine decode them together
+        batcher = getattr(self.engine, "batcher", None)
+        for _ in range(batcher.settings["max_batch"] if batcher else 1):
+            threading.Thread(target=self._worker, daemon=True).start()
+        self.logger.info(f"Transcription daemon listening on {self.socket_path}")
+
+    def stop(self):
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve_forever(self):
+        self.start()
+        try:
+            while self.running:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(_Connection(sock),), daemon=True).start()
+
+    def _handle(self, conn):
+        """Read requests from one client until it disconnects"""
+        try:
+            while True:
+                line = conn.rfile.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                payload = None
+                if request.get("pcm_bytes"):
+                    payload = conn.rfile.read(request["pcm_bytes"])
+                self._dispatch(conn, request, payload)
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Daemon client error: {e}")
+        finally:
+            conn.close()
+
+    def _dispatch(self, conn, request, payload):
+        rid = request.get("id")
+        op = request.get("op")
+        if op == "ping":
+            conn.send({"id": rid, "event": "pong", "model": self.engine.model_key})
+        elif op == "status":
+            batcher = getattr(self.engine, "batcher", None)
+            conn.send({"id": rid, "event": "status", "model": self.engine.model_key,
+                       "resident": self.engine.resident(), "queue": self.requests.qsize(),
+                       "max_queue": self.requests.maxsize,
+                       "batching": batcher.throughput() if batcher else None})
+        elif op == "select":
+            resident = self.engine.select(request["model"], request.get("precision", "fp32"))
+            if not resident:
+                self.engine.prefetch()
+            conn.send({"id": rid, "event": "selected", "model": self.engine.model_key, "resident": resident})
+        elif op == "load":
+            conn.send({"id": rid, "event": "loaded", "model": self.engine.load()})
+        elif op == "prefetch":
+            # Reload the current model if it was idle-unloaded; never switches models
+            self.engine.prefetch()
+            conn.send({"id": rid, "event": "prefetched", "model": self.engine.model_key})
+        elif op == "transcribe":
+            if payload is not None:
+                audio = np.frombuffer(payload, dtype=np.int16)
+            elif request.get("path"):
+                audio = request["path"]
+            else:
+                conn.send({"id": rid, "event": "error", "message": "transcribe needs pcm_bytes or path"})
+                return
+            try:
+                self.requests.put_nowait((conn, request, audio))
+            except queue.Full:
+                # Backpressure: the client decides whether to retry
+                conn.send({"id": rid, "event": "busy", "queue": self.requests.qsize()})
+                return
+            conn.send({"id": rid, "event": "queued", "position": self.requests.qsize()})
+        else:
+            conn.send({"id": rid, "event": "error", "message": f"unknown op {op!r}"})
+
+    def _worker(self):
+        """Queue consumer: every request runs on the same resident engine"""
+        while True:
+            conn, request, audio = self.requests.get()
+            rid = request.get("id")
+            if not conn.open:
+                continue  # client gave up while queued
+            started = time.time()
+            conn.send({"id": rid, "event": "started"})
+            try:
+                if isinstance(audio, str):
+                    audio = load_audio_file(audio)
+                if request.get("stream") or len(audio) > 30 * SAMPLE_RATE:
+                    def on_segment(text, start, end):
+                        conn.send({"id": rid, "event": "segment", "text": text, "start": start, "end": end})
+                    text = self.engine.transcribe_chunks(audio, on_segment=on_segment)
+                else:
+                    text = self.engine.transcribe(audio, prompt=request.get("prompt"))
+                conn.send({"id": rid, "event": "done", "text": text or "", "no_speech": text is None,
+                           "audio_s": len(audio) / SAMPLE_RATE, "elapsed_s": time.time() - started})
+            except Exception as e:
+                self.logger.error(f"Daemon transcription failed: {e}")
+                conn.send({"id": rid, "event": "error", "message": str(e)})
+
+
+class DaemonClient:
+    """Talks to a running daemon; one short-lived connection per request"""
+
+    def __init__(self, socket_path, busy_retries=20):
+        self.socket_path = os.path.expanduser(socket_path)
+        self.busy_retries = busy_retries
+        self.ids = itertools.count(1)
+
+    def request(self, header, payload=b"", on_event=None):
+        """Send one request and return its final event"""
+        header = dict(header, id=next(self.ids))
+        if payload:
+            header["pcm_bytes"] = len(payload)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall((json.dumps(header) + "\n").encode("utf-8") + payload)
+            with sock.makefile('rb') as rfile:
+                for line in rfile:
+                    event = json.loads(line)
+                    if on_event:
+                        on_event(event)
+                    if event["event"] in TERMINAL_EVENTS:
+                        return event
+        raise ConnectionError("Daemon closed the connection")
+
+    def _transcribe(self, header, payload, on_segment):
+        def on_event(event):
+            if on_segment and event["event"] == "segment":
+                on_segment(event["text"], event["start"], event["end"])
+
+        for attempt in range(self.busy_retries + 1):
+            event = self.request(header, payload, on_event)
+            if event["event"] != "busy":
+                break
+            time.sleep(min(0.05 * 2 ** attempt, 1.0))
+        else:
+            raise DaemonBusy(f"Daemon queue stayed full ({event['queue']} pending)")
+        if event["event"] == "error":
+            raise RuntimeError(event["message"])
+        return None if event["no_speech"] else event["text"]
+
+    def transcribe_pcm(self, pcm, prompt=None, stream=False, on_segment=None):
+        """Transcribe int16 PCM; None when there was no speech"""
+        header = {"op": "transcribe", "prompt": prompt, "stream": stream}
+        return self._transcribe(header, np.ascontiguousarray(pcm, dtype=np.int16).tobytes(), on_segment)
+
+    def transcribe_file(self, path, stream=False, on_segment=None):
+        header = {"op": "transcribe", "path": os.path.abspath(path), "stream": stream}
+        return self._transcribe(header, b"", on_segment)
+
+
+class RemoteEngine:
+    """TranscriptionEngine stand-in backed by a daemon, used by the app in client mode"""
+
+    def __init__(self, client, model_size="small", precision="fp32"):
+        self.client = client
+        self.model_size = model_size
+        self.precision = precision
+        self.on_status = None
+        self.resident_keys = []  # models this client saw loaded; menus read this, never the socket
+
+    @property
+    def model_key(self):
+        from voiceptt.models import model_key
+        return model_key(self.model_size, self.precision)
+
+    def _mark_resident(self, key):
+        if key not in self.resident_keys:
+            self.resident_keys = self.resident_keys + [key]
+
+    def select(self, size, precision):
+        self.model_size, self.precision = size, precision
+        resident = self.client.request({"op": "select", "model": size, "precision": precision})["resident"]
+        if resident:
+            self._mark_resident(self.model_key)
+        return resident
+
+    def resident(self):
+        return list(self.resident_keys)
+
+    def load(self):
+        self.select(self.model_size, self.precision)
+        key = self.client.request({"op": "load"})["model"]
+        self._mark_resident(key)
+        return key
+
+    def prefetch(self):
+        # No select: a key press must not switch the model other clients share
+        self.client.request({"op": "prefetch"})
+
+    def transcribe(self, audio_data, prompt=None, features=None):
+        # Precomputed features are only used by a local engine
+        return self.client.transcribe_pcm(audio_data, prompt=prompt)
+
+    def transcribe_chunks(self, audio_data, on_segment=None):
+        return self.client.transcribe_pcm(audio_data, stream=True, on_segment=on_segment)
+
+    def transcribe_long(self, audio_data, on_segment=None):
+        return self.transcribe_chunks(audio_data, on_segment)
+
+
+def ping(socket_path):
+    """True if a daemon answers on socket_path"""
+    try:
+        return DaemonClient(socket_path).request({"op": "ping"})["event"] == "pong"
+    except (OSError, ValueError):
+        return False
+
+
+def main():
+    from voiceptt.batching import DEFAULT_BATCHING_SETTINGS
+    from voiceptt.engine import TranscriptionEngine
+    from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS
+    from voiceptt.profiles import DEFAULT_PROFILE_SETTINGS
+    from voiceptt.tuning import DEFAULT_THREAD_SETTINGS
+    from voiceptt.vad import DEFAULT_VAD_SETTINGS
+
+    parser = argparse.ArgumentParser(description="VoicePTT transcription daemon")
+    parser.add_argument("--settings", default="voiceptt_settings.json")
+    parser.add_argument("--socket", help="Unix socket path (default from settings)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Load the model and serve requests")
+    serve.add_argument("--model", help="Model size (default from settings)")
+    serve.add_argument("--precision", choices=["fp32", "int8"])
+    client = sub.add_parser("transcribe", help="Transcribe files through a running daemon")
+    client.add_argument("files", nargs="+")
+    client.add_argument("--stream", action="store_true", help="Print segments as they are decoded")
+    args = parser.parse_args()
+
+    try:
+        with open(args.settings, "r") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    daemon_settings = {**DEFAULT_DAEMON_SETTINGS, **settings.get("daemon", {})}
+    socket_path = args.socket or daemon_settings["socket"]
+
+    if args.command == "serve":
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+        engine = TranscriptionEngine(
+            model_size=args.model or settings.get("model_size", "small"),
+            precision=args.precision or settings.get("precision", "fp32"),
+            model_settings={**DEFAULT_MODEL_POOL_SETTINGS, **settings.get("models", {})},
+            vad_settings={**DEFAULT_VAD_SETTINGS, **settings.get("vad", {})},
+            batching_settings={**DEFAULT_BATCHING_SETTINGS, **settings.get("batching", {})},
+            logger=logging.getLogger("voiceptt.daemon"),
+            profile_settings={**DEFAULT_PROFILE_SETTINGS, **settings.get("profiles", {})},
+            thread_settings={**DEFAULT_THREAD_SETTINGS, **settings.get("threads", {})}
+        )
+        engine.load()
+        TranscriptionDaemon(engine, socket_path, daemon_settings["max_queue"]).serve_forever()
+    else:
+        client = DaemonClient(socket_path)
+        for path in args.files:
+            on_segment = (lambda text, start, end: print(f"[{start:7.1f}s] {text}", flush=True)) if args.stream else None
+            text = client.transcribe_file(path, stream=args.stream, on_segment=on_segment)
+            if not args.stream:
+                print(f"{path}: {text or '(no speech)'}")
+
+
+if __name__ == "__main__":
+    main()
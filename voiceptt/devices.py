@@ -0,0 +1,125 @@
+"""Cached audio device list that is re-enumerated only when devices are plugged or unplugged
+
+PortAudio only sees hotplugged devices after it is re-initialized (through
+sounddevice's private helpers, when it has them), and querying it repeatedly is
+wasted work when nothing changed. The registry enumerates once, and a
+watcher thread compares CoreAudio's device ID list (one cheap property read) to
+decide when a refresh is needed.
+"""
+import ctypes
+import ctypes.util
+import threading
+import time
+
+
+class _PropertyAddress(ctypes.Structure):
+    _fields_ = [("selector", ctypes.c_uint32), ("scope", ctypes.c_uint32), ("element", ctypes.c_uint32)]
+
+
+def _fourcc(code):
+    return int.from_bytes(code.encode("ascii"), "big")
+
+
+_SYSTEM_OBJECT = 1
+_DEVICES_ADDRESS = _PropertyAddress(_fourcc("dev#"), _fourcc("glob"), 0)
+_coreaudio = None
+
+
+def coreaudio_device_ids():
+    """IDs of all CoreAudio devices, or None where CoreAudio is unavailable"""
+    global _coreaudio
+    if _coreaudio is None:
+        path = ctypes.util.find_library("CoreAudio")
+        _coreaudio = ctypes.cdll.LoadLibrary(path) if path else False
+    if not _coreaudio:
+        return None
+    size = ctypes.c_uint32(0)
+    if _coreaudio.AudioObjectGetPropertyDataSize(_SYSTEM_OBJECT, ctypes.byref(_DEVICES_ADDRESS),
+                                                 0, None, ctypes.byref(size)):
+        return None
+    ids = (ctypes.c_uint32 * (size.value // 4))()
+    if _coreaudio.AudioObjectGetPropertyData(_SYSTEM_OBJECT, ctypes.byref(_DEVICES_ADDRESS),
+                                             0, None, ctypes.byref(size), ids):
+        return None
+    return tuple(ids)
+
+
+def _reinitialize_portaudio(sd):
+    """Restart PortAudio so it sees hotplugged devices; False if sounddevice has no way to"""
+    # sounddevice has no public re-initialize, so use its private helpers while they exist
+    terminate, initialize = getattr(sd, "_terminate", None), getattr(sd, "_initialize", None)
+    if not callable(terminate) or not callable(initialize):
+        return False
+    terminate()
+    initialize()
+    return True
+
+
+class DeviceRegistry:
+    """Enumerates audio devices once and caches them until the hardware changes"""
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.devices = None    # [{"index", "name", "max_input_channels"}]
+        self.signature = None  # CoreAudio device IDs at the last enumeration
+        self.lock = threading.Lock()
+        self.watcher = None
+
+    def all(self):
+        """Every device, enumerating on first use"""
+        with self.lock:
+            if self.devices is None:
+                self._enumerate_locked(reinitialize=False)
+            return self.devices
+
+    def inputs(self):
+        """Devices that can record"""
+        return [d for d in self.all() if d["max_input_channels"] > 0]
+
+    def name(self, index):
+        devices = self.all()
+        if index is not None and 0 <= index < len(devices):
+            return devices[index]["name"]
+        return "Unknown device"
+
+    def find(self, name):
+        """Index of the input device called name, if present"""
+        return next((d["index"] for d in self.inputs() if d["name"] == name), None)
+
+    def refresh(self):
+        """Re-initialize PortAudio and enumerate again (input streams must be closed)"""
+        with self.lock:
+            self._enumerate_locked(reinitialize=True)
+        return self.devices
+
+    def _enumerate_locked(self, reinitialize):
+        import sounddevice as sd
+        start = time.perf_counter()
+        if reinitialize and not _reinitialize_portaudio(sd) and self.logger:
+            self.logger.warning("This sounddevice cannot restart PortAudio; "
+                                "newly plugged devices appear after VoicePTT restarts")
+        self.signature = coreaudio_device_ids()
+        self.devices = [{"index": i, "name": d["name"], "max_input_channels": d["max_input_channels"]}
+                        for i, d in enumerate(sd.query_devices())]
+        if self.logger:
+            self.logger.info(f"Enumerated {len(self.devices)} audio devices "
+                             f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def watch(self, on_change, interval_s):
+        """Call on_change() when devices are added or removed, until it calls refresh()"""
+        if self.watcher is not None or not interval_s or coreaudio_device_ids() is None:
+            return
+        self.all()
+        self.watcher = threading.Thread(target=self._watch, args=(on_change, interval_s), daemon=True)
+        self.watcher.start()
+
+    def _watch(self, on_change, interval_s):
+        while True:
+            time.sleep(interval_s)
+            if coreaudio_device_ids() == self.signature:
+                continue
+            try:
+                on_change()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Audio device refresh failed: {e}")
@@ -0,0 +1,272 @@
+"""UI-independent transcription engine shared by the menu-bar app and the daemon"""
+import os
+import threading
+import time
+
+import numpy as np
+from datetime import datetime
+
+from voiceptt.audio import SAMPLE_RATE, pcm_to_float32, write_wav
+from voiceptt.backends import create_backend
+from voiceptt.batching import DEFAULT_BATCHING_SETTINGS, BatchScheduler
+from voiceptt.longform import DEFAULT_LONGFORM_SETTINGS, release_pages
+from voiceptt.metrics import Metrics
+from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS, ModelPool, model_key
+from voiceptt.profiles import DEFAULT_PROFILE_SETTINGS, ProfilePlanner
+from voiceptt.streaming import split_at_pauses
+from voiceptt.tuning import DEFAULT_THREAD_SETTINGS, autotune, summarize
+from voiceptt.vad import DEFAULT_VAD_SETTINGS, kept_span, speech_keep_mask
+
+WINDOW_SECONDS = 28  # chunk length for long audio, inside Whisper's 30 s window
+
+
+class TranscriptionEngine:
+    """Resident models, silence trimming and Whisper calls behind transcribe()"""
+
+    def __init__(self, model_size="small", precision="fp32", model_settings=None, vad_settings=None,
+                 audio_handoff="memory", batching_settings=None, metrics=None, logger=None,
+                 profile_settings=None, thread_settings=None, longform_settings=None):
+        self.model_size = model_size
+        self.precision = precision
+        self.model_settings = model_settings or dict(DEFAULT_MODEL_POOL_SETTINGS)
+        self.vad_settings = vad_settings or dict(DEFAULT_VAD_SETTINGS)
+        # "memory" hands numpy audio straight to Whisper; "file" keeps a WAV per clip for debugging
+        self.audio_handoff = audio_handoff
+        self.logger = logger
+        self.metrics = metrics or Metrics({"enabled": False})
+        self.on_status = None  # optional callback for user-visible progress messages
+        self.backend = create_backend(self.model_settings)  # torch or onnx
+        self.pool = ModelPool(self.model_settings, self.backend, logger)
+        self.model_lock = threading.Lock()  # one transcribe call on the models at a time
+        self.profile_settings = profile_settings or dict(DEFAULT_PROFILE_SETTINGS)
+        self.thread_settings = thread_settings or dict(DEFAULT_THREAD_SETTINGS, configs={})
+        self.threads_key = None  # model key whose thread config is currently applied
+        self.planner = ProfilePlanner(self.profile_settings)
+        self.longform_settings = longform_settings or dict(DEFAULT_LONGFORM_SETTINGS)
+        self.batching_settings = batching_settings or dict(DEFAULT_BATCHING_SETTINGS)
+        self.batcher = None
+        if self.batching_settings["enabled"]:
+            self.batcher = BatchScheduler(self._decode_batch, self.batching_settings, logger)
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.info(message)
+
+    # ----- model selection -----
+
+    @property
+    def model_key(self):
+        """Pool key of the selected model size and precision"""
+        return model_key(self.model_size, self.precision)
+
+    def select(self, size, precision):
+        """Choose the model used for new requests; returns True if it is already resident"""
+        self.model_size, self.precision = size, precision
+        return self.pool.peek(self.model_key) is not None
+
+    def resident(self):
+        return self.pool.resident()
+
+    def n_mels(self):
+        """Mel bands the selected model expects (large-v3 uses 128)"""
+        model = self.pool.peek(self.model_key)
+        if model is not None and hasattr(model, "dims"):
+            return self.backend.n_mels(model)
+        return 128 if self.model_size.startswith("large") else 80
+
+    def load(self):
+        """Load the selected model (blocking) and return its key"""
+        key = self.model_key
+        # Before the first torch op, so a saved inter-op pool size can still take effect
+        self.apply_threads(key)
+        self.pool.get(key)
+        return key
+
+    def apply_threads(self, key):
+        """Switch torch to the tuned thread counts for key, if it has been tuned"""
+        config = self.thread_settings["configs"].get(key)
+        if config is None or key == self.threads_key:
+            return
+        self.backend.apply_threads(config)
+        self.threads_key = key
+        self._log(f"Using {config['intra_op']} intra-op thread(s) for {key}")
+
+    def autotune(self, clip=None):
+        """Benchmark thread counts on the selected model, save and apply the best"""
+        if self.backend.name != "torch":
+            raise RuntimeError(f"Thread tuning times torch; the {self.backend.name} backend uses models.onnx_threads")
+        key = self.model_key
+        model = self.pool.get(key)
+        with self.model_lock:
+            report = autotune(model, clip, self.thread_settings, self.logger)
+            self.thread_settings["configs"][key] = report["config"]
+            self.threads_key = None
+            self.apply_threads(key)
+        self._log(summarize(key, report))
+        return report
+
+    def prefetch(self):
+        self.pool.prefetch(self.model_key)
+
+    def acquire_model(self):
+        """Return the selected model, using a resident one while a switch is loading"""
+        model = self.pool.peek(self.model_key)
+        if model is None and self.pool.is_loading(self.model_key):
+            model = self.pool.most_recent()
+        if model is None:
+            # Unloaded after idling: reload on demand
+            if self.on_status:
+                self.on_status(f"Reloading {self.model_size} model...")
+            model = self.pool.get(self.model_key)
+        return model
+
+    # ----- audio preparation -----
+
+    def prepare_audio(self, audio_data):
+        """Hand captured PCM to Whisper in memory, or via a kept WAV in file mode"""
+        with self.metrics.span("encode_audio", len(audio_data) / SAMPLE_RATE, handoff=self.audio_handoff):
+            return self._prepare_audio(audio_data)
+
+    def _prepare_audio(self, audio_data):
+        if self.audio_handoff == "file":
+            os.makedirs("voiceptt_debug_audio", exist_ok=True)
+            path = os.path.join("voiceptt_debug_audio", datetime.now().strftime("%Y%m%d_%H%M%S_%f.wav"))
+            write_wav(path, audio_data)
+            self._log(f"Saved debug audio: {path}")
+            return path
+        return pcm_to_float32(audio_data)
+
+    def apply_vad(self, audio_data):
+        """Trim and compact silence; None when the clip has no speech"""
+        return self._apply_vad(audio_data)[0]
+
+    def _apply_vad(self, audio_data):
+        """(trimmed audio, (start, end) if it is one piece of the input else None)"""
+        if not self.vad_settings["enabled"]:
+            return audio_data, (0, len(audio_data))
+        with self.metrics.span("vad", len(audio_data) / SAMPLE_RATE):
+            mask = speech_keep_mask(audio_data, self.vad_settings)
+            trimmed = None if mask is None else audio_data[mask]
+        kept = 0 if trimmed is None else len(trimmed)
+        self._log(f"VAD kept {kept / SAMPLE_RATE:.2f}s of {len(audio_data) / SAMPLE_RATE:.2f}s")
+        return trimmed, None if mask is None else kept_span(mask)
+
+    # ----- transcription -----
+
+    def transcribe(self, audio_data, prompt=None, features=None):
+        """Transcribe int16 PCM; None when the clip holds no speech
+
+        features are MelFeatures extracted while the clip was recorded; they replace
+        Whisper's own log-mel pass when the VAD kept one piece of the clip.
+        """
+        trimmed, span = self._apply_vad(audio_data)
+        if trimmed is None:
+            return None
+        mel = None
+        if features is not None and self.audio_handoff == "memory":
+            with self.metrics.span("features", len(trimmed) / SAMPLE_RATE, reused=span is not None):
+                mel = features.mel(audio_data, span)
+        return self._transcribe_speech(trimmed, prompt, mel)
+
+    def _transcribe_speech(self, audio_data, prompt=None, mel=None):
+        if (self.batcher and not prompt and self.audio_handoff == "memory" and len(audio_data) <= 30 * SAMPLE_RATE
+                and self.profile_settings["profile"] == "fast"):
+            # Share one greedy encoder/decoder pass with other clips queued right now; other
+            # profiles need their own decoding options and auto needs plan() and its RTF samples
+            return self.batcher.submit(audio_data).result()
+        audio_s = len(audio_data) / SAMPLE_RATE
+        key, profile, model = self.plan(audio_s)
+        audio = self.prepare_audio(audio_data)
+        with self.model_lock:
+            self.apply_threads(key)
+            start = time.perf_counter()
+            with self.metrics.span("model", audio_s, model=key, profile=profile, backend=self.backend.name):
+                text = self.backend.transcribe(model, audio, prompt, profile, mel)
+            self.planner.observe(key, profile, time.perf_counter() - start, audio_s)
+        return text
+
+    def plan(self, audio_s):
+        """Pick (key, profile, model) for a clip; auto mode only considers resident models"""
+        selected = self.model_key
+        key, profile = self.planner.plan(audio_s, self.pool.resident() + [selected], selected)
+        model = self.pool.peek(key) if key != selected else None
+        if model is None:
+            key, model = selected, self.acquire_model()
+        if self.profile_settings["profile"] == "auto":
+            self._log(f"Auto profile: {key}/{profile} for {audio_s:.1f}s "
+                      f"(predicted {self.planner.predicted_rtf(key, profile) * audio_s:.2f}s)")
+        return key, profile, model
+
+    def _decode_batch(self, clips):
+        model = self.acquire_model()
+        audio_s = sum(len(c) for c in clips) / SAMPLE_RATE
+        with self.model_lock:
+            with self.metrics.span("model", audio_s, model=self.model_key, batch=len(clips),
+                                   backend=self.backend.name):
+                return self.backend.decode_batch(model, clips)
+
+    def _transcribe_group(self, clips, context=""):
+        """Texts of a group of chunks: one encoder batch, then each chunk decoded under the profile
+
+        Each chunk is prompted with the text before it. The fast profile never conditions on
+        earlier text, so its group is decoded as a single greedy batch instead.
+        """
+        audio_s = sum(len(c) for c in clips) / SAMPLE_RATE
+        key, profile, model = self.plan(max(len(c) for c in clips) / SAMPLE_RATE)
+        results = []
+        with self.model_lock:
+            self.apply_threads(key)
+            start = time.perf_counter()
+            with self.metrics.span("model", audio_s, model=key, profile=profile, batch=len(clips),
+                                   backend=self.backend.name):
+                if profile == "fast":
+                    results = self.backend.decode_batch(model, clips)
+                else:
+                    for features in self.backend.encode_batch(model, clips):
+                        text = self.backend.decode_encoded(model, features, context[-200:], profile)
+                        results.append(text)
+                        if text:
+                            context = f"{context} {text}".strip()
+            self.planner.observe(key, profile, time.perf_counter() - start, audio_s)
+        return results
+
+    def transcribe_chunks(self, audio_data, on_segment=None):
+        """Transcribe long audio in pause-aligned chunks, reporting each as it is decoded"""
+        text = ""
+        for start, end in split_at_pauses(audio_data, WINDOW_SECONDS * SAMPLE_RATE):
+            segment = self.transcribe(audio_data[start:end], prompt=text[-200:])
+            if not segment:
+                continue
+            text = f"{text} {segment}".strip()
+            if on_segment:
+                on_segment(segment, start / SAMPLE_RATE, end / SAMPLE_RATE)
+        return text or None
+
+    def transcribe_long(self, audio_data, on_segment=None):
+        """Transcribe a long (possibly memory-mapped) recording in pause-aligned chunk batches"""
+        settings = self.longform_settings
+        chunks = split_at_pauses(audio_data, int(settings["chunk_s"] * SAMPLE_RATE))
+        group_size = max(1, settings["parallel_chunks"])
+        batched = group_size > 1 and self.audio_handoff == "memory"
+        texts = []
+        for i in range(0, len(chunks), group_size):
+            # Copy only this group out of the recording; earlier groups are already freed
+            group = [(start, end, self.apply_vad(np.array(audio_data[start:end])))
+                     for start, end in chunks[i:i + group_size]]
+            group = [(start, end, clip) for start, end, clip in group if clip is not None]
+            release_pages(audio_data)
+            if not group:
+                continue
+            if batched:
+                results = self._transcribe_group([clip for _, _, clip in group], " ".join(texts))
+            else:
+                # Lazily, so each chunk is prompted with the text decoded before it
+                results = (self._transcribe_speech(clip, prompt=" ".join(texts)[-200:]) for _, _, clip in group)
+            for (start, end, _), text in zip(group, results):
+                if text:
+                    texts.append(text)
+                    if on_segment:
+                        on_segment(text, start / SAMPLE_RATE, end / SAMPLE_RATE)
+        self._log(f"Long-form: {len(audio_data) / SAMPLE_RATE:.1f}s in {len(chunks)} chunks, "
+                  f"{'batches of ' + str(group_size) if batched else 'sequential'}")
+        return " ".join(texts) or None
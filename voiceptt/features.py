@@ -0,0 +1,202 @@
+"""Incremental log-mel features computed while the hotkey is held
+
+Whisper builds the log-mel spectrogram of the whole clip after release. Here a
+poller thread reads new audio from the capture ring (the PortAudio callback only
+writes the ring, as before). It computes STFT frames and raw log10 mel energies as
+soon as each 25 ms window is complete. The numpy version matches Whisper's:
+periodic Hann window, 400-point FFT, hop 160, reflect padding at the start, zero
+padding at the end, and the clip's peak - 8 normalization. On release only the
+last few frames and the normalization are left, and the mel is handed to
+model.transcribe() in place of its own.
+
+Frames are cached against the unpadded recording, so they stay valid for the span
+the VAD keeps when it only trims the ends. When silence compaction joins separate
+pieces of the recording, Whisper computes the mel itself as before.
+"""
+import importlib.util
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, pcm_to_float32
+
+N_FFT = 400
+HOP_LENGTH = 160
+N_SAMPLES = 30 * SAMPLE_RATE        # Whisper pads every clip with 30 s of zeros
+N_FRAMES = N_SAMPLES // HOP_LENGTH
+EDGE = N_FFT // 2                   # samples each frame reaches either side of its centre
+
+DEFAULT_FEATURE_SETTINGS = {
+    "enabled": True,
+    "poll_ms": 100,     # how often new audio is turned into frames while recording
+    "max_s": 30,        # longer recordings go to the chunked decoder; stop extracting
+}
+
+_WINDOW = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)).astype(np.float32)
+_filters = {}
+
+
+def mel_filters(n_mels):
+    """Whisper's mel filter bank (n_mels, 201), read from its package without importing torch"""
+    if n_mels not in _filters:
+        spec = importlib.util.find_spec("whisper")
+        if spec is None or not spec.submodule_search_locations:
+            raise ImportError("whisper is not installed")
+        path = os.path.join(spec.submodule_search_locations[0], "assets", "mel_filters.npz")
+        with np.load(path) as f:
+            _filters[n_mels] = f[f"mel_{n_mels}"].astype(np.float32)
+    return _filters[n_mels]
+
+
+def raw_log_mel(padded, filters):
+    """log10 mel energies (frames, n_mels) of every full window in an already padded signal"""
+    if len(padded) < N_FFT:
+        return np.empty((0, len(filters)), dtype=np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(padded, N_FFT)[::HOP_LENGTH]
+    power = np.abs(np.fft.rfft(frames * _WINDOW, axis=1)) ** 2
+    return np.log10(np.maximum(power.astype(np.float32) @ filters.T, 1e-10))
+
+
+def normalize(raw):
+    """Whisper's dynamic range clamp and scaling; returns (n_mels, frames)"""
+    raw = np.maximum(raw, raw.max() - 8.0)
+    return np.ascontiguousarray(((raw + 4.0) / 4.0).T, dtype=np.float32)
+
+
+def log_mel(pcm, n_mels=80, cached=None, offset=0):
+    """Whisper's log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES) for int16 PCM (or float32 samples)
+
+    cached holds raw frames of a longer recording whose frame 0 is centred on sample
+    0 of that recording, and pcm starts at sample offset of it (a hop multiple).
+    Interior frames are taken from it. Only the two reflect-padded head frames, the
+    frames reaching past the end, and frames not cached yet are computed.
+    """
+    filters = mel_filters(n_mels)
+    x = pcm if pcm.dtype == np.float32 else pcm_to_float32(pcm)
+    content = len(x) // HOP_LENGTH
+    raw = np.full((content + N_FRAMES, n_mels), -10.0, dtype=np.float32)  # log10(1e-10): zeros
+    last = min(len(raw), (len(x) + EDGE - 1) // HOP_LENGTH + 1)  # frames touching real audio
+
+    first_cached = last_cached = 2
+    if cached is not None and offset % HOP_LENGTH == 0:
+        shift = offset // HOP_LENGTH
+        # Frames whose whole window lies inside pcm, and that were already computed
+        last_cached = max(2, min((len(x) - EDGE) // HOP_LENGTH + 1, len(cached) - shift))
+        raw[2:last_cached] = cached[shift + 2:shift + last_cached]
+
+    # Reflect-padded head, zero-padded tail, as torch.stft(center=True) sees them
+    head = np.zeros(EDGE + 1, dtype=np.float32)
+    head[:min(len(x), EDGE + 1)] = x[:EDGE + 1]
+    padded = np.concatenate([head[1:][::-1], x, np.zeros(N_FFT, dtype=np.float32)])
+    for start, end in ((0, first_cached), (last_cached, last)):
+        if end > start:
+            raw[start:end] = raw_log_mel(padded[start * HOP_LENGTH:(end - 1) * HOP_LENGTH + N_FFT], filters)
+    return normalize(raw)
+
+
+class MelFeatures:
+    """Raw frames of one finished recording, turned into a Whisper mel on demand"""
+
+    def __init__(self, frames, n_mels):
+        self.frames = frames
+        self.n_mels = n_mels
+
+    def mel(self, audio, span):
+        """Mel for audio[start:end], where span is what the VAD kept; None if it was not one piece"""
+        if span is None:
+            return None
+        start, end = span
+        return log_mel(audio[start:end], self.n_mels, self.frames, start)
+
+
+class MelExtractor:
+    """Turns a recording into raw log-mel frames as it is captured"""
+
+    def __init__(self, capture, start_sample, n_mels=80, settings=None, logger=None):
+        self.capture = capture
+        self.start = start_sample
+        self.n_mels = n_mels
+        self.settings = {**DEFAULT_FEATURE_SETTINGS, **(settings or {})}
+        self.logger = logger
+        self.filters = mel_filters(n_mels)
+        self.cursor = start_sample        # next ring sample to read
+        self.buffer = np.empty(0, dtype=np.float32)  # padded samples not yet framed
+        self.head = None                  # reflect padding, once 201 samples exist
+        self.blocks = []
+        self.valid = True                 # False once audio was lost or max_s passed
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.settings["poll_ms"] / 1000):
+            self._advance(self.capture.position)
+
+    def _advance(self, end):
+        with self.lock:
+            if not self.valid:
+                return
+            if self.cursor < self.capture.oldest or end - self.start > self.settings["max_s"] * SAMPLE_RATE:
+                self.valid = False
+                self.blocks = []
+                return
+            if end <= self.cursor:
+                return
+            samples = pcm_to_float32(self.capture.read(self.cursor, end))
+            self.cursor = end
+            if self.head is None:
+                self.buffer = np.concatenate([self.buffer, samples])
+                if len(self.buffer) <= EDGE:
+                    return
+                self.head = self.buffer[1:EDGE + 1][::-1]
+                samples, self.buffer = np.concatenate([self.head, self.buffer]), np.empty(0, dtype=np.float32)
+            self.buffer = np.concatenate([self.buffer, samples])
+            block = raw_log_mel(self.buffer, self.filters)
+            if len(block):
+                self.blocks.append(block)
+                self.buffer = self.buffer[len(block) * HOP_LENGTH:]
+
+    def finish(self, end_sample):
+        """Frame everything up to end_sample; None if the recording cannot use the features"""
+        self.stopping.set()
+        self.thread.join()
+        self._advance(end_sample)
+        with self.lock:
+            if not self.valid:
+                return None
+            frames = np.concatenate(self.blocks) if self.blocks else np.empty((0, self.n_mels), np.float32)
+        return MelFeatures(frames, self.n_mels)
+
+    def cancel(self):
+        self.stopping.set()
+
+
+@contextmanager
+def precomputed_mel(audio, mel):
+    """Make whisper.transcribe() use mel for this audio array instead of recomputing it
+
+    Must be held under the engine's model lock: it swaps the module-level function
+    whisper.transcribe looks up.
+    """
+    module = sys.modules.get("whisper.transcribe")
+    if mel is None or module is None or not isinstance(audio, np.ndarray):
+        yield
+        return
+    original = module.log_mel_spectrogram
+
+    def log_mel_spectrogram(samples, n_mels=80, padding=0, device=None):
+        if samples is audio and padding == N_SAMPLES and n_mels == mel.shape[0]:
+            import torch
+            tensor = torch.from_numpy(mel)
+            return tensor.to(device) if device is not None else tensor
+        return original(samples, n_mels, padding, device)
+
+    module.log_mel_spectrogram = log_mel_spectrogram
+    try:
+        yield
+    finally:
+        module.log_mel_spectrogram = original
@@ -0,0 +1,213 @@
+"""Output pipeline: clipboard and paste on the caller's thread, everything else in the background
+
+The clipboard copy and the paste keystroke are the only steps the user waits for, so
+they run first on the transcription thread. Sounds, notifications and history writes
+are queued to one worker thread. macOS calls go through a single long-lived
+`osascript -l JavaScript` helper (osa_helper.js) instead of forking osascript/afplay
+for every event; if the helper cannot run, each command falls back to a one-off
+subprocess.
+"""
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+
+DEFAULT_FEEDBACK_SETTINGS = {
+    "sounds": True,
+    "notifications": True,
+    "helper": True,          # reuse one osascript process for all macOS calls
+    "paste_delay_ms": 200,   # let the hotkey release settle before sending cmd+V
+}
+
+HELPER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "osa_helper.js")
+SOUNDS_DIR = "/System/Library/Sounds"
+
+
+def _applescript_string(text):
+    # JSON string escapes (\" \\ \n) are valid in AppleScript literals
+    return json.dumps(text, ensure_ascii=False)
+
+
+def run_once(command):
+    """Run one helper command as its own osascript/afplay process (blocking)"""
+    op = command["op"]
+    if op == "notify":
+        script = (f'display notification {_applescript_string(command["message"])} '
+                  f'with title {_applescript_string(command.get("title", "VoicePTT"))}')
+        if command.get("subtitle"):
+            script += f' subtitle {_applescript_string(command["subtitle"])}'
+        args = ["osascript", "-e", script]
+    elif op == "keystroke":
+        using = ", ".join(command.get("using", []))
+        args = ["osascript", "-e", f'tell application "System Events" to keystroke '
+                                   f'{_applescript_string(command["key"])}'
+                                   + (f" using {{{using}}}" if using else "")]
+    elif op == "sound":
+        args = ["afplay"] + (["-v", str(command["volume"])] if "volume" in command else []) + [command["path"]]
+    else:
+        raise ValueError(f"Unknown op: {op}")
+    subprocess.run(args)
+
+
+class OsaHelper:
+    """One `osascript -l JavaScript` process that runs JSON commands read from stdin"""
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.process = None
+        self.ids = itertools.count(1)
+        self.waiting = {}  # id -> [Event, reply]
+        self.lock = threading.Lock()
+
+    def _start_locked(self):
+        self.process = subprocess.Popen(["osascript", "-l", "JavaScript", HELPER_SCRIPT],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, bufsize=0)
+        threading.Thread(target=self._read_replies, args=(self.process,), daemon=True).start()
+        if self.logger:
+            self.logger.info(f"Started osascript helper (pid {self.process.pid})")
+
+    def _read_replies(self, process):
+        for line in process.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                waiter = self.waiting.pop(reply.get("id"), None)
+            if waiter is not None:
+                waiter[1] = reply
+                waiter[0].set()
+        # Helper exited: release anyone still waiting on it
+        with self.lock:
+            if self.process is process:
+                self.process = None
+            waiters, self.waiting = self.waiting, {}
+        for waiter in waiters.values():
+            waiter[1] = {"error": "osascript helper exited"}
+            waiter[0].set()
+
+    def send(self, command, wait=False, timeout=5.0):
+        """Send one command, restarting the helper if needed; with wait, block for its reply"""
+        command = dict(command, id=next(self.ids))
+        waiter = [threading.Event(), None]
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._start_locked()
+            if wait:
+                self.waiting[command["id"]] = waiter
+            try:
+                self.process.stdin.write((json.dumps(command) + "\n").encode("utf-8"))
+            except OSError:
+                self.waiting.pop(command["id"], None)
+                self.process = None
+                raise
+        if wait:
+            if not waiter[0].wait(timeout):
+                with self.lock:
+                    self.waiting.pop(command["id"], None)
+                raise TimeoutError(f"osascript helper did not answer {command['op']}")
+            if "error" in waiter[1]:
+                raise RuntimeError(waiter[1]["error"])
+
+    def close(self):
+        with self.lock:
+            process, self.process = self.process, None
+        if process is not None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+
+
+class FeedbackDispatcher:
+    """Puts text on the clipboard (and pastes) immediately; queues all other side effects"""
+
+    def __init__(self, settings, metrics=None, logger=None):
+        self.settings = settings
+        self.metrics = metrics
+        self.logger = logger
+        self.helper = OsaHelper(logger) if settings["helper"] else None
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def _macos(self, command, wait=False):
+        """Run a command through the helper, falling back to a one-off process"""
+        if self.helper is not None:
+            try:
+                self.helper.send(command, wait=wait)
+                return
+            except (OSError, RuntimeError, TimeoutError) as e:
+                if self.logger:
+                    self.logger.warning(f"osascript helper failed ({e}); running {command['op']} directly")
+        run_once(command)
+
+    # ----- critical path -----
+
+    def output(self, text, paste=False, released_at=None):
+        """Copy text to the clipboard and optionally paste it; returns once both are done"""
+        import pyperclip
+        self._span("clipboard", pyperclip.copy, text)
+        if released_at is not None and self.metrics:
+            self.metrics.record("release_to_clipboard", time.perf_counter() - released_at)
+        if paste:
+            self._span("paste", self._paste)
+
+    def _paste(self):
+        time.sleep(self.settings["paste_delay_ms"] / 1000)
+        self._macos({"op": "keystroke", "key": "v", "using": ["command down"]}, wait=True)
+
+    def _span(self, stage, fn, *args):
+        if self.metrics:
+            with self.metrics.span(stage):
+                return fn(*args)
+        return fn(*args)
+
+    # ----- background -----
+
+    def notify(self, message, subtitle=None, title="VoicePTT"):
+        """Queue a macOS notification"""
+        if self.settings["notifications"]:
+            command = {"op": "notify", "message": message, "title": title}
+            if subtitle:
+                command["subtitle"] = subtitle
+            self.jobs.put(("notification", self._macos, (command,)))
+
+    def play(self, sound, volume=None):
+        """Queue one of the system sounds (e.g. "Blow")"""
+        if self.settings["sounds"]:
+            command = {"op": "sound", "path": os.path.join(SOUNDS_DIR, f"{sound}.aiff")}
+            if volume is not None:
+                command["volume"] = volume
+            self.jobs.put(("sound", self._macos, (command,)))
+
+    def submit(self, fn, *args):
+        """Queue any other side effect (history writes, menu refreshes)"""
+        self.jobs.put((None, fn, args))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            stage, fn, args = job
+            try:
+                if stage == "notification":
+                    self._span(stage, fn, *args)
+                else:
+                    fn(*args)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Feedback {stage or getattr(fn, '__name__', 'job')} failed: {e}")
+
+    def stop(self, timeout=2.0):
+        """Finish queued work, then shut the helper down"""
+        self.jobs.put(None)
+        self.worker.join(timeout)
+        if self.helper is not None:
+            self.helper.close()
@@ -0,0 +1,169 @@
+"""Append-only transcription history in SQLite with a full-text index
+
+Recent entries come from the rowid index (a bounded tail read, however long the
+history gets), new entries are buffered and written in one transaction per batch,
+and an FTS5 table makes the whole history searchable. The old pipe-delimited
+voiceptt_transcriptions.txt is imported once on first use.
+"""
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_HISTORY_SETTINGS = {
+    "db_path": "voiceptt_history.db",
+    "flush_s": 2.0,             # buffer new entries this long before one batched write
+    "search_limit": 10,
+    "import_path": "voiceptt_transcriptions.txt",  # legacy text history, imported once
+}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, ts TEXT NOT NULL, text TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(text, content='entries', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def parse_text_history(path):
+    """Yield (datetime, text) from the legacy 'YYYY-mm-dd HH:MM:SS | text' file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip("\n").split(' | ', 1)
+            if len(parts) != 2 or not parts[1]:
+                continue
+            try:
+                yield datetime.strptime(parts[0], TIMESTAMP_FORMAT), parts[1]
+            except ValueError:
+                continue
+
+
+def fts_query(query):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r"\w+", query, re.UNICODE)
+    return " ".join(f'"{w}"*' for w in words)
+
+
+class HistoryStore:
+    """SQLite-backed transcription history with batched appends and full-text search"""
+
+    def __init__(self, settings, logger=None):
+        self.settings = settings
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.pending = []  # (timestamp, text) not yet written
+        self.flush_timer = None
+        self.db = sqlite3.connect(settings["db_path"], check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        try:
+            self.db.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            self.fts = False
+            if self.logger:
+                self.logger.warning("SQLite has no FTS5; history search will scan")
+        self.db.commit()
+        if settings["import_path"]:
+            self.import_text(settings["import_path"])
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.info(message)
+
+    def import_text(self, path):
+        """Import the legacy text history once; returns the number of entries added"""
+        if not os.path.exists(path):
+            return 0
+        with self.lock:
+            if self.db.execute("SELECT 1 FROM meta WHERE key = 'imported_text'").fetchone():
+                return 0
+            rows = [(when.strftime(TIMESTAMP_FORMAT), text) for when, text in parse_text_history(path)]
+            with self.db:
+                self.db.executemany("INSERT INTO entries (ts, text) VALUES (?, ?)", rows)
+                self.db.execute("INSERT INTO meta VALUES ('imported_text', ?)", (os.path.abspath(path),))
+        self._log(f"Imported {len(rows)} transcriptions from {path}")
+        return len(rows)
+
+    def add(self, text, when=None):
+        """Queue an entry; it is written with the next batch"""
+        with self.lock:
+            self.pending.append(((when or datetime.now()).strftime(TIMESTAMP_FORMAT), text))
+            if self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.settings["flush_s"], self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+
+    def flush(self):
+        """Write all queued entries in one transaction"""
+        with self.lock:
+            rows, self.pending = self.pending, []
+            timer, self.flush_timer = self.flush_timer, None
+            if timer is not None:
+                timer.cancel()
+            if not rows:
+                return
+            try:
+                with self.db:
+                    self.db.executemany("INSERT INTO entries (ts, text) VALUES (?, ?)", rows)
+            except sqlite3.Error as e:
+                self.pending = rows + self.pending
+                if self.logger:
+                    self.logger.error(f"Failed to save {len(rows)} transcriptions: {e}")
+
+    @staticmethod
+    def _entry(ts, text):
+        when = datetime.strptime(ts, TIMESTAMP_FORMAT)
+        return {"text": text, "timestamp": when.strftime("%H:%M:%S"), "date": when.isoformat()}
+
+    def recent(self, limit=10):
+        """Newest entries (including unflushed ones), oldest first"""
+        with self.lock:
+            rows = self.db.execute("SELECT ts, text FROM entries ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            rows = rows[::-1] + self.pending
+        return [self._entry(ts, text) for ts, text in rows[-limit:]]
+
+    def search(self, query, limit=None):
+        """Entries matching every word of query, best matches first"""
+        limit = limit or self.settings["search_limit"]
+        self.flush()
+        with self.lock:
+            if self.fts:
+                match = fts_query(query)
+                if not match:
+                    return []
+                rows = self.db.execute(
+                    "SELECT e.ts, e.text FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+                    "WHERE entries_fts MATCH ? ORDER BY rank LIMIT ?", (match, limit)).fetchall()
+            else:
+                rows = self.db.execute("SELECT ts, text FROM entries WHERE text LIKE ? ORDER BY id DESC LIMIT ?",
+                                       (f"%{query}%", limit)).fetchall()
+        return [self._entry(ts, text) for ts, text in rows]
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] + len(self.pending)
+
+    def clear(self):
+        """Delete every entry"""
+        with self.lock:
+            self.pending = []
+            with self.db:
+                self.db.execute("DELETE FROM entries")  # the trigger empties the index too
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,177 @@
+"""Transcription job scheduler: a bounded queue, ordered delivery and cancellation
+
+Each released recording becomes an immutable TranscriptionJob that owns its audio
+(a read-only copy or memmap, or the streamer that decoded it). Jobs wait in one
+bounded queue and are consumed by a single inference worker. With batching enabled,
+one worker per batch slot lets the engine decode waiting jobs together. Results are
+handed back strictly in submission order, so text never pastes out of order even
+when a later job finishes first. Cancelled and stale jobs are skipped before
+they reach the model.
+"""
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_JOB_SETTINGS = {
+    "max_pending": 4,   # recordings waiting for the model before new ones are refused
+    "workers": 0,       # 0: one, or batching.max_batch when batching is enabled
+    "max_age_s": 120,   # jobs still waiting after this long are dropped as stale (0: never)
+}
+
+
+class JobQueueFull(Exception):
+    """Too many recordings are already waiting for the model"""
+
+
+@dataclass(frozen=True)
+class TranscriptionJob:
+    """One released recording; never modified after submission"""
+    id: int
+    kind: str                      # "audio" or "stream"
+    released_at: float             # perf_counter at key release
+    audio: Any = None              # int16 PCM (kind "audio")
+    streamer: Any = None           # StreamingTranscriber (kind "stream")
+    end_sample: int = 0
+    features: Any = None           # MelFeatures computed while recording
+    created_at: float = 0.0        # monotonic submit time, for staleness
+
+    @property
+    def audio_s(self):
+        from voiceptt.audio import SAMPLE_RATE
+        return len(self.audio) / SAMPLE_RATE if self.audio is not None else 0.0
+
+
+class JobScheduler:
+    """Feeds jobs to worker threads and delivers (job, status, value) in FIFO order
+
+    run(job) returns the text and runs on a worker thread. deliver(job, status, value)
+    is called with status "done" (value is the text), "failed" (value is the
+    exception) or "cancelled" (value is the reason), one job at a time, in
+    submission order.
+    """
+
+    def __init__(self, run, deliver, settings, workers=1, logger=None, on_depth=None):
+        self.run = run
+        self.deliver = deliver
+        self.settings = settings
+        self.logger = logger
+        self.on_depth = on_depth  # on_depth(waiting, active) whenever either changes
+        self.pending = queue.Queue(maxsize=settings["max_pending"])
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self.delivery_lock = threading.Lock()
+        self.next_delivery = 1
+        self.finished = {}     # job id -> (job, status, value), waiting for earlier jobs
+        self.cancelled = {}    # job id -> reason
+        self.active = 0        # jobs taken by a worker and not yet finished
+        self.ready = threading.Event()  # workers hold jobs until resume()
+        self.resumed_at = 0.0
+        for _ in range(max(1, workers)):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, kind, released_at, **fields):
+        """Queue a recording; raises JobQueueFull when max_pending jobs are waiting"""
+        with self.lock:
+            if self.pending.full():
+                raise JobQueueFull(f"{self.pending.qsize()} recordings already waiting")
+            self.last_id += 1
+            job = TranscriptionJob(self.last_id, kind, released_at,
+                                   created_at=time.monotonic(), **fields)
+            self.pending.put_nowait(job)
+        self._depth_changed()
+        return job
+
+    def resume(self):
+        """Let workers start on queued jobs (called once the model is loaded)"""
+        if not self.ready.is_set():
+            self.resumed_at = time.monotonic()
+            self.ready.set()
+
+    def cancel(self, job_id, reason="cancelled"):
+        """Skip a job that has not finished yet; its delivery reports the reason"""
+        with self.lock:
+            if job_id >= self.next_delivery and job_id not in self.finished:
+                self.cancelled[job_id] = reason
+
+    def cancel_all(self, reason="cancelled"):
+        """Cancel every submitted job that has not been delivered; returns how many"""
+        with self.lock:
+            ids = [i for i in range(self.next_delivery, self.last_id + 1) if i not in self.finished]
+            for job_id in ids:
+                self.cancelled[job_id] = reason
+        # Jobs already finished but held for ordering are still delivered as done
+        if not self.ready.is_set():
+            # Nothing will consume them while paused: drain the queue here
+            self._drain()
+        return len(ids)
+
+    def depth(self):
+        """(waiting, active) job counts"""
+        with self.lock:
+            return self.pending.qsize(), self.active
+
+    def _drain(self):
+        while True:
+            try:
+                job = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            self._finish(job, "cancelled", self.cancelled.pop(job.id, "cancelled"))
+
+    def _skip_reason(self, job):
+        with self.lock:
+            reason = self.cancelled.pop(job.id, None)
+        # Time spent waiting for the first model load does not count
+        waited = time.monotonic() - max(job.created_at, self.resumed_at)
+        if reason is None and self.settings["max_age_s"] and waited > self.settings["max_age_s"]:
+            reason = f"stale after {self.settings['max_age_s']}s in the queue"
+        return reason
+
+    def _worker(self):
+        while True:
+            self.ready.wait()
+            job = self.pending.get()
+            reason = self._skip_reason(job)
+            if reason is not None:
+                self._finish(job, "cancelled", reason)
+                continue
+            with self.lock:
+                self.active += 1
+            self._depth_changed()
+            try:
+                status, value = "done", self.run(job)
+            except Exception as e:
+                status, value = "failed", e
+                if self.logger:
+                    self.logger.error(f"Transcription job {job.id} failed: {e}")
+            with self.lock:
+                self.active -= 1
+                # Cancelled while decoding: the model call cannot be interrupted, the result is dropped
+                reason = self.cancelled.pop(job.id, None)
+            if reason is not None:
+                status, value = "cancelled", reason
+            self._finish(job, status, value)
+
+    def _finish(self, job, status, value):
+        with self.lock:
+            self.finished[job.id] = (job, status, value)
+        # Deliver every consecutive finished job; one thread delivers at a time
+        with self.delivery_lock:
+            while True:
+                with self.lock:
+                    outcome = self.finished.pop(self.next_delivery, None)
+                    if outcome is None:
+                        break
+                    self.next_delivery += 1
+                try:
+                    self.deliver(*outcome)
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"Delivering job {outcome[0].id} failed: {e}")
+        self._depth_changed()
+
+    def _depth_changed(self):
+        if self.on_depth:
+            self.on_depth(*self.depth())
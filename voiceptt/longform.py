@@ -0,0 +1,95 @@
+"""Long dictation: spill the recording to a memory-mapped file and decode it in chunk batches
+
+Short recordings stay in the capture ring. Once a recording passes spill_after_s, a
+writer thread copies it out of the ring into a temp file in bounded pieces. On
+release the file is memory-mapped, so nothing is concatenated in RAM. Decoding cuts
+the recording at pauses into chunks under Whisper's 30 s window. parallel_chunks of
+them go through the encoder as one batch at a time. Each chunk is then decoded in order
+with the profile's options and the text before it as prompt; under the fast profile the
+whole group is one greedy decoder batch. Memory therefore depends on the batch size,
+not on how long the recording is.
+"""
+import mmap
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+
+DEFAULT_LONGFORM_SETTINGS = {
+    "enabled": True,
+    "spill_after_s": 60,     # start copying the recording to disk after this long
+    "spill_dir": None,       # temp directory for spill files (default: system temp)
+    "chunk_s": 28,           # longest chunk, inside Whisper's 30 s window
+    "parallel_chunks": 4,    # chunks encoded together in one batch
+}
+
+SPILL_PIECE = 10 * SAMPLE_RATE  # samples copied out of the ring per write
+
+
+class SpillWriter:
+    """Copies a growing recording from the capture ring into a file as it is captured"""
+
+    def __init__(self, capture, start_sample, directory=None, interval_s=1.0, logger=None):
+        self.capture = capture
+        self.cursor = start_sample
+        self.interval_s = interval_s
+        self.logger = logger
+        fd, self.path = tempfile.mkstemp(prefix="voiceptt-", suffix=".pcm", dir=directory)
+        self.file = os.fdopen(fd, "wb")
+        self.lost = 0  # samples overwritten in the ring before they were spilled
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        if logger:
+            logger.info(f"Spilling long recording to {self.path}")
+
+    def _run(self):
+        while not self.stopping.wait(self.interval_s):
+            self._drain(self.capture.position)
+
+    def _drain(self, end):
+        with self.lock:
+            if self.cursor < self.capture.oldest:
+                self.lost += self.capture.oldest - self.cursor
+                self.cursor = self.capture.oldest
+            while self.cursor < end:
+                piece_end = min(end, self.cursor + SPILL_PIECE)
+                self.file.write(self.capture.read(self.cursor, piece_end).tobytes())
+                self.cursor = piece_end
+
+    def finish(self, end_sample):
+        """Spill up to end_sample and return the whole recording as a read-only memmap"""
+        self.stopping.set()
+        self.thread.join()
+        self._drain(end_sample)
+        self.file.close()
+        if self.lost and self.logger:
+            self.logger.warning(f"Spill fell behind; {self.lost / SAMPLE_RATE:.1f}s of audio lost")
+        try:
+            if os.path.getsize(self.path) == 0:
+                return np.empty(0, dtype=np.int16)
+            return np.memmap(self.path, dtype=np.int16, mode='r')
+        finally:
+            # The mapping keeps the data alive; the name is not needed any more
+            os.unlink(self.path)
+
+    def discard(self):
+        self.stopping.set()
+        self.thread.join()
+        self.file.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def release_pages(pcm):
+    """Let the OS drop already-decoded pages of a memmapped recording from RSS"""
+    mapping = getattr(pcm, "_mmap", None)
+    if mapping is not None and hasattr(mmap, "MADV_DONTNEED"):
+        try:
+            mapping.madvise(mmap.MADV_DONTNEED)
+        except (OSError, ValueError):
+            pass
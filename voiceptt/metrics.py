@@ -0,0 +1,177 @@
+"""Per-stage timing spans, aggregated off the hot path into rolling histograms
+
+Spans are emitted as log records through a QueueHandler, so recording one costs a
+queue put. A QueueListener thread writes them as JSON lines to the metrics log and
+feeds the rolling histograms, which are exported periodically as JSON and as
+Prometheus text.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": True,
+    "window": 500,                     # spans kept per stage for percentiles
+    "log_path": "voiceptt_metrics.log",
+    "export_path": "voiceptt_metrics",  # writes <path>.json and <path>.prom
+    "export_interval_s": 30,
+}
+
+# Pipeline stages in hot-path order, for display
+STAGES = ["capture", "concatenate", "vad", "encode_audio", "model", "clipboard",
+          "paste", "notification", "release_to_clipboard"]
+
+
+class _Aggregator(logging.Handler):
+    """Listener-side handler that folds span records into rolling windows"""
+
+    def __init__(self, window, on_emit=None):
+        super().__init__()
+        self.window = window
+        self.on_emit = on_emit
+        self.seconds = {}   # stage -> deque of durations
+        self.rtf = {}       # stage -> deque of real-time factors
+        self.totals = {}    # stage -> [count, sum_seconds] since start
+        self.window_lock = threading.Lock()  # Handler.lock is taken around emit()
+
+    def emit(self, record):
+        stage = record.stage
+        with self.window_lock:
+            self.seconds.setdefault(stage, deque(maxlen=self.window)).append(record.seconds)
+            if record.rtf is not None:
+                self.rtf.setdefault(stage, deque(maxlen=self.window)).append(record.rtf)
+            total = self.totals.setdefault(stage, [0, 0.0])
+            total[0] += 1
+            total[1] += record.seconds
+        if self.on_emit:
+            self.on_emit(stage)
+
+
+class Metrics:
+    """Records timing spans for each pipeline stage and exports rolling percentiles"""
+
+    def __init__(self, settings=None, logger=None):
+        self.settings = {**DEFAULT_METRICS_SETTINGS, **(settings or {})}
+        self.enabled = self.settings["enabled"]
+        self.logger = logger
+        self.on_update = None  # called on the listener thread with each stage once it is aggregated
+        self.aggregator = _Aggregator(self.settings["window"], self._updated)
+        self.listener = None
+        if not self.enabled:
+            return
+
+        records = queue.SimpleQueue()
+        self.span_logger = logging.getLogger("voiceptt.metrics")
+        self.span_logger.propagate = False
+        self.span_logger.setLevel(logging.INFO)
+        self.queue_handler = logging.handlers.QueueHandler(records)
+        self.span_logger.addHandler(self.queue_handler)
+        handlers = [self.aggregator]
+        if self.settings["log_path"]:
+            span_file = logging.FileHandler(self.settings["log_path"])
+            span_file.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(span_file)
+        self.listener = logging.handlers.QueueListener(records, *handlers)
+        self.listener.start()
+        if self.settings["export_path"]:
+            threading.Thread(target=self._export_loop, daemon=True).start()
+
+    def _updated(self, stage):
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(stage)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Metrics update callback failed: {e}")
+
+    @contextmanager
+    def span(self, stage, audio_s=None, **fields):
+        """Time the enclosed block as one span of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, audio_s, **fields)
+
+    def record(self, stage, seconds, audio_s=None, **fields):
+        """Queue one span; never blocks on I/O"""
+        if not self.enabled:
+            return
+        rtf = seconds / audio_s if audio_s else None
+        message = json.dumps({"ts": round(time.time(), 3), "stage": stage, "ms": round(seconds * 1000, 2),
+                              "audio_s": audio_s, "rtf": rtf, **fields})
+        self.span_logger.info(message, extra={"stage": stage, "seconds": seconds, "rtf": rtf})
+
+    def snapshot(self):
+        """Current p50/p95 (ms) and median real-time factor for every stage seen"""
+        agg = self.aggregator
+        with agg.window_lock:
+            seconds = {stage: list(values) for stage, values in agg.seconds.items()}
+            rtf = {stage: list(values) for stage, values in agg.rtf.items()}
+            totals = {stage: list(total) for stage, total in agg.totals.items()}
+        stats = {}
+        for stage in sorted(seconds, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+            p50, p95 = np.percentile(seconds[stage], [50, 95]) * 1000
+            stats[stage] = {"count": totals[stage][0], "sum_s": totals[stage][1],
+                            "p50_ms": float(p50), "p95_ms": float(p95),
+                            "rtf_p50": float(np.median(rtf[stage])) if rtf.get(stage) else None}
+        return stats
+
+    def export(self):
+        """Write the snapshot as <export_path>.json and Prometheus text <export_path>.prom"""
+        stats = self.snapshot()
+        base = self.settings["export_path"]
+        lines = [
+            "# HELP voiceptt_stage_seconds Pipeline stage latency over the rolling window",
+            "# TYPE voiceptt_stage_seconds summary",
+        ]
+        for stage, s in stats.items():
+            lines.append(f'voiceptt_stage_seconds{{stage="{stage}",quantile="0.5"}} {s["p50_ms"] / 1000:.6f}')
+            lines.append(f'voiceptt_stage_seconds{{stage="{stage}",quantile="0.95"}} {s["p95_ms"] / 1000:.6f}')
+            lines.append(f'voiceptt_stage_seconds_sum{{stage="{stage}"}} {s["sum_s"]:.6f}')
+            lines.append(f'voiceptt_stage_seconds_count{{stage="{stage}"}} {s["count"]}')
+        lines += [
+            "# HELP voiceptt_stage_rtf Median real-time factor (processing time / audio time)",
+            "# TYPE voiceptt_stage_rtf gauge",
+        ]
+        lines += [f'voiceptt_stage_rtf{{stage="{stage}"}} {s["rtf_p50"]:.6f}'
+                  for stage, s in stats.items() if s["rtf_p50"] is not None]
+        for path, content in ((f"{base}.json", json.dumps(stats, indent=2)),
+                              (f"{base}.prom", "\n".join(lines) + "\n")):
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(content)
+            os.replace(tmp, path)
+
+    def _export_loop(self):
+        while True:
+            time.sleep(self.settings["export_interval_s"])
+            try:
+                self.export()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Metrics export failed: {e}")
+
+    def summary_line(self, stage="release_to_clipboard"):
+        """Short p50/p95 text for the menu"""
+        stats = self.snapshot().get(stage)
+        if not stats:
+            return "No measurements yet"
+        return f"p50 {stats['p50_ms']:.0f} ms • p95 {stats['p95_ms']:.0f} ms"
+
+    def stop(self):
+        if self.listener is not None:
+            self.span_logger.removeHandler(self.queue_handler)
+            self.listener.stop()
+            self.listener = None
+            if self.settings["export_path"]:
+                self.export()
@@ -0,0 +1,178 @@
+"""Resident Whisper model pool with a RAM budget, LRU eviction and idle unload"""
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+
+DEFAULT_MODEL_POOL_SETTINGS = {
+    "ram_budget_mb": 4096,   # total weights kept resident across model sizes
+    "idle_unload_s": 900,    # unload a model unused for this long (0 disables)
+    "warmup": True,          # run one inference right after each load
+    "cache_dir": "~/.cache/voiceptt",  # serialized int8 models and exported ONNX graphs
+    "backend": "torch",      # "torch" (openai-whisper) or "onnx" (ONNX Runtime)
+    "onnx_threads": 0,       # intra-op threads per ONNX session (0: one per physical core)
+}
+
+# Approximate fp32 weight sizes, used until a loaded model has been measured
+ESTIMATED_MODEL_MB = {"tiny": 150, "base": 290, "small": 970, "medium": 3060, "large": 6170}
+
+
+def load_whisper(size):
+    """Default loader: full-precision openai-whisper checkpoint"""
+    import whisper
+    return whisper.load_model(size)
+
+
+def model_key(size, precision="fp32"):
+    """Pool key for a model size at a given precision"""
+    return size if precision == "fp32" else f"{size}:{precision}"
+
+
+def load_variant(key, cache_dir):
+    """Loader for pool keys: fp32 checkpoints or cached int8 models"""
+    size, _, precision = key.partition(":")
+    if precision == "int8":
+        from voiceptt.quantize import load_int8
+        return load_int8(size, os.path.expanduser(cache_dir))
+    return load_whisper(size)
+
+
+def estimate_mb(key):
+    """Expected resident size of a pool key before it is loaded"""
+    size, _, precision = key.partition(":")
+    mb = ESTIMATED_MODEL_MB.get(size, 1000)
+    # int8 shrinks the linear layers 4x but embeddings and convs stay fp32
+    return mb / 3 if precision == "int8" else mb
+
+
+def model_size_mb(model):
+    """Resident size of a torch module's parameters, buffers and packed int8 weights"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    # Dynamically quantized linears keep their weights outside parameters()
+    tensors += [m.weight() for m in model.modules() if callable(getattr(m, "weight", None))]
+    return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+
+
+def warm_up(model):
+    """Run one short inference so the first real transcription is not a cold one"""
+    model.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32), language="en")
+
+
+class ModelPool:
+    """Keeps several models resident, evicting the least recently used over budget"""
+
+    def __init__(self, settings, backend=None, logger=None):
+        if backend is None:
+            from voiceptt.backends import create_backend
+            backend = create_backend(settings)
+        self.settings = settings
+        self.backend = backend  # loads, measures and warms up models
+        self.logger = logger
+        self.models = OrderedDict()  # key -> {"model", "mb", "last_used"}, LRU first
+        self.loading = {}            # key -> Event set when an in-flight load ends
+        self.lock = threading.Lock()
+        self.reaper = None
+        if settings["idle_unload_s"]:
+            self.reaper = threading.Thread(target=self._reap_idle, daemon=True)
+            self.reaper.start()
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.info(message)
+
+    def peek(self, key):
+        """Return a resident model without loading it"""
+        with self.lock:
+            entry = self.models.get(key)
+            if entry is None:
+                return None
+            self.models.move_to_end(key)
+            entry["last_used"] = time.time()
+            return entry["model"]
+
+    def is_loading(self, key):
+        with self.lock:
+            return key in self.loading
+
+    def resident(self):
+        """Keys of loaded models, least recently used first"""
+        with self.lock:
+            return list(self.models)
+
+    def most_recent(self):
+        """The most recently used resident model, if any"""
+        with self.lock:
+            if not self.models:
+                return None
+            return next(reversed(self.models.values()))["model"]
+
+    def get(self, key):
+        """Return the model for key, loading it (once) if it is not resident"""
+        while True:
+            model = self.peek(key)
+            if model is not None:
+                return model
+            with self.lock:
+                pending = self.loading.get(key)
+                if pending is None:
+                    pending = self.loading[key] = threading.Event()
+                    break
+            # Another thread is loading this model; wait and re-check
+            pending.wait()
+        try:
+            return self._load(key)
+        finally:
+            with self.lock:
+                self.loading.pop(key).set()
+
+    def prefetch(self, key):
+        """Start loading key in the background if it is not resident"""
+        if self.peek(key) is None and not self.is_loading(key):
+            threading.Thread(target=self.get, args=(key,), daemon=True).start()
+
+    def _load(self, key):
+        start = time.time()
+        # Make room first so peak memory stays under budget while loading
+        with self.lock:
+            self._evict_locked(estimate_mb(key))
+        model = self.backend.load(key)
+        mb = self.backend.size_mb(model)
+        if self.settings["warmup"]:
+            self.backend.warm_up(model)
+        self._log(f"Loaded model {key} ({mb:.0f} MB) in {time.time() - start:.1f}s")
+        with self.lock:
+            self._evict_locked(mb)
+            self.models[key] = {"model": model, "mb": mb, "last_used": time.time()}
+        return model
+
+    def _evict_locked(self, incoming_mb):
+        budget = self.settings["ram_budget_mb"]
+        used = sum(entry["mb"] for entry in self.models.values())
+        while self.models and used + incoming_mb > budget:
+            key, entry = self.models.popitem(last=False)
+            used -= entry["mb"]
+            self._log(f"Evicted model {key} ({entry['mb']:.0f} MB) to stay under {budget} MB")
+        gc.collect()
+
+    def unload(self, key):
+        with self.lock:
+            entry = self.models.pop(key, None)
+        if entry is not None:
+            self._log(f"Unloaded model {key}")
+            del entry
+            gc.collect()
+
+    def _reap_idle(self):
+        idle = self.settings["idle_unload_s"]
+        while True:
+            time.sleep(min(60, idle))
+            now = time.time()
+            with self.lock:
+                stale = [k for k, e in self.models.items() if now - e["last_used"] > idle]
+            for key in stale:
+                self.unload(key)
@@ -0,0 +1,119 @@
+"""Export a Whisper checkpoint to the two ONNX graphs the onnx backend runs
+
+encoder.onnx turns a (batch, n_mels, 3000) log-mel into the cross-attention keys and
+values of every decoder layer, so they are computed once per clip instead of once
+per token. decoder.onnx takes new tokens plus the self-attention keys/values of the
+tokens before them and returns the next logits and the extended cache. Each
+decoding step therefore only runs the layers for the newest token.
+
+Needs torch, openai-whisper and onnx; only used the first time a model is exported.
+"""
+import json
+import os
+
+import torch
+import whisper
+from whisper.model import MultiHeadAttention
+
+OPSET = 17
+
+
+class AudioEncoder(torch.nn.Module):
+    """mel -> cross-attention keys and values, (layers, batch, audio_ctx, state) each"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+        self.blocks = model.decoder.blocks
+
+    def forward(self, mel):
+        features = self.encoder(mel)
+        keys = torch.stack([block.cross_attn.key(features) for block in self.blocks])
+        values = torch.stack([block.cross_attn.value(features) for block in self.blocks])
+        return keys, values
+
+
+class TextDecoder(torch.nn.Module):
+    """One decoding step over new tokens, reusing cached self-attention keys/values"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.decoder
+        self.n_head = model.dims.n_text_head
+
+    def attend(self, q, k, v, bias=None):
+        batch, n, state = q.shape
+        q = q.view(batch, n, self.n_head, -1).transpose(1, 2)
+        k = k.view(batch, k.shape[1], self.n_head, -1).transpose(1, 2)
+        v = v.view(batch, v.shape[1], self.n_head, -1).transpose(1, 2)
+        scores = q @ k.transpose(-1, -2) / (state // self.n_head) ** 0.5
+        if bias is not None:
+            scores = scores + bias
+        return (scores.softmax(dim=-1) @ v).transpose(1, 2).reshape(batch, n, state)
+
+    def forward(self, tokens, self_k, self_v, cross_k, cross_v, select):
+        decoder = self.decoder
+        past = self_k.shape[2]
+        positions = torch.arange(tokens.shape[1]) + past
+        x = decoder.token_embedding(tokens) + decoder.positional_embedding[positions]
+        # New token j sees every cached token and new tokens up to itself
+        future = torch.arange(past + tokens.shape[1]).unsqueeze(0) > positions.unsqueeze(1)
+        bias = torch.zeros(future.shape).masked_fill(future, float("-inf"))
+        keys, values = [], []
+        for i, block in enumerate(decoder.blocks):
+            h = block.attn_ln(x)
+            k = torch.cat([self_k[i], block.attn.key(h)], dim=1)
+            v = torch.cat([self_v[i], block.attn.value(h)], dim=1)
+            keys.append(k)
+            values.append(v)
+            x = x + block.attn.out(self.attend(block.attn.query(h), k, v, bias))
+            h = block.cross_attn_ln(x)
+            x = x + block.cross_attn.out(self.attend(block.cross_attn.query(h), cross_k[i], cross_v[i]))
+            x = x + block.mlp(block.mlp_ln(x))
+        # Logits only at the requested positions: the vocabulary projection is the costly part
+        x = decoder.ln(x[:, select])
+        logits = x @ decoder.token_embedding.weight.T
+        return logits, torch.stack(keys), torch.stack(values)
+
+
+def export(size, directory):
+    """Write encoder.onnx, decoder.onnx and config.json for a Whisper size into directory"""
+    model = whisper.load_model(size, device="cpu").eval()
+    return export_model(model, directory)
+
+
+def export_model(model, directory):
+    dims = model.dims
+    os.makedirs(directory, exist_ok=True)
+    layers, state = dims.n_text_layer, dims.n_text_state
+    mel = torch.zeros(1, dims.n_mels, dims.n_audio_ctx * 2)
+    cross = torch.zeros(layers, 1, dims.n_audio_ctx, state)
+    cache = torch.zeros(layers, 1, 2, state)
+    tokens = torch.zeros(1, 3, dtype=torch.long)
+    select = torch.tensor([0, 2])
+
+    sdpa = MultiHeadAttention.use_sdpa
+    MultiHeadAttention.use_sdpa = False  # plain matmuls export on every opset
+    try:
+        with torch.no_grad():
+            torch.onnx.export(AudioEncoder(model), (mel,), os.path.join(directory, "encoder.onnx"),
+                              input_names=["mel"], output_names=["cross_k", "cross_v"],
+                              dynamic_axes={"mel": {0: "batch"}, "cross_k": {1: "batch"}, "cross_v": {1: "batch"}},
+                              opset_version=OPSET, dynamo=False)
+            torch.onnx.export(TextDecoder(model), (tokens, cache, cache, cross, cross, select),
+                              os.path.join(directory, "decoder.onnx"),
+                              input_names=["tokens", "self_k", "self_v", "cross_k", "cross_v", "select"],
+                              output_names=["logits", "new_k", "new_v"],
+                              dynamic_axes={"tokens": {0: "batch", 1: "tokens"},
+                                            "self_k": {1: "batch", 2: "past"}, "self_v": {1: "batch", 2: "past"},
+                                            "cross_k": {1: "batch"}, "cross_v": {1: "batch"},
+                                            "select": {0: "select"}, "logits": {0: "batch", 1: "select"},
+                                            "new_k": {1: "batch", 2: "total"}, "new_v": {1: "batch", 2: "total"}},
+                              opset_version=OPSET, dynamo=False)
+    finally:
+        MultiHeadAttention.use_sdpa = sdpa
+    config = {"dims": vars(dims), "is_multilingual": model.is_multilingual,
+              "num_languages": model.num_languages}
+    with open(os.path.join(directory, "config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+    return directory
@@ -0,0 +1,345 @@
+"""Whisper on ONNX Runtime: exported encoder/decoder graphs and a numpy decoding loop
+
+The encoder computes every decoder layer's cross-attention keys and values once per
+clip. The decoder keeps the self-attention keys/values of earlier tokens between
+steps (the KV cache), so each step only runs the newest token through it. Decoding
+follows whisper.decode without timestamps: the same prompt layout, suppressed
+tokens, greedy and beam search, best-of sampling and temperature fallback. Neither
+torch nor the whisper package is imported. The tokenizer and mel filters are read
+from whisper's installed files.
+
+Graphs are exported on first use (which needs torch once) into
+<cache_dir>/onnx/whisper-<size>/, or ahead of time with
+
+    python -m voiceptt.onnx_whisper tiny base --int8
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE, float32_to_pcm, load_audio_file, pcm_to_float32
+from voiceptt.features import N_FRAMES, N_SAMPLES, log_mel
+from voiceptt.streaming import split_at_pauses
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/voiceptt")
+WINDOW_SECONDS = 28  # longer audio is cut at pauses into windows this long
+
+# whisper.transcribe's defaults for deciding when to retry at a higher temperature
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+_tokenizers = {}
+
+
+def model_dir(size, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, "onnx", f"whisper-{size}")
+
+
+def graph_path(directory, name, precision="fp32"):
+    return os.path.join(directory, f"{name}.onnx" if precision == "fp32" else f"{name}-{precision}.onnx")
+
+
+def ensure_exported(size, cache_dir=DEFAULT_CACHE_DIR, precision="fp32", log=None):
+    """Export (and for int8 quantize) the graphs for a size unless they are cached"""
+    directory = model_dir(size, cache_dir)
+    if not os.path.exists(os.path.join(directory, "config.json")):
+        from voiceptt.onnx_export import export
+        if log:
+            log(f"Exporting whisper {size} to ONNX in {directory}")
+        tmp = directory + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        export(size, tmp)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+    if precision == "int8" and not os.path.exists(graph_path(directory, "decoder", "int8")):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        for name in ("encoder", "decoder"):
+            tmp = graph_path(directory, name, "int8") + ".tmp"
+            # Only the matrix multiplies, as the torch int8 model quantizes only linear layers
+            quantize_dynamic(graph_path(directory, name), tmp, op_types_to_quantize=["MatMul"],
+                             weight_type=QuantType.QInt8)
+            os.replace(tmp, graph_path(directory, name, "int8"))
+    return directory
+
+
+def load_onnx(size, precision="fp32", cache_dir=DEFAULT_CACHE_DIR, threads=0):
+    """OnnxWhisper for a size, exporting it on first use"""
+    return OnnxWhisper(ensure_exported(size, cache_dir, precision), precision, threads)
+
+
+def get_tokenizer(multilingual, num_languages, language="en"):
+    """whisper.tokenizer.get_tokenizer, loaded from its file so the whisper package (and torch) is not imported"""
+    module = sys.modules.get("whisper.tokenizer") or _tokenizers.get("module")
+    if module is None:
+        spec = importlib.util.find_spec("whisper")
+        if spec is None or not spec.submodule_search_locations:
+            raise ImportError("whisper is not installed")
+        path = os.path.join(spec.submodule_search_locations[0], "tokenizer.py")
+        module_spec = importlib.util.spec_from_file_location("voiceptt_whisper_tokenizer", path)
+        module = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(module)
+        _tokenizers["module"] = module
+    return module.get_tokenizer(multilingual, num_languages=num_languages, language=language, task="transcribe")
+
+
+def compression_ratio(text):
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+def log_softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    return shifted - np.log(np.exp(shifted).sum(axis=-1, keepdims=True))
+
+
+class BeamSearch:
+    """whisper's BeamSearchDecoder over numpy arrays; the caller reorders the KV cache"""
+
+    def __init__(self, beam_size, eot, n_audio, patience=None):
+        self.beam_size = beam_size
+        self.eot = eot
+        self.max_candidates = round(beam_size * (patience or 1.0))
+        self.finished = [{} for _ in range(n_audio)]
+
+    def update(self, tokens, logits, sum_logprobs):
+        """(tokens, rows each new row continues, completed)"""
+        logprobs = log_softmax(logits)
+        next_tokens, sources = [], []
+        for i, previous in enumerate(self.finished):
+            scores, origin, finished = {}, {}, {}
+            for idx in range(i * self.beam_size, (i + 1) * self.beam_size):
+                prefix = tuple(tokens[idx].tolist())
+                top = np.argsort(-logprobs[idx])[:self.beam_size + 1]
+                for token in top:
+                    sequence = prefix + (int(token),)
+                    scores[sequence] = sum_logprobs[idx] + logprobs[idx, token]
+                    origin[sequence] = idx
+            saved = 0
+            for sequence in sorted(scores, key=scores.get, reverse=True):
+                if sequence[-1] == self.eot:
+                    finished[sequence] = scores[sequence]
+                else:
+                    sum_logprobs[len(next_tokens)] = scores[sequence]
+                    next_tokens.append(sequence)
+                    sources.append(origin[sequence])
+                    saved += 1
+                    if saved == self.beam_size:
+                        break
+            for sequence in sorted(finished, key=finished.get, reverse=True):
+                if len(previous) >= self.max_candidates:
+                    break
+                previous[sequence] = finished[sequence]
+        completed = all(len(s) >= self.max_candidates for s in self.finished)
+        return np.array(next_tokens, dtype=np.int64), sources, completed
+
+    def finalize(self, tokens, sum_logprobs):
+        """Finished sequences per audio, topped up with the best unfinished ones"""
+        for i, sequences in enumerate(self.finished):
+            for j in np.argsort(sum_logprobs[i])[::-1]:
+                if len(sequences) >= self.beam_size:
+                    break
+                sequences[tuple(tokens[i, j].tolist()) + (self.eot,)] = sum_logprobs[i, j]
+        return [list(s) for s in self.finished], [list(s.values()) for s in self.finished]
+
+
+class OnnxWhisper:
+    """Exported Whisper graphs with the parts of whisper.Whisper the engine uses"""
+
+    def __init__(self, directory, precision="fp32", threads=0):
+        import onnxruntime
+        with open(os.path.join(directory, "config.json")) as f:
+            config = json.load(f)
+        self.dims = SimpleNamespace(**config["dims"])
+        self.device = SimpleNamespace(type="cpu")  # decode_options() then leaves fp16 off
+        self.multilingual = config["is_multilingual"]
+        self.num_languages = config["num_languages"]
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        paths = [graph_path(directory, name, precision) for name in ("encoder", "decoder")]
+        self.encoder, self.decoder = [onnxruntime.InferenceSession(p, options, providers=["CPUExecutionProvider"])
+                                      for p in paths]
+        self.size_mb = sum(os.path.getsize(p) for p in paths) / (1024 * 1024)
+        self.rng = np.random.default_rng()
+
+    def tokenizer(self, language="en"):
+        return get_tokenizer(self.multilingual, self.num_languages, language)
+
+    def log_mel(self, audio):
+        """(n_mels, 3000) mel of the first 30 s of int16 or float32 audio"""
+        return log_mel(audio[:N_SAMPLES], self.dims.n_mels)[:, :N_FRAMES]
+
+    def encode(self, mel):
+        """Cross-attention keys and values for a (batch, n_mels, 3000) mel"""
+        return self.encoder.run(None, {"mel": np.ascontiguousarray(mel, dtype=np.float32)})
+
+    def decode(self, cross, initial, tokenizer, temperature=0.0, beam_size=None, best_of=None,
+               patience=None, length_penalty=None):
+        """[(tokens, avg_logprob, no_speech_prob)] for each audio in the batch"""
+        n_audio = cross[0].shape[1]
+        n_group = beam_size or best_of or 1
+        cross_k, cross_v = (np.repeat(c, n_group, axis=1) if n_group > 1 else c for c in cross)
+        sample_begin = len(initial)
+        sot_index = initial.index(tokenizer.sot)
+        eot = tokenizer.eot
+        suppress = sorted(set(tokenizer.non_speech_tokens) | {
+            tokenizer.transcribe, tokenizer.translate, tokenizer.sot, tokenizer.sot_prev, tokenizer.sot_lm,
+            *([tokenizer.no_speech] if tokenizer.no_speech is not None else [])})
+        blank = tokenizer.encode(" ") + [eot]
+        beam = BeamSearch(beam_size, eot, n_audio, patience) if beam_size else None
+
+        tokens = np.tile(np.array(initial, dtype=np.int64), (n_audio * n_group, 1))
+        cache = np.zeros((cross_k.shape[0], len(tokens), 0, cross_k.shape[3]), dtype=np.float32)
+        self_k = self_v = cache
+        sum_logprobs = np.zeros(len(tokens))
+        no_speech = [np.nan] * n_audio
+        step = tokens
+        for i in range(self.dims.n_text_ctx // 2):
+            select = np.array([sot_index, step.shape[1] - 1] if i == 0 else [0], dtype=np.int64)
+            logits, self_k, self_v = self.decoder.run(None, {
+                "tokens": step, "self_k": self_k, "self_v": self_v,
+                "cross_k": cross_k, "cross_v": cross_v, "select": select})
+            if i == 0 and tokenizer.no_speech is not None:
+                no_speech = np.exp(log_softmax(logits[::n_group, 0]))[:, tokenizer.no_speech].tolist()
+            logits = logits[:, -1].astype(np.float64)
+            if tokens.shape[1] == sample_begin:
+                logits[:, blank] = -np.inf
+            logits[:, suppress] = -np.inf
+
+            if beam is not None:
+                tokens, sources, completed = beam.update(tokens, logits, sum_logprobs)
+                self_k, self_v = self_k[:, sources], self_v[:, sources]
+            else:
+                if temperature == 0:
+                    next_tokens = logits.argmax(axis=-1)
+                else:
+                    next_tokens = (logits / temperature + self.rng.gumbel(size=logits.shape)).argmax(axis=-1)
+                active = tokens[:, -1] != eot
+                sum_logprobs[active] += log_softmax(logits)[active, next_tokens[active]]
+                next_tokens[~active] = eot
+                tokens = np.concatenate([tokens, next_tokens[:, None]], axis=1)
+                completed = bool((tokens[:, -1] == eot).all())
+            step = tokens[:, -1:]
+            if completed or tokens.shape[1] > self.dims.n_text_ctx:
+                break
+
+        tokens = tokens.reshape(n_audio, n_group, -1)
+        sum_logprobs = sum_logprobs.reshape(n_audio, n_group)
+        if beam is not None:
+            candidates, scores = beam.finalize(tokens, sum_logprobs)
+        else:
+            candidates = [[tuple(t) + (eot,) for t in group.tolist()] for group in tokens]
+            scores = sum_logprobs.tolist()
+        results = []
+        for group, logprobs, no_speech_prob in zip(candidates, scores, no_speech):
+            group = [list(t[sample_begin:t.index(eot, sample_begin)]) for t in group]
+            # whisper's MaximumLikelihoodRanker
+            penalties = [len(t) if length_penalty is None else ((5 + len(t)) / 6) ** length_penalty for t in group]
+            best = int(np.argmax([lp / p for lp, p in zip(logprobs, penalties)]))
+            results.append((group[best], logprobs[best] / (len(group[best]) + 1), no_speech_prob))
+        return results
+
+    def decode_with_fallback(self, cross, initial, tokenizer, temperatures, beam_size=None, best_of=None,
+                             patience=None, length_penalty=None):
+        """Retry at higher temperatures while the text looks repetitive or unlikely, as transcribe() does"""
+        for temperature in temperatures:
+            if temperature > 0:
+                tokens, avg_logprob, no_speech = self.decode(cross, initial, tokenizer, temperature,
+                                                             best_of=best_of, length_penalty=length_penalty)[0]
+            else:
+                tokens, avg_logprob, no_speech = self.decode(cross, initial, tokenizer, beam_size=beam_size,
+                                                             patience=patience, length_penalty=length_penalty)[0]
+            text = tokenizer.decode(tokens)
+            silent = no_speech > NO_SPEECH_THRESHOLD and avg_logprob < LOGPROB_THRESHOLD
+            if silent or (compression_ratio(text.strip()) <= COMPRESSION_RATIO_THRESHOLD
+                          and avg_logprob >= LOGPROB_THRESHOLD):
+                break
+        return tokens, text, silent, temperature
+
+    def transcribe(self, audio, language="en", initial_prompt=None, temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+                   beam_size=None, best_of=None, patience=None, length_penalty=None,
+                   condition_on_previous_text=True, mel=None, **kwargs):
+        """model.transcribe() for float32 audio or a WAV path: {"text": ...}
+
+        mel is the clip's log-mel computed while it was recorded, used instead of
+        recomputing it when the clip fits in one window.
+        """
+        if isinstance(audio, str):
+            audio = pcm_to_float32(load_audio_file(audio))
+        tokenizer = self.tokenizer(language)
+        temperatures = (temperature,) if isinstance(temperature, (int, float)) else tuple(temperature)
+        prompt = tokenizer.encode(" " + initial_prompt.strip()) if initial_prompt else []
+        windows = [(0, len(audio))]
+        if len(audio) > N_SAMPLES:
+            windows = split_at_pauses(float32_to_pcm(audio), WINDOW_SECONDS * SAMPLE_RATE)
+        text = ""
+        for start, end in windows:
+            window_mel = mel[:, :N_FRAMES] if mel is not None and len(windows) == 1 else self.log_mel(audio[start:end])
+            tokens, window_text, used = self._decode_window(
+                self.encode(window_mel[None]), tokenizer, prompt, temperatures, beam_size, best_of,
+                patience, length_penalty)
+            if tokens is None:
+                continue
+            text += window_text
+            # Like transcribe(): a window that needed a high temperature does not prompt the next
+            prompt = prompt + tokens if condition_on_previous_text and used <= 0.5 else []
+        return {"text": text, "language": language}
+
+    def _decode_window(self, cross, tokenizer, prompt, temperatures, beam_size, best_of, patience, length_penalty):
+        """(tokens, text, temperature used) for one encoded window; tokens is None when it is silent"""
+        initial = list(tokenizer.sot_sequence_including_notimestamps)
+        if prompt:
+            initial = [tokenizer.sot_prev] + prompt[-(self.dims.n_text_ctx // 2 - 1):] + initial
+        tokens, _, silent, used = self.decode_with_fallback(cross, initial, tokenizer, temperatures, beam_size,
+                                                            best_of, patience, length_penalty)
+        if silent:
+            return None, "", used
+        # Special tokens a sampled decode may emit are dropped from the text, as in transcribe()
+        return tokens, tokenizer.decode([t for t in tokens if t < tokenizer.eot]), used
+
+    def encode_batch(self, clips):
+        """Encoder output of up to 30 s int16 clips, computed as one batch (one entry per clip)"""
+        cross_k, cross_v = self.encode(np.stack([self.log_mel(clip) for clip in clips]))
+        return [(cross_k[:, i:i + 1], cross_v[:, i:i + 1]) for i in range(len(clips))]
+
+    def transcribe_encoded(self, cross, language="en", initial_prompt=None,
+                           temperature=(0.0, 0.2, 0.4, 0.6, 0.8, 1.0), beam_size=None, best_of=None,
+                           patience=None, length_penalty=None, **kwargs):
+        """transcribe() for one window from encode_batch(): {"text": ...}"""
+        tokenizer = self.tokenizer(language)
+        temperatures = (temperature,) if isinstance(temperature, (int, float)) else tuple(temperature)
+        prompt = tokenizer.encode(" " + initial_prompt.strip()) if initial_prompt else []
+        _, text, _ = self._decode_window(cross, tokenizer, prompt, temperatures, beam_size, best_of,
+                                         patience, length_penalty)
+        return {"text": text, "language": language}
+
+    def decode_batch(self, clips):
+        """Greedy decode of up to 30 s int16 clips as one batch, like batching.decode_batch()"""
+        tokenizer = self.tokenizer("en")
+        cross = self.encode(np.stack([self.log_mel(clip) for clip in clips]))
+        results = self.decode(cross, list(tokenizer.sot_sequence_including_notimestamps), tokenizer)
+        return [tokenizer.decode(tokens).strip() for tokens, _, _ in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Whisper models for the onnx backend")
+    parser.add_argument("models", nargs="+", choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--int8", action="store_true", help="Also write int8-quantized graphs")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+    for size in args.models:
+        directory = ensure_exported(size, args.cache_dir, "int8" if args.int8 else "fp32", log=print)
+        for name in sorted(os.listdir(directory)):
+            print(f"  {name:20} {os.path.getsize(os.path.join(directory, name)) / (1024 * 1024):8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+// Long-lived helper for voiceptt/feedback.py, run with `osascript -l JavaScript`.
+// Reads one JSON command per line on stdin and answers each with
+// {"id": ..., "ok": true} or {"id": ..., "error": "..."} on stdout.
+//
+//   {"id": 1, "op": "notify", "message": "...", "title": "VoicePTT", "subtitle": "..."}
+//   {"id": 2, "op": "keystroke", "key": "v", "using": ["command down"]}
+//   {"id": 3, "op": "sound", "path": "/System/Library/Sounds/Blow.aiff", "volume": 0.3}
+ObjC.import('Foundation');
+ObjC.import('AppKit');
+
+var app = Application.currentApplication();
+app.includeStandardAdditions = true;
+var systemEvents = Application('System Events');
+var stdin = $.NSFileHandle.fileHandleWithStandardInput;
+var stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+var playing = [];  // keep sounds referenced until they finish
+
+function reply(message) {
+    stdout.writeData($(JSON.stringify(message) + '\n').dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function handle(command) {
+    switch (command.op) {
+        case 'notify':
+            var options = {withTitle: command.title || 'VoicePTT'};
+            if (command.subtitle) options.subtitle = command.subtitle;
+            app.displayNotification(command.message, options);
+            break;
+        case 'keystroke':
+            systemEvents.keystroke(command.key, {using: command.using || []});
+            break;
+        case 'sound':
+            playing = playing.filter(function (s) { return s.isPlaying; });
+            var sound = $.NSSound.alloc.initWithContentsOfFileByReference(command.path, true);
+            if (command.volume !== undefined) sound.volume = command.volume;
+            sound.play;
+            playing.push(sound);
+            break;
+        default:
+            throw new Error('Unknown op: ' + command.op);
+    }
+}
+
+var buffer = '';
+while (true) {
+    var data = stdin.availableData;
+    if (data.length === 0) break;  // EOF: the app closed the pipe
+    buffer += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    var lines = buffer.split('\n');
+    buffer = lines.pop();
+    lines.forEach(function (line) {
+        if (!line) return;
+        var command = JSON.parse(line);
+        try {
+            handle(command);
+            reply({id: command.id, ok: true});
+        } catch (e) {
+            reply({id: command.id, error: String(e)});
+        }
+    });
+}
@@ -0,0 +1,105 @@
+"""Named decoding profiles and a per-clip planner that keeps latency inside a budget
+
+A profile maps to Whisper decoding options. In "auto" mode the planner predicts each
+candidate's latency as real-time factor x clip duration. RTFs are measured per model
+and profile (with priors until there is data). It picks the most accurate resident
+model and profile that fit the budget, or the fastest if none does.
+"""
+import threading
+
+from voiceptt.models import ESTIMATED_MODEL_MB
+
+PROFILES = {
+    # Greedy, no temperature fallback, no cross-window conditioning
+    "fast": {"temperature": 0.0, "condition_on_previous_text": False},
+    # model.transcribe()'s defaults, as used before profiles: greedy first, then one sample
+    # per fallback temperature for low-confidence windows
+    "balanced": {"temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0), "condition_on_previous_text": True},
+    # Beam search with Whisper's full fallback ladder
+    "accurate": {"temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0), "beam_size": 5, "best_of": 5,
+                 "patience": 1.0, "condition_on_previous_text": True},
+}
+PROFILE_ORDER = ["fast", "balanced", "accurate"]  # least to most accurate
+MODEL_ORDER = list(ESTIMATED_MODEL_MB)            # tiny ... large
+
+DEFAULT_PROFILE_SETTINGS = {
+    "profile": "balanced",     # "fast", "balanced", "accurate" or "auto"
+    "latency_budget_s": 1.5,   # auto: target release-to-text time for the model call
+    "auto_profiles": ["fast", "balanced", "accurate"],
+}
+
+# CPU real-time factors used until a model/profile pair has been measured
+PRIOR_RTF = {"tiny": 0.04, "base": 0.08, "small": 0.25, "medium": 0.7, "large": 1.4}
+# Balanced costs a greedy pass plus an occasional single-sample fallback
+PROFILE_COST = {"fast": 1.0, "balanced": 1.1, "accurate": 3.0}
+
+
+def decode_options(profile, model):
+    """Keyword arguments for model.transcribe() under a profile"""
+    options = dict(PROFILES[profile])
+    # fp16 is only a win (and only supported) off the CPU
+    options["fp16"] = getattr(getattr(model, "device", None), "type", "cpu") != "cpu"
+    return options
+
+
+def _size(key):
+    return key.partition(":")[0]
+
+
+class ProfilePlanner:
+    """Tracks measured RTF per (model key, profile) and plans each clip"""
+
+    def __init__(self, settings, smoothing=0.3):
+        self.settings = settings
+        self.smoothing = smoothing
+        self.rtf = {}  # (key, profile) -> exponentially weighted RTF
+        self.lock = threading.Lock()
+
+    def observe(self, key, profile, seconds, audio_s):
+        """Fold one measured model call into the RTF estimate"""
+        if audio_s <= 0:
+            return
+        sample = seconds / audio_s
+        with self.lock:
+            previous = self.rtf.get((key, profile))
+            self.rtf[(key, profile)] = sample if previous is None else \
+                previous + self.smoothing * (sample - previous)
+
+    def predicted_rtf(self, key, profile):
+        with self.lock:
+            measured = self.rtf.get((key, profile))
+        if measured is not None:
+            return measured
+        # Scale another measured profile of this model before falling back to the prior
+        with self.lock:
+            other = next(((p, r) for (k, p), r in self.rtf.items() if k == key), None)
+        if other is not None:
+            return other[1] * PROFILE_COST[profile] / PROFILE_COST[other[0]]
+        rtf = PRIOR_RTF.get(_size(key), 1.0) * PROFILE_COST[profile]
+        return rtf / 2 if key.endswith(":int8") else rtf
+
+    def plan(self, audio_s, keys, selected_key):
+        """(key, profile) to use for a clip of audio_s seconds"""
+        profile = self.settings["profile"]
+        if profile != "auto":
+            return selected_key, profile
+        budget = self.settings["latency_budget_s"]
+        candidates = [(key, p) for key in dict.fromkeys(keys) for p in self.settings["auto_profiles"]]
+
+        def accuracy(candidate):
+            key, p = candidate
+            size = _size(key)
+            return (MODEL_ORDER.index(size) if size in MODEL_ORDER else 0, PROFILE_ORDER.index(p))
+
+        for candidate in sorted(candidates, key=accuracy, reverse=True):
+            if self.predicted_rtf(*candidate) * audio_s <= budget:
+                return candidate
+        return min(candidates, key=lambda c: self.predicted_rtf(*c))
+
+    def snapshot(self):
+        """Measured RTFs as {key: {profile: rtf}}"""
+        with self.lock:
+            table = {}
+            for (key, profile), rtf in self.rtf.items():
+                table.setdefault(key, {})[profile] = rtf
+            return table
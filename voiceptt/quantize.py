@@ -0,0 +1,107 @@
+"""Dynamically int8-quantized Whisper models, cached on disk and memory-mapped on load"""
+import argparse
+import difflib
+import json
+import os
+import time
+
+PRECISIONS = ["fp32", "int8"]
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/voiceptt")
+
+
+def _plain_linears(module):
+    """Swap whisper's Linear subclass for nn.Linear so quantize_dynamic recognises it"""
+    import torch
+    for name, child in module.named_children():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            plain = torch.nn.Linear(child.in_features, child.out_features,
+                                    bias=child.bias is not None, device="meta")
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+
+
+def quantize_int8(model):
+    """Quantize every linear layer to int8 weights with dynamic activation scaling"""
+    import torch
+    _plain_linears(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def cache_path(size, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"whisper-{size}-int8.pt")
+
+
+def load_int8(size, cache_dir=DEFAULT_CACHE_DIR):
+    """Load the int8 model from cache, building and serializing it on first use"""
+    import torch
+    import whisper
+    path = cache_path(size, cache_dir)
+    if os.path.exists(path):
+        try:
+            model = torch.load(path, mmap=True, weights_only=False, map_location="cpu")
+        except RuntimeError:
+            # Older cache files are not mmap-compatible; load them normally
+            model = torch.load(path, weights_only=False, map_location="cpu")
+        return model.eval()
+
+    model = quantize_int8(whisper.load_model(size, device="cpu")).eval()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(model, tmp)
+    os.replace(tmp, path)
+    return model
+
+
+def word_difference(reference, hypothesis):
+    """Fraction of reference words changed (a WER-like edit ratio)"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    matcher = difflib.SequenceMatcher(None, ref, hyp, autojunk=False)
+    edits = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal")
+    return edits / len(ref)
+
+
+def compare_precision(size, clips, cache_dir=DEFAULT_CACHE_DIR, logger=None):
+    """Load time, per-clip latency and text difference of int8 against fp32"""
+    import whisper
+    from voiceptt.audio import SAMPLE_RATE, pcm_to_float32
+
+    loaders = {"fp32": lambda: whisper.load_model(size, device="cpu"),
+               "int8": lambda: load_int8(size, cache_dir)}
+    report = {"model": size, "clips": [len(c) / SAMPLE_RATE for c in clips]}
+    texts = {}
+    for precision, loader in loaders.items():
+        start = time.perf_counter()
+        model = loader()
+        load_s = time.perf_counter() - start
+        latencies, texts[precision] = [], []
+        for clip in clips:
+            start = time.perf_counter()
+            result = model.transcribe(pcm_to_float32(clip), language="en", fp16=False)
+            latencies.append(time.perf_counter() - start)
+            texts[precision].append(result["text"].strip())
+        report[precision] = {"load_s": load_s, "latency_s": latencies, "text": texts[precision]}
+        del model
+    report["word_difference"] = [word_difference(ref, hyp) for ref, hyp in zip(texts["fp32"], texts["int8"])]
+    if logger:
+        logger.info(f"Precision comparison: {json.dumps(report)}")
+    return report
+
+
+def main():
+    from voiceptt.audio import read_wav
+    parser = argparse.ArgumentParser(description="Compare int8 and fp32 Whisper on WAV clips")
+    parser.add_argument("model", choices=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("clips", nargs="+", help="16 kHz mono 16-bit WAV files")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+    report = compare_precision(args.model, [read_wav(p) for p in args.clips], args.cache_dir)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Startup timing: named marks from process start to menu bar and model readiness
+
+    python run_ptt.py --profile-startup
+
+prints how long the top-level imports, each initialization step, the background
+imports of whisper/torch and the first model load took, then exits.
+"""
+import importlib
+import sys
+import time
+
+
+class StartupProfiler:
+    """Collects (label, since start, since previous mark) timings"""
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.last = started_at
+        self.marks = []
+
+    def mark(self, label):
+        """Record that label just finished; returns seconds since process start"""
+        now = time.perf_counter()
+        self.marks.append((label, now - self.started_at, now - self.last))
+        self.last = now
+        return now - self.started_at
+
+    def import_module(self, name):
+        """Import a module (if installed) and mark how long it took"""
+        if name in sys.modules:
+            return sys.modules[name]
+        self.last = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            return None
+        self.mark(f"import {name}")
+        return module
+
+    def report(self, out=None):
+        out = out or sys.stdout
+        print(f"{'step':40} {'at':>9} {'took':>9}", file=out)
+        for label, at, took in self.marks:
+            print(f"{label:40} {at * 1000:7.0f}ms {took * 1000:7.0f}ms", file=out)
+        out.flush()
@@ -0,0 +1,131 @@
+"""Incremental transcription of finished segments while the hotkey is still held"""
+import re
+import threading
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+from voiceptt.vad import FRAME, frame_energy_db
+
+DEFAULT_STREAMING_SETTINGS = {
+    "enabled": False,
+    "min_segment_s": 4.0,    # wait for this much new audio before looking for a cut
+    "max_segment_s": 25.0,   # force a cut here, inside Whisper's 30 s window
+    "pause_ms": 300,         # length of quiet audio that counts as a pause
+    "silence_db": -40.0,     # frame energy (dBFS) below which audio is quiet
+    "overlap_s": 0.5,        # audio decoded on both sides of a cut
+    "poll_ms": 250,
+}
+
+
+def find_pause(pcm, pause_ms, silence_db, force=False):
+    """Sample index at the middle of the quietest pause, or None if nothing is quiet enough"""
+    energy = frame_energy_db(pcm)
+    width = max(1, int(pause_ms / 10))
+    if len(energy) < width:
+        return len(pcm) if force else None
+    window = np.convolve(energy, np.ones(width, dtype=np.float32) / width, mode='valid')
+    # Prefer the latest of equally quiet pauses so segments stay long
+    best = len(window) - 1 - int(np.argmin(window[::-1]))
+    if window[best] > silence_db and not force:
+        return None
+    return (best + width // 2) * FRAME
+
+
+def split_at_pauses(pcm, max_len, pause_ms=300, silence_db=-40.0):
+    """(start, end) chunks of at most max_len samples, cut at the quietest pause"""
+    chunks, start = [], 0
+    while len(pcm) - start > max_len:
+        # Only look in the second half so chunks stay reasonably long
+        half = max_len // 2
+        cut = half + find_pause(pcm[start + half:start + max_len], pause_ms, silence_db, force=True)
+        chunks.append((start, start + cut))
+        start += cut
+    chunks.append((start, len(pcm)))
+    return chunks
+
+
+def _words(text):
+    return [re.sub(r"[^\w']", "", w).lower() for w in text.split()]
+
+
+def merge_overlap(prev_text, new_text, max_words=8):
+    """Drop the leading words of new_text that repeat the tail of prev_text"""
+    prev_words = _words(prev_text)
+    new_raw = new_text.split()
+    new_words = _words(new_text)
+    for k in range(min(max_words, len(prev_words), len(new_words)), 0, -1):
+        if prev_words[-k:] == new_words[:k]:
+            return " ".join(new_raw[k:])
+    return new_text.strip()
+
+
+class StreamingTranscriber:
+    """Decodes pause-delimited segments from the capture ring in the background"""
+
+    def __init__(self, capture, start_sample, decode, settings, on_partial=None, logger=None):
+        self.capture = capture
+        self.cursor = start_sample       # first sample not yet committed to text
+        self.decode = decode             # decode(pcm_int16, prompt) -> text
+        self.settings = settings
+        self.on_partial = on_partial
+        self.logger = logger
+        self.text = ""
+        self.segments = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        min_len = int(self.settings["min_segment_s"] * SAMPLE_RATE)
+        max_len = int(self.settings["max_segment_s"] * SAMPLE_RATE)
+        while not self.stopping.wait(self.settings["poll_ms"] / 1000):
+            pending = self.capture.position - self.cursor
+            if pending < min_len:
+                continue
+            pcm = self.capture.read(self.cursor, self.cursor + max_len)
+            cut = find_pause(pcm, self.settings["pause_ms"], self.settings["silence_db"],
+                             force=len(pcm) >= max_len)
+            if cut is None or cut < min_len // 2:
+                continue
+            try:
+                self._commit(pcm[:cut])
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Streaming segment failed: {e}")
+                return
+            self.cursor += cut
+            if self.on_partial and not self.stopping.is_set():
+                self.on_partial(self.text)
+
+    def _commit(self, pcm):
+        """Decode a segment (with overlap before it) and append its new words"""
+        overlap = int(self.settings["overlap_s"] * SAMPLE_RATE)
+        if self.segments and overlap:
+            head = self.capture.read(max(self.cursor - overlap, self.capture.oldest), self.cursor)
+            pcm = np.concatenate([head, pcm])
+        text = self.decode(pcm, self.text[-200:]).strip()
+        if self.segments:
+            text = merge_overlap(self.text, text)
+        if text:
+            self.text = f"{self.text} {text}".strip()
+        self.segments += 1
+
+    def finish(self, end_sample):
+        """Stop streaming, decode only the remaining tail and return the full text"""
+        self.cancel()
+        tail = self.capture.read(self.cursor, end_sample)
+        if len(tail):
+            self._commit(tail)
+        if self.logger:
+            self.logger.info(f"Streaming transcription finished in {self.segments} segments")
+        return self.text
+
+    def cancel(self):
+        """Stop the background loop, waiting for an in-flight segment"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
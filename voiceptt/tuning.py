@@ -0,0 +1,164 @@
+"""CPU thread autotuner: benchmark a loaded model across torch thread counts
+
+Torch defaults to one intra-op thread per core, which on CPU-only machines competes
+with the PortAudio callback and with numba (used by Whisper's timing code). The
+tuner times greedy decodes of a reference clip at several intra-op thread counts and
+keeps the fastest, preferring fewer threads when results are within tolerance. The
+inter-op pool can only be sized before torch starts parallel work, so it is applied
+once at engine start and not swept.
+
+    python -m voiceptt.tuning --model small
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+
+DEFAULT_THREAD_SETTINGS = {
+    "autotune_on_load": False,  # tune each model key the first time it is loaded
+    "reserve_cores": 1,         # cores left free for audio capture and the UI
+    "repeats": 3,
+    "tolerance": 0.05,          # take fewer threads if within 5% of the fastest
+    "configs": {},              # model key -> {"intra_op": n, "inter_op": m, ...results}
+}
+
+
+def reference_clip(seconds=8.0):
+    """Deterministic speech-like signal: harmonic vowels in syllable-length bursts"""
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = (np.sin(2 * np.pi * 3.5 * t) > -0.3).astype(np.float32)
+    audio = 0.2 * voice * envelope + 0.005 * rng.standard_normal(len(t))
+    return (audio * 32767).astype(np.int16)
+
+
+def candidate_threads(cpu_count=None, reserve=1):
+    """Intra-op thread counts to try: powers of two up to the usable cores, plus that count"""
+    cores = max(1, (cpu_count or os.cpu_count() or 1) - reserve)
+    counts = {cores}
+    n = 1
+    while n < cores:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+
+def apply_threads(config):
+    """Set torch (and numba, if loaded) thread counts from a saved config"""
+    import sys
+    import torch
+    torch.set_num_threads(config["intra_op"])
+    if config.get("inter_op"):
+        try:
+            torch.set_num_interop_threads(config["inter_op"])
+        except RuntimeError:
+            pass  # only allowed before the first parallel op; keeps the startup value
+    numba = sys.modules.get("numba")
+    if numba is not None:
+        numba.set_num_threads(min(config["intra_op"], numba.config.NUMBA_NUM_THREADS))
+
+
+def _time_decode(model, audio, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.transcribe(audio, language="en", temperature=0.0, condition_on_previous_text=False,
+                         fp16=False)
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)), float(min(latencies))
+
+
+def autotune(model, clip=None, settings=None, logger=None):
+    """Time the model at each candidate thread count; returns a report with the best config"""
+    import torch
+    from voiceptt.audio import pcm_to_float32
+    settings = {**DEFAULT_THREAD_SETTINGS, **(settings or {})}
+    clip = reference_clip() if clip is None else clip
+    audio = pcm_to_float32(clip)
+    audio_s = len(clip) / SAMPLE_RATE
+    original = torch.get_num_threads()
+    counts = sorted(set(candidate_threads(reserve=settings["reserve_cores"])) | {original})
+
+    results = []
+    try:
+        for n in counts:
+            torch.set_num_threads(n)
+            _time_decode(model, audio, 1)  # warm-up at this thread count
+            median, best = _time_decode(model, audio, settings["repeats"])
+            results.append({"intra_op": n, "latency_s": median, "best_s": best,
+                            "throughput_x": audio_s / median})
+            if logger:
+                logger.info(f"Threads {n:2d}: {median:.3f}s median, {audio_s / median:.1f}x real time")
+    finally:
+        torch.set_num_threads(original)
+
+    fastest = min(r["latency_s"] for r in results)
+    # Fewest threads within tolerance of the fastest leaves cores for audio capture
+    best = min((r for r in results if r["latency_s"] <= fastest * (1 + settings["tolerance"])),
+               key=lambda r: r["intra_op"])
+    baseline = next(r for r in results if r["intra_op"] == original)
+    return {
+        "clip_s": audio_s,
+        "results": results,
+        "baseline": baseline,
+        "best": best,
+        "config": {"intra_op": best["intra_op"], "inter_op": 1, "latency_s": best["latency_s"],
+                   "baseline_intra_op": original, "baseline_latency_s": baseline["latency_s"],
+                   "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S")},
+    }
+
+
+def summarize(key, report):
+    """One-line before/after summary"""
+    base, best = report["baseline"], report["best"]
+    return (f"{key}: {base['intra_op']} → {best['intra_op']} threads, "
+            f"{base['latency_s']:.2f}s → {best['latency_s']:.2f}s per {report['clip_s']:.0f}s clip "
+            f"({base['throughput_x']:.1f}x → {best['throughput_x']:.1f}x real time)")
+
+
+def main():
+    from voiceptt.audio import load_audio_file
+    from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS, load_variant, model_key
+
+    parser = argparse.ArgumentParser(description="Find the fastest torch thread count for a Whisper model")
+    parser.add_argument("--settings", default="voiceptt_settings.json")
+    parser.add_argument("--model", help="Model size (default from settings)")
+    parser.add_argument("--precision", choices=["fp32", "int8"])
+    parser.add_argument("--clip", help="Reference audio file (default: built-in synthetic clip)")
+    parser.add_argument("--dry-run", action="store_true", help="Report only; do not save to settings")
+    args = parser.parse_args()
+
+    try:
+        with open(args.settings, "r") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        settings = {}
+    key = model_key(args.model or settings.get("model_size", "small"),
+                    args.precision or settings.get("precision", "fp32"))
+    thread_settings = {**DEFAULT_THREAD_SETTINGS, **settings.get("threads", {})}
+    cache_dir = {**DEFAULT_MODEL_POOL_SETTINGS, **settings.get("models", {})}["cache_dir"]
+    model = load_variant(key, cache_dir)
+    clip = load_audio_file(args.clip) if args.clip else None
+
+    report = autotune(model, clip, thread_settings)
+    print(f"{'threads':>7} {'median':>8} {'best':>8} {'x real time':>12}")
+    for r in report["results"]:
+        print(f"{r['intra_op']:7d} {r['latency_s']:7.3f}s {r['best_s']:7.3f}s {r['throughput_x']:11.1f}x")
+    print(summarize(key, report))
+    if not args.dry_run:
+        thread_settings["configs"][key] = report["config"]
+        settings["threads"] = thread_settings
+        with open(args.settings, "w") as f:
+            json.dump(settings, f, indent=2)
+        print(f"Saved to {args.settings}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Energy + zero-crossing voice activity detection and silence compaction"""
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+
+DEFAULT_VAD_SETTINGS = {
+    "enabled": True,
+    "energy_db": -45.0,        # frames quieter than this (dBFS) are never speech
+    "noise_margin_db": 10.0,   # speech must also be this far above the noise floor
+    "zcr_max": 0.35,           # noisier (hiss-like) frames need an extra 10 dB to count
+    "min_speech_ms": 200,      # less speech than this rejects the clip
+    "padding_ms": 150,         # context kept around detected speech
+    "max_pause_ms": 500,       # longer pauses inside speech are shortened to this
+}
+
+FRAME = SAMPLE_RATE // 100  # 10 ms analysis frames
+
+
+def _frames(pcm, frame=FRAME):
+    n = len(pcm) // frame
+    return pcm[:n * frame].reshape(n, frame)
+
+
+def frame_energy_db(pcm, frame=FRAME):
+    """Per-frame RMS level in dBFS for int16 PCM"""
+    frames = _frames(pcm, frame).astype(np.float32)
+    if len(frames) == 0:
+        return np.empty(0, dtype=np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def zero_crossing_rate(pcm, frame=FRAME):
+    """Fraction of adjacent sample pairs that change sign, per frame"""
+    signs = np.signbit(_frames(pcm, frame))
+    if len(signs) == 0:
+        return np.empty(0, dtype=np.float32)
+    return np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+
+def speech_mask(pcm, settings):
+    """Boolean speech decision per 10 ms frame"""
+    energy = frame_energy_db(pcm)
+    if len(energy) == 0:
+        return np.zeros(0, dtype=bool)
+    zcr = zero_crossing_rate(pcm)
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(settings["energy_db"], noise_floor + settings["noise_margin_db"])
+    return (energy > threshold) & ((zcr < settings["zcr_max"]) | (energy > threshold + 10.0))
+
+
+def speech_keep_mask(pcm, settings):
+    """Per-sample mask of the audio trim_silence keeps; None if there is no speech"""
+    speech = speech_mask(pcm, settings)
+    if speech.sum() * 10 < settings["min_speech_ms"]:
+        return None
+
+    # Pad speech regions so word onsets and tails survive
+    pad = int(settings["padding_ms"] / 10)
+    if pad:
+        speech = np.convolve(speech, np.ones(2 * pad + 1), mode='same') > 0
+
+    # Keep silent frames only within half a max pause of speech on both sides
+    n = len(speech)
+    idx = np.arange(n)
+    last_speech = np.maximum.accumulate(np.where(speech, idx, -1))
+    next_speech = np.minimum.accumulate(np.where(speech, idx, n)[::-1])[::-1]
+    half = int(settings["max_pause_ms"] / 20)
+    inside = (last_speech >= 0) & (next_speech < n)
+    keep = speech | (inside & ((idx - last_speech <= half) | (next_speech - idx <= half)))
+
+    mask = np.repeat(keep, FRAME)
+    if len(mask) < len(pcm):
+        # Trailing partial frame follows the last full frame
+        mask = np.concatenate([mask, np.full(len(pcm) - len(mask), keep[-1])])
+    return mask
+
+
+def kept_span(mask):
+    """(start, end) when the mask keeps one contiguous run of samples, else None"""
+    kept = np.flatnonzero(mask)
+    if len(kept) == 0 or kept[-1] - kept[0] + 1 != len(kept):
+        return None
+    return int(kept[0]), int(kept[-1]) + 1
+
+
+def trim_silence(pcm, settings):
+    """Drop leading/trailing silence and shorten long pauses; None if there is no speech"""
+    mask = speech_keep_mask(pcm, settings)
+    return None if mask is None else pcm[mask]
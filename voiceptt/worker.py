@@ -0,0 +1,355 @@
+"""Out-of-process inference worker with shared-memory audio handoff
+
+In one process, the audio callback, the hotkey listener, the menu bar and torch all
+share one GIL, so a long decode delays input callbacks and UI events. With
+worker.enabled the TranscriptionEngine runs in a spawned child process instead. The
+app never imports torch or whisper.
+
+Each clip is written once into a multiprocessing.shared_memory block. The worker
+maps that block as its numpy array without copying or pickling the audio. Requests
+and replies are small dicts over a Pipe, tagged with ids so several requests can be
+in flight. If the worker dies it is restarted, up to max_restarts times per
+restart_window_s, and the request that was running is retried once on the new
+worker. A request with no reply within request_timeout_s fails, and the hung worker
+is killed so the next request starts a fresh one.
+"""
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from voiceptt.audio import SAMPLE_RATE
+from voiceptt.metrics import Metrics
+
+DEFAULT_WORKER_SETTINGS = {
+    "enabled": False,
+    "max_restarts": 3,           # restarts allowed within restart_window_s before giving up
+    "restart_window_s": 300,
+    "start_timeout_s": 60,       # time for the worker to import its modules and answer
+    "request_timeout_s": 600,    # a request with no reply by then fails and the worker is killed
+}
+
+
+class WorkerCrashed(Exception):
+    """The inference worker process exited while a request was running"""
+
+
+def _attach(name):
+    """Map an existing block without making this process responsible for unlinking it"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block again, but a spawned child
+        # shares the app's resource tracker, which already holds it: a no-op
+        return shared_memory.SharedMemory(name=name)
+
+
+def _serve(conn, config):
+    """Worker process main loop: one TranscriptionEngine, one thread per request"""
+    from voiceptt.batching import DEFAULT_BATCHING_SETTINGS
+    from voiceptt.engine import TranscriptionEngine
+    from voiceptt.longform import DEFAULT_LONGFORM_SETTINGS
+    from voiceptt.models import DEFAULT_MODEL_POOL_SETTINGS
+    from voiceptt.profiles import DEFAULT_PROFILE_SETTINGS
+    from voiceptt.tuning import DEFAULT_THREAD_SETTINGS
+    from voiceptt.vad import DEFAULT_VAD_SETTINGS
+
+    logging.basicConfig(filename=config.get("log_path", "voiceptt.log"), level=logging.INFO,
+                        format='%(asctime)s | %(levelname)s | worker | %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+    logger = logging.getLogger("voiceptt.worker")
+    engine = TranscriptionEngine(
+        model_size=config["model_size"],
+        precision=config["precision"],
+        model_settings={**DEFAULT_MODEL_POOL_SETTINGS, **config.get("models", {})},
+        vad_settings={**DEFAULT_VAD_SETTINGS, **config.get("vad", {})},
+        audio_handoff=config.get("audio_handoff", "memory"),
+        batching_settings={**DEFAULT_BATCHING_SETTINGS, **config.get("batching", {})},
+        logger=logger,
+        profile_settings={**DEFAULT_PROFILE_SETTINGS, **config.get("profiles", {})},
+        thread_settings={**DEFAULT_THREAD_SETTINGS, **config.get("threads", {})},
+        longform_settings={**DEFAULT_LONGFORM_SETTINGS, **config.get("longform", {})}
+    )
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    engine.on_status = lambda text: send({"id": None, "event": "status", "text": text})
+
+    def handle(request):
+        rid, op = request["id"], request["op"]
+        shm = None
+        try:
+            pcm = None
+            if request.get("shm"):
+                shm = _attach(request["shm"])
+                pcm = np.ndarray((request["samples"],), dtype=np.int16, buffer=shm.buf)
+            if op == "transcribe":
+                def on_segment(text, start, end):
+                    send({"id": rid, "event": "segment", "text": text, "start": start, "end": end})
+                if request["mode"] == "long":
+                    result = engine.transcribe_long(pcm, on_segment=on_segment)
+                elif request["mode"] == "chunks":
+                    result = engine.transcribe_chunks(pcm, on_segment=on_segment)
+                else:
+                    result = engine.transcribe(pcm, prompt=request.get("prompt"))
+            elif op == "select":
+                result = engine.select(request["model"], request["precision"])
+            elif op == "load":
+                result = engine.load()
+            elif op == "prefetch":
+                result = engine.prefetch()
+            elif op == "autotune":
+                result = engine.autotune(None if pcm is None else np.array(pcm))
+            else:
+                raise ValueError(f"Unknown op: {op}")
+            # Every reply carries the resident models, so the app never has to ask
+            send({"id": rid, "event": "done", "result": result, "resident": engine.resident()})
+        except Exception as e:
+            logger.error(f"Worker {op} failed: {e}")
+            send({"id": rid, "event": "error", "message": str(e)})
+        finally:
+            pcm = None
+            if shm is not None:
+                try:
+                    shm.close()
+                except BufferError:
+                    pass  # still referenced; unmapped when collected
+
+    send({"id": 0, "event": "ready"})
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break  # app exited or closed the pipe
+        if request["op"] == "stop":
+            break
+        threading.Thread(target=handle, args=(request,), daemon=True).start()
+
+
+class WorkerEngine:
+    """TranscriptionEngine stand-in whose model runs in a child process"""
+
+    def __init__(self, config, settings, thread_settings=None, metrics=None, logger=None):
+        self.config = config                # settings sections the worker builds its engine from
+        self.settings = settings
+        self.model_size = config["model_size"]
+        self.precision = config["precision"]
+        self.thread_settings = thread_settings
+        self.metrics = metrics or Metrics({"enabled": False})
+        self.logger = logger
+        self.on_status = None
+        self.batcher = None
+        self.context = multiprocessing.get_context("spawn")  # never fork a process that has threads
+        self.process = None
+        self.conn = None
+        self.ids = itertools.count(1)
+        self.waiting = {}       # id -> [Event, reply, on_segment]
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()  # held while a worker starts, so replies keep flowing
+        self.restarts = []      # times of recent restarts
+        self.loaded = False     # reload the model after a restart once it had been loaded
+        self.resident_keys = []  # as of the worker's last reply; menus read this, never the pipe
+        self.stopping = False
+
+    @property
+    def model_key(self):
+        from voiceptt.models import model_key
+        return model_key(self.model_size, self.precision)
+
+    def _log(self, message, level=logging.INFO):
+        if self.logger:
+            self.logger.log(level, message)
+
+    # ----- process management -----
+
+    def _start(self):
+        parent, child = self.context.Pipe()
+        config = dict(self.config, model_size=self.model_size, precision=self.precision)
+        if self.thread_settings is not None:
+            config["threads"] = self.thread_settings
+        process = self.context.Process(target=_serve, args=(child, config), name="voiceptt-worker", daemon=True)
+        process.start()
+        child.close()
+        if not parent.poll(self.settings["start_timeout_s"]) or parent.recv().get("event") != "ready":
+            process.kill()
+            raise WorkerCrashed("Inference worker did not start")
+        with self.lock:
+            self.process, self.conn = process, parent
+        threading.Thread(target=self._read_replies, args=(process, parent), daemon=True).start()
+        self._log(f"Started inference worker (pid {process.pid})")
+
+    def _ensure_started(self):
+        with self.start_lock:
+            with self.lock:
+                process = self.process
+            if process is not None and process.is_alive():
+                return False
+            if process is not None:
+                now = time.monotonic()
+                self.restarts = [t for t in self.restarts if now - t < self.settings["restart_window_s"]]
+                if len(self.restarts) >= self.settings["max_restarts"]:
+                    raise WorkerCrashed(f"Inference worker crashed {len(self.restarts)} times "
+                                        f"in {self.settings['restart_window_s']}s; not restarting")
+                self.restarts.append(now)
+                self._log(f"Restarting inference worker (exit code {process.exitcode})", logging.WARNING)
+            self._start()
+            return self.loaded
+
+    def _read_replies(self, process, conn):
+        while True:
+            try:
+                reply = conn.recv()
+            except (EOFError, OSError):
+                break
+            if reply["event"] == "status":
+                if self.on_status:
+                    self.on_status(reply["text"])
+                continue
+            with self.lock:
+                waiter = self.waiting.get(reply["id"])
+                if waiter is not None and reply["event"] != "segment":
+                    del self.waiting[reply["id"]]
+            if waiter is None:
+                continue
+            if reply["event"] == "segment":
+                if waiter[2]:
+                    waiter[2](reply["text"], reply["start"], reply["end"])
+                continue
+            if "resident" in reply:
+                self.resident_keys = reply["resident"]
+            waiter[1] = reply
+            waiter[0].set()
+        # Worker exited: fail everything that was waiting on it
+        process.join(1)
+        with self.lock:
+            if self.process is process:
+                self.process = None if self.stopping else process
+            waiters, self.waiting = self.waiting, {}
+        self.resident_keys = []
+        if not self.stopping:
+            self._log(f"Inference worker exited (code {process.exitcode})", logging.ERROR)
+        for waiter in waiters.values():
+            waiter[1] = {"event": "crashed"}
+            waiter[0].set()
+
+    def start(self):
+        """Start the worker process (blocking until it answers)"""
+        self._ensure_started()
+
+    def stop(self):
+        with self.lock:
+            self.stopping = True
+            process, conn = self.process, self.conn
+            self.process = None
+        if process is None:
+            return
+        try:
+            conn.send({"op": "stop"})
+        except OSError:
+            pass
+        process.join(2)
+        if process.is_alive():
+            process.kill()
+
+    # ----- requests -----
+
+    def _request(self, op, pcm=None, on_segment=None, **fields):
+        """Send one request and wait for its result; retried once if the worker crashes"""
+        for attempt in range(2):
+            if self._ensure_started():
+                self._send("load")  # bring the model back before the retried request
+            try:
+                return self._send(op, pcm, on_segment, **fields)
+            except WorkerCrashed:
+                if attempt:
+                    raise
+                self._log(f"Inference worker crashed during {op}; retrying once", logging.WARNING)
+
+    def _send(self, op, pcm=None, on_segment=None, **fields):
+        request = dict(fields, op=op, id=next(self.ids))
+        shm = None
+        if pcm is not None:
+            # The one copy of the clip: into shared memory the worker maps directly
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(pcm) * 2))
+            view = np.ndarray((len(pcm),), dtype=np.int16, buffer=shm.buf)
+            view[:] = pcm
+            del view
+            request.update(shm=shm.name, samples=len(pcm))
+        waiter = [threading.Event(), None, on_segment]
+        try:
+            with self.lock:
+                if self.process is None:
+                    raise WorkerCrashed("Inference worker is not running")
+                self.waiting[request["id"]] = waiter
+                try:
+                    self.conn.send(request)
+                except OSError:
+                    del self.waiting[request["id"]]
+                    raise WorkerCrashed("Inference worker pipe is closed")
+            if not waiter[0].wait(self.settings["request_timeout_s"]):
+                with self.lock:
+                    self.waiting.pop(request["id"], None)
+                    process = self.process
+                self._log(f"Inference worker gave no reply to {op} in "
+                          f"{self.settings['request_timeout_s']}s; killing it", logging.ERROR)
+                if process is not None:
+                    process.kill()  # restarted by the next request
+                raise TimeoutError(f"Inference worker did not answer {op} in time")
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        reply = waiter[1]
+        if reply["event"] == "crashed":
+            raise WorkerCrashed(f"Inference worker exited during {op}")
+        if reply["event"] == "error":
+            raise RuntimeError(reply["message"])
+        return reply["result"]
+
+    # ----- engine interface -----
+
+    def select(self, size, precision):
+        self.model_size, self.precision = size, precision
+        return self._request("select", model=size, precision=precision)
+
+    def resident(self):
+        return list(self.resident_keys)
+
+    def load(self):
+        key = self._request("load")
+        self.loaded = True
+        return key
+
+    def prefetch(self):
+        # Called on key press: never wait for a worker (re)start or raise into the hotkey listener
+        threading.Thread(target=self._prefetch, daemon=True).start()
+
+    def _prefetch(self):
+        try:
+            self._request("prefetch")
+        except Exception as e:
+            self._log(f"Worker prefetch failed: {e}", logging.WARNING)
+
+    def transcribe(self, audio_data, prompt=None, features=None):
+        # Features computed in this process are not sent; the worker computes its own
+        with self.metrics.span("worker", len(audio_data) / SAMPLE_RATE):
+            return self._request("transcribe", audio_data, mode="short", prompt=prompt)
+
+    def transcribe_chunks(self, audio_data, on_segment=None):
+        return self._request("transcribe", audio_data, on_segment, mode="chunks")
+
+    def transcribe_long(self, audio_data, on_segment=None):
+        return self._request("transcribe", audio_data, on_segment, mode="long")
+
+    def autotune(self, clip=None):
+        report = self._request("autotune", clip)
+        if self.thread_settings is not None:
+            self.thread_settings["configs"][self.model_key] = report["config"]
+        return report